@@ -1,50 +1,112 @@
 #!/usr/bin/env python3
 """
 🎯 Automatic Weather Dashboard Creator
-Creates the complete weather dashboard automatically using Kibana API
+Creates the complete weather dashboard automatically using Kibana API.
+All saved objects are built locally, compared with what Kibana already
+holds by content hash, and the changed ones are sent as one NDJSON import,
+so the script is safe to re-run and scales to thousands of cities.
 """
 
+import argparse
+import hashlib
 import requests
 import json
+import os
 import time
-from datetime import datetime
+
+from weather_cities import load_cities
 
 # Configuration
 KIBANA_URL = "http://localhost:5601"
 ELASTICSEARCH_URL = "http://localhost:9200"
 INDEX_PATTERN = "openweather*"
+INDEX_PATTERN_ID = "openweather-pattern"
+LATEST_INDEX_PATTERN = "weather-latest"
+LATEST_INDEX_PATTERN_ID = "weather-latest-pattern"
 CITIES = ["Krakow", "Paris", "Berlin", "Amsterdam", "Barcelona", "Vienna"]
+KIBANA_HEADERS = {'kbn-xsrf': 'true'}
+BULK_GET_CHUNK = 1000   # saved objects looked up per _bulk_get request
+IMPORT_CHUNK = 5000     # saved objects per _import request (Kibana's default limit is 10000)
+STATE_FILE = '.kibana_provision_state.json'
+
+def metric_agg(field, latest=False):
+    """Metric aggregation for a single-value panel
 
-def create_index_pattern():
-    """Create index pattern without time field"""
-    headers = {
-        'Content-Type': 'application/json',
-        'kbn-xsrf': 'true'
+    On the history index the latest value needs a top_hits sorted by timestamp,
+    which sorts every document of the city. The latest index holds one document
+    per city, so a plain max returns the same value without any sort.
+    """
+    if latest:
+        return {
+            "id": "1",
+            "enabled": True,
+            "type": "max",
+            "schema": "metric",
+            "params": {"field": field}
+        }
+    return {
+        "id": "1",
+        "enabled": True,
+        "type": "top_hits",
+        "schema": "metric",
+        "params": {
+            "field": field,
+            "aggregate": "concat",
+            "size": 1,
+            "sortField": "timestamp",
+            "sortOrder": "desc"
+        }
     }
-    
-    payload = {
+
+def city_search_source(city, index_id):
+    """Search source of a per-city panel: the index pattern plus a city filter"""
+    return json.dumps({
+        "index": index_id,
+        "filter": [
+            {
+                "meta": {
+                    "alias": None,
+                    "disabled": False,
+                    "key": "city_name.keyword",
+                    "negate": False,
+                    "params": {"query": city},
+                    "type": "phrase"
+                },
+                "query": {"match_phrase": {"city_name.keyword": city}}
+            }
+        ],
+        "query": {"query": "", "language": "kuery"}
+    })
+
+def visualization_object(object_id, title, vis_state, search_source):
+    """Saved object for a visualization"""
+    return {
+        "type": "visualization",
+        "id": object_id,
         "attributes": {
-            "title": "openweather*"
+            "title": title,
+            "visState": json.dumps(vis_state),
+            "uiStateJSON": "{}",
+            "description": "",
+            "version": 1,
+            "kibanaSavedObjectMeta": {
+                "searchSourceJSON": search_source
+            }
         }
     }
-    
-    url = f"{KIBANA_URL}/api/saved_objects/index-pattern/openweather-pattern"
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code in [200, 201]:
-        print("✅ Index pattern created")
-        return "openweather-pattern"
-    else:
-        print(f"⚠️ Index pattern might already exist: {response.status_code}")
-        return "openweather-pattern"
 
-def create_temperature_metric(city):
-    """Create temperature metric visualization for a city"""
-    headers = {
-        'Content-Type': 'application/json',
-        'kbn-xsrf': 'true'
+def index_pattern_object(title=INDEX_PATTERN, pattern_id=INDEX_PATTERN_ID):
+    """Index pattern without time field"""
+    return {
+        "type": "index-pattern",
+        "id": pattern_id,
+        "attributes": {
+            "title": title
+        }
     }
-    
+
+def temperature_metric_object(city, latest=False):
+    """Temperature metric visualization for a city"""
     vis_state = {
         "title": f"Temperature - {city}",
         "type": "metric",
@@ -66,69 +128,14 @@ def create_temperature_metric(city):
                 }
             }
         },
-        "aggs": [
-            {
-                "id": "1",
-                "enabled": True,
-                "type": "top_hits",
-                "schema": "metric",
-                "params": {
-                    "field": "temp",
-                    "aggregate": "concat",
-                    "size": 1,
-                    "sortField": "timestamp",
-                    "sortOrder": "desc"
-                }
-            }
-        ]
-    }
-    
-    payload = {
-        "attributes": {
-            "title": f"Temperature - {city}",
-            "visState": json.dumps(vis_state),
-            "uiStateJSON": "{}",
-            "description": "",
-            "version": 1,
-            "kibanaSavedObjectMeta": {
-                "searchSourceJSON": json.dumps({
-                    "index": "openweather-pattern",
-                    "filter": [
-                        {
-                            "meta": {
-                                "alias": None,
-                                "disabled": False,
-                                "key": "city_name.keyword",
-                                "negate": False,
-                                "params": {"query": city},
-                                "type": "phrase"
-                            },
-                            "query": {"match_phrase": {"city_name.keyword": city}}
-                        }
-                    ],
-                    "query": {"query": "", "language": "kuery"}
-                })
-            }
-        }
+        "aggs": [metric_agg("temp", latest)]
     }
     
-    url = f"{KIBANA_URL}/api/saved_objects/visualization/temp-{city.lower()}"
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code in [200, 201]:
-        print(f"✅ Temperature metric created for {city}")
-        return f"temp-{city.lower()}"
-    else:
-        print(f"❌ Failed to create temperature metric for {city}: {response.status_code}")
-        return None
+    return visualization_object(f"temp-{city.lower()}", f"Temperature - {city}", vis_state,
+                                city_search_source(city, LATEST_INDEX_PATTERN_ID if latest else INDEX_PATTERN_ID))
 
-def create_humidity_metric(city):
-    """Create humidity metric visualization for a city"""
-    headers = {
-        'Content-Type': 'application/json',
-        'kbn-xsrf': 'true'
-    }
-    
+def humidity_metric_object(city, latest=False):
+    """Humidity metric visualization for a city"""
     vis_state = {
         "title": f"Humidity - {city}",
         "type": "metric",
@@ -150,69 +157,14 @@ def create_humidity_metric(city):
                 }
             }
         },
-        "aggs": [
-            {
-                "id": "1",
-                "enabled": True,
-                "type": "top_hits",
-                "schema": "metric",
-                "params": {
-                    "field": "humidity",
-                    "aggregate": "concat",
-                    "size": 1,
-                    "sortField": "timestamp",
-                    "sortOrder": "desc"
-                }
-            }
-        ]
-    }
-    
-    payload = {
-        "attributes": {
-            "title": f"Humidity - {city}",
-            "visState": json.dumps(vis_state),
-            "uiStateJSON": "{}",
-            "description": "",
-            "version": 1,
-            "kibanaSavedObjectMeta": {
-                "searchSourceJSON": json.dumps({
-                    "index": "openweather-pattern",
-                    "filter": [
-                        {
-                            "meta": {
-                                "alias": None,
-                                "disabled": False,
-                                "key": "city_name.keyword",
-                                "negate": False,
-                                "params": {"query": city},
-                                "type": "phrase"
-                            },
-                            "query": {"match_phrase": {"city_name.keyword": city}}
-                        }
-                    ],
-                    "query": {"query": "", "language": "kuery"}
-                })
-            }
-        }
+        "aggs": [metric_agg("humidity", latest)]
     }
     
-    url = f"{KIBANA_URL}/api/saved_objects/visualization/humidity-{city.lower()}"
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code in [200, 201]:
-        print(f"✅ Humidity metric created for {city}")
-        return f"humidity-{city.lower()}"
-    else:
-        print(f"❌ Failed to create humidity metric for {city}: {response.status_code}")
-        return None
+    return visualization_object(f"humidity-{city.lower()}", f"Humidity - {city}", vis_state,
+                                city_search_source(city, LATEST_INDEX_PATTERN_ID if latest else INDEX_PATTERN_ID))
 
-def create_temperature_line(city):
-    """Create temperature line chart for a city"""
-    headers = {
-        'Content-Type': 'application/json',
-        'kbn-xsrf': 'true'
-    }
-    
+def temperature_line_object(city):
+    """Temperature line chart for a city"""
     vis_state = {
         "title": f"Temperature Trend - {city}",
         "type": "line",
@@ -283,85 +235,144 @@ def create_temperature_line(city):
         ]
     }
     
-    payload = {
-        "attributes": {
-            "title": f"Temperature Trend - {city}",
-            "visState": json.dumps(vis_state),
-            "uiStateJSON": "{}",
-            "description": "",
-            "version": 1,
-            "kibanaSavedObjectMeta": {
-                "searchSourceJSON": json.dumps({
-                    "index": "openweather-pattern",
-                    "filter": [
-                        {
-                            "meta": {
-                                "alias": None,
-                                "disabled": False,
-                                "key": "city_name.keyword",
-                                "negate": False,
-                                "params": {"query": city},
-                                "type": "phrase"
-                            },
-                            "query": {"match_phrase": {"city_name.keyword": city}}
-                        }
-                    ],
-                    "query": {"query": "", "language": "kuery"}
-                })
-            }
-        }
-    }
-    
-    url = f"{KIBANA_URL}/api/saved_objects/visualization/temp-line-{city.lower()}"
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code in [200, 201]:
-        print(f"✅ Temperature line chart created for {city}")
-        return f"temp-line-{city.lower()}"
-    else:
-        print(f"❌ Failed to create temperature line for {city}: {response.status_code}")
-        return None
+    return visualization_object(f"temp-line-{city.lower()}", f"Temperature Trend - {city}", vis_state,
+                                city_search_source(city, INDEX_PATTERN_ID))
+
+def build_saved_objects(cities, latest=False):
+    """Every saved object of the dashboard: index patterns, then three panels per city"""
+    objects = [index_pattern_object()]
+    if latest:
+        objects.append(index_pattern_object(LATEST_INDEX_PATTERN, LATEST_INDEX_PATTERN_ID))
+    for city in cities:
+        objects.append(temperature_metric_object(city, latest))
+        objects.append(humidity_metric_object(city, latest))
+        objects.append(temperature_line_object(city))
+    return objects
+
+def object_key(saved_object):
+    return f"{saved_object['type']}:{saved_object['id']}"
+
+def content_hash(saved_object):
+    """Stable hash of what we send for an object"""
+    canonical = json.dumps({"type": saved_object["type"], "attributes": saved_object["attributes"]},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def load_state():
+    """Content hashes of the objects last imported into this Kibana
+
+    Kibana migrates saved objects on import (the index reference moves out of
+    searchSourceJSON, for example), so the stored attributes cannot be compared
+    with ours; the hashes of what we sent are kept locally instead.
+    """
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get(KIBANA_URL, {})
+    except (OSError, ValueError):
+        return {}
+
+def save_state(hashes):
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state[KIBANA_URL] = hashes
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def existing_keys(objects):
+    """Keys of the objects that exist in Kibana, looked up with _bulk_get"""
+    found = set()
+    for start in range(0, len(objects), BULK_GET_CHUNK):
+        chunk = objects[start:start + BULK_GET_CHUNK]
+        response = requests.post(
+            f"{KIBANA_URL}/api/saved_objects/_bulk_get",
+            headers=KIBANA_HEADERS,
+            json=[{"type": o["type"], "id": o["id"], "fields": ["title"]} for o in chunk],
+            timeout=60
+        )
+        response.raise_for_status()
+        for saved_object in response.json().get('saved_objects', []):
+            if 'error' not in saved_object:
+                found.add(object_key(saved_object))
+    return found
+
+def import_objects(objects):
+    """Send objects as NDJSON through _import with overwrite; returns the imported keys"""
+    imported = set()
+    for start in range(0, len(objects), IMPORT_CHUNK):
+        chunk = objects[start:start + IMPORT_CHUNK]
+        ndjson = "\n".join(json.dumps(o, separators=(',', ':')) for o in chunk) + "\n"
+        response = requests.post(
+            f"{KIBANA_URL}/api/saved_objects/_import",
+            params={"overwrite": "true"},
+            headers=KIBANA_HEADERS,
+            files={"file": ("weather-dashboard.ndjson", ndjson.encode('utf-8'), "application/ndjson")},
+            timeout=300
+        )
+        if response.status_code != 200:
+            print(f"❌ Import failed: {response.status_code} {response.text[:200]}")
+            continue
+
+        result = response.json()
+        failed = {f"{e['type']}:{e['id']}" for e in result.get('errors', [])}
+        for error in result.get('errors', [])[:10]:
+            print(f"❌ {error['type']} {error['id']}: {error.get('error', {}).get('type')}")
+        imported.update(object_key(o) for o in chunk if object_key(o) not in failed)
+    return imported
+
+def provision(objects, force=False):
+    """Import only the objects that changed since the last run or are missing from Kibana"""
+    previous = {} if force else load_state()
+    hashes = {object_key(o): content_hash(o) for o in objects}
+
+    candidates = [o for o in objects if previous.get(object_key(o)) == hashes[object_key(o)]]
+    present = existing_keys(candidates) if candidates else set()
+    pending = [o for o in objects if object_key(o) not in present]
+    print(f"📦 {len(objects)} saved objects: {len(objects) - len(pending)} unchanged, {len(pending)} to import")
+
+    imported = import_objects(pending) if pending else set()
+    state = {key: previous[key] for key in present}
+    state.update({key: hashes[key] for key in imported})
+    save_state(state)
+    return imported, len(pending) - len(imported)
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Create the weather dashboard visualizations in Kibana")
+    parser.add_argument('--latest', action='store_true',
+                        help=f"point metric panels at the '{LATEST_INDEX_PATTERN}' index (one document per city)")
+    parser.add_argument('--cities', help="comma-separated city list")
+    parser.add_argument('--cities-file', help="file with one city per line")
+    parser.add_argument('--force', action='store_true', help="re-import every object, ignoring content hashes")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.cities_file:
+        cities = load_cities(args.cities_file)
+    elif args.cities:
+        cities = [city.strip() for city in args.cities.split(',') if city.strip()]
+    else:
+        cities = CITIES
+
     print("🎯 Automatic Weather Dashboard Creator")
     print("=" * 50)
-    
-    # Step 1: Create index pattern
-    print("\n📋 Step 1: Creating index pattern...")
-    index_pattern_id = create_index_pattern()
-    
-    # Step 2: Create visualizations
-    print(f"\n📊 Step 2: Creating visualizations for {len(CITIES)} cities...")
-    
-    created_visualizations = []
-    
-    for city in CITIES:
-        print(f"\n🏙️ Creating visualizations for {city}...")
-        
-        # Create temperature metric
-        temp_metric_id = create_temperature_metric(city)
-        if temp_metric_id:
-            created_visualizations.append(temp_metric_id)
-        
-        # Create humidity metric
-        humidity_metric_id = create_humidity_metric(city)
-        if humidity_metric_id:
-            created_visualizations.append(humidity_metric_id)
-        
-        # Create temperature line chart
-        temp_line_id = create_temperature_line(city)
-        if temp_line_id:
-            created_visualizations.append(temp_line_id)
-    
-    print(f"\n✅ Created {len(created_visualizations)} visualizations!")
-    
+
+    start = time.time()
+    objects = build_saved_objects(cities, latest=args.latest)
+    print(f"\n📊 Provisioning index patterns and visualizations for {len(cities)} cities...")
+    imported, failed = provision(objects, force=args.force)
+
+    print(f"\n✅ Imported {len(imported)} saved objects in {time.time() - start:.1f}s"
+          + (f" ({failed} failed)" if failed else ""))
+
     print("\n🎉 Dashboard creation complete!")
     print(f"🌐 Go to Kibana: {KIBANA_URL}")
     print("📊 Create a new dashboard and add your visualizations!")
-    
-    print(f"\n📋 Created visualizations:")
-    for viz_id in created_visualizations:
-        print(f"  - {viz_id}")
 
 if __name__ == "__main__":
     main()
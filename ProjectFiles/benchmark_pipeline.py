@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+⏱️ Pipeline Micro-Benchmarks
+Measures the per-record hot functions of the pipeline offline, on recorded
+OpenWeather payloads: payload to record conversion, enrichment and
+aggregation, JSON on the produce and consume paths, Elasticsearch
+document building and the whole streams processor on the in-memory
+transport. Reports ops/s and bytes allocated per op, saves the
+results per commit and fails when a case slows down past a threshold
+compared with a saved baseline. Speeds are compared relative to a fixed
+calibration workload timed in the same run, so a busier or slower machine
+does not read as a regression.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from kafka_streams_processor import WeatherStreamsProcessor
+from weather_latest_index import build_bulk_body, build_upsert_body
+from weather_routing import routing_params
+from weather_schema import weather_record
+from weather_transport import BOUNDED_MEMORY_RETENTION, create_producer, set_memory_retention
+
+# Configuration
+PAYLOADS_FILE = 'benchmark_payloads.json'
+RESULTS_DIR = 'benchmark_results'
+TARGET_SECONDS = 0.2     # duration of one timed repeat
+REPEATS = 5              # timed repeats per case, the best one is reported
+ALLOCATION_OPS = 200     # ops traced by tracemalloc to measure allocations
+DEFAULT_THRESHOLD = 0.25  # fail when the calibrated speed falls more than this fraction below the baseline
+BULK_BATCH = 100
+PROCESSOR_BATCH = 100    # messages fed to the in-memory processor per op
+CALIBRATION = 'calibration'
+
+
+def load_payloads(path=PAYLOADS_FILE) -> list:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_cases(payloads: list) -> dict:
+    """Benchmark cases: name -> (function of one input, inputs cycled through, records per op)"""
+    # enrich_data and aggregate_data do not touch the Kafka clients created by __init__
+    processor = object.__new__(WeatherStreamsProcessor)
+    records = [weather_record(payload) for payload in payloads]
+    enriched = [processor.enrich_data(record) for record in records]
+    raw_messages = [json.dumps(payload).encode('utf-8') for payload in payloads]
+    produced = [json.dumps(record).encode('utf-8') for record in records]
+    batches = [[enriched[(start + i) % len(enriched)] for i in range(BULK_BATCH)] for start in range(len(enriched))]
+    feeds = [[produced[(start + i) % len(produced)] for i in range(PROCESSOR_BATCH)] for start in range(len(produced))]
+
+    return {
+        'api_payload_parse': (lambda body: json.loads(body), raw_messages, 1),
+        'payload_to_record': (weather_record, payloads, 1),
+        'enrich_data': (processor.enrich_data, records, 1),
+        'aggregate_data': (processor.aggregate_data, records, 1),
+        # Producer: json.dumps of the record (confluent-kafka encodes the str)
+        'produce_serialize': (json.dumps, records, 1),
+        # Processor: KafkaConsumer value_deserializer, then KafkaProducer value_serializer
+        'consume_deserialize': (lambda value: json.loads(value.decode('utf-8')), produced, 1),
+        'enriched_serialize': (lambda record: json.dumps(record).encode('utf-8'), enriched, 1),
+        'es_index_request': (lambda record: (routing_params(record), json.dumps(record)), records, 1),
+        'es_upsert_body': (lambda record: json.dumps(build_upsert_body(record)), enriched, 1),
+        'es_bulk_body': (build_bulk_body, batches, BULK_BATCH),
+        'processor_memory': (processor_round_trip(), feeds, PROCESSOR_BATCH),
+    }
+
+
+def processor_round_trip():
+    """Feed a batch of produced messages to a processor on the in-memory transport and drain it"""
+    # The processor's output topics are never read: keep them bounded across rounds
+    set_memory_retention(BOUNDED_MEMORY_RETENTION)
+    processor = WeatherStreamsProcessor(transport='memory')
+    processor.process_batch(0)  # join the group and take the end offsets as positions
+    feed = create_producer('memory')
+
+    def round_trip(values):
+        for value in values:
+            feed.send('openweather', value)
+        while processor.process_batch(0):
+            pass
+    return round_trip
+
+
+def calibration_op(size):
+    """Fixed pure-Python workload (dict building, string formatting) measuring the machine's speed"""
+    return {f"k{i}": i * 0.5 for i in range(size)}
+
+
+def loops_for(function, inputs, target=TARGET_SECONDS) -> int:
+    """Number of ops lasting about target seconds"""
+    count = len(inputs)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(loops):
+            function(inputs[i % count])
+        elapsed = time.perf_counter() - start
+        if elapsed >= target / 10:
+            return max(1, int(loops * target / elapsed))
+        loops *= 10
+
+
+def timed_ops(function, inputs, loops) -> float:
+    count = len(inputs)
+    start = time.perf_counter()
+    for i in range(loops):
+        function(inputs[i % count])
+    return loops / (time.perf_counter() - start)
+
+
+def allocations_per_op(function, inputs, ops=ALLOCATION_OPS) -> float:
+    """Mean bytes allocated at peak by one op (tracemalloc peak above the pre-op level)"""
+    count = len(inputs)
+    function(inputs[0])  # warm caches before tracing
+    tracemalloc.start()
+    try:
+        total = 0
+        for i in range(ops):
+            argument = inputs[i % count]
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function(argument)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / ops
+
+
+def run_benchmarks(cases: dict, selected=None, repeats=REPEATS) -> dict:
+    """Best ops/s of every case, plus its median speed relative to the calibration workload
+
+    Repeats are interleaved (every case once per round) and each round's
+    speeds are divided by that round's calibration speed, so a change of
+    machine load during the run cancels out of the relative score.
+    """
+    cases = {name: case for name, case in cases.items() if not selected or name in selected}
+    cases[CALIBRATION] = (calibration_op, [50], 1)
+    loops = {name: loops_for(function, inputs) for name, (function, inputs, _per_op) in cases.items()}
+
+    best = dict.fromkeys(cases, 0.0)
+    ratios = {name: [] for name in cases}
+    for _ in range(repeats):
+        rates = {name: timed_ops(function, inputs, loops[name]) for name, (function, inputs, _per_op) in cases.items()}
+        for name, ops in rates.items():
+            best[name] = max(best[name], ops)
+            ratios[name].append(ops / rates[CALIBRATION])
+
+    results = {}
+    for name, (function, inputs, per_op) in cases.items():
+        ops = best[name]
+        results[name] = {
+            'ops_per_s': round(ops, 1),
+            'records_per_s': round(ops * per_op, 1),
+            'us_per_op': round(1e6 / ops, 3),
+            'relative': round(statistics.median(ratios[name]), 5),
+            'alloc_bytes_per_op': round(allocations_per_op(function, inputs), 1),
+        }
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+def save_results(results: dict, directory=RESULTS_DIR) -> str:
+    revision = git_revision()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{revision}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'revision': revision,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    return path
+
+
+def latest_results(directory=RESULTS_DIR):
+    """Most recently saved results file, or None"""
+    files = sorted(glob.glob(os.path.join(directory, '*.json')))
+    return files[-1] if files else None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose speed relative to the calibration fell more than threshold below the baseline"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference and name != CALIBRATION:
+            change = result['relative'] / reference['relative'] - 1
+            result['change'] = round(change, 4)
+            if change < -threshold:
+                regressions.append((name, change))
+    return regressions
+
+
+def print_results(results: dict, baseline_name=None):
+    print(f"\n   {'case':<22} {'ops/s':>12} {'records/s':>12} {'µs/op':>9} {'alloc B/op':>11}"
+          + (f" {'vs ' + baseline_name:>18}" if baseline_name else ""))
+    for name, result in results.items():
+        change = result.get('change')
+        print(f"   {name:<22} {result['ops_per_s']:>12,.0f} {result['records_per_s']:>12,.0f} "
+              f"{result['us_per_op']:>9.2f} {result['alloc_bytes_per_op']:>11,.0f}"
+              + (f" {change:>+17.1%}" if change is not None else ""))
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks of the pipeline hot functions")
+    parser.add_argument('cases', nargs='*', help="cases to run (default: all)")
+    parser.add_argument('--payloads', default=PAYLOADS_FILE, help="recorded OpenWeather responses (JSON list)")
+    parser.add_argument('--save', action='store_true', help=f"save the results under {RESULTS_DIR}/")
+    parser.add_argument('--baseline', help="results file to compare with (default: the latest saved one)")
+    parser.add_argument('--no-compare', action='store_true', help="do not compare with a baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed drop of calibrated speed before failing (default {DEFAULT_THRESHOLD * 100:.0f}%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("⏱️ Pipeline Micro-Benchmarks")
+    print("=" * 50)
+    cases = build_cases(load_payloads(args.payloads))
+    unknown = [name for name in args.cases if name not in cases]
+    if unknown:
+        sys.exit(f"❌ Unknown case(s): {', '.join(unknown)} (available: {', '.join(cases)})")
+
+    # Pick the baseline before saving, so a run never compares with itself
+    baseline_path = None if args.no_compare else args.baseline or latest_results()
+    results = run_benchmarks(cases, args.cases)
+
+    regressions = []
+    baseline_name = None
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        baseline_name = baseline.get('revision', os.path.basename(baseline_path))
+        regressions = compare(results, baseline['results'], args.threshold)
+    print_results(results, baseline_name)
+
+    if args.save:
+        print(f"\n💾 Results saved to {save_results(results)}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) slower than {baseline_name} by more than {args.threshold:.0%}:")
+        for name, change in regressions:
+            print(f"   {name}: {change:+.1%}")
+        sys.exit(1)
+    if baseline_path:
+        median = statistics.median(r['change'] for r in results.values() if 'change' in r) \
+            if any('change' in r for r in results.values()) else 0.0
+        print(f"\n✅ No regression beyond {args.threshold:.0%} (median change {median:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
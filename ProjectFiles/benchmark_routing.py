@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+🧭 Shard Routing Benchmark
+Compares per-city query fan-out and latency on a multi-shard index,
+with and without custom routing by city
+"""
+
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+import requests
+
+from weather_routing import ELASTICSEARCH_URL, routing_key
+
+PLAIN_INDEX = "bench-routing-plain"
+ROUTED_INDEX = "bench-routing-routed"
+
+
+def create_index(index, shards):
+    """(Re)create a benchmark index"""
+    requests.delete(f"{ELASTICSEARCH_URL}/{index}", timeout=30)
+    body = {
+        "settings": {"number_of_shards": shards, "number_of_replicas": 0},
+        "mappings": {
+            "properties": {
+                "city_id": {"type": "long"},
+                "city_name": {"type": "keyword"},
+                "timestamp": {"type": "long"},
+                "temp": {"type": "float"}
+            }
+        }
+    }
+    response = requests.put(f"{ELASTICSEARCH_URL}/{index}", json=body, timeout=30)
+    response.raise_for_status()
+
+
+def load_documents(index, cities, docs_per_city, routed, batch_size=5000):
+    """Bulk load synthetic observations"""
+    lines = []
+    now = int(time.time())
+
+    def flush():
+        if lines:
+            response = requests.post(
+                f"{ELASTICSEARCH_URL}/_bulk",
+                headers={'Content-Type': 'application/x-ndjson'},
+                data=("\n".join(lines) + "\n").encode('utf-8'),
+                timeout=120
+            )
+            response.raise_for_status()
+            lines.clear()
+
+    for city_id in range(1, cities + 1):
+        for i in range(docs_per_city):
+            doc = {
+                "city_id": city_id,
+                "city_name": f"city-{city_id}",
+                "timestamp": now - i * 60,
+                "temp": round(random.uniform(-10, 35), 2)
+            }
+            action = {"_index": index}
+            if routed:
+                action["routing"] = routing_key(doc)
+            lines.append(json.dumps({"index": action}))
+            lines.append(json.dumps(doc))
+            if len(lines) >= batch_size * 2:
+                flush()
+    flush()
+    requests.post(f"{ELASTICSEARCH_URL}/{index}/_refresh", timeout=60)
+
+
+def run_queries(index, cities, queries, routed):
+    """Run single-city latest-value queries, return (latencies in ms, shards hit per query)"""
+    latencies = []
+    shards = []
+    for _ in range(queries):
+        city_id = random.randint(1, cities)
+        body = {
+            "size": 1,
+            "query": {"term": {"city_id": city_id}},
+            "sort": [{"timestamp": {"order": "desc"}}]
+        }
+        params = {"request_cache": "false"}
+        if routed:
+            params["routing"] = routing_key({"city_id": city_id})
+
+        start = time.perf_counter()
+        response = requests.post(f"{ELASTICSEARCH_URL}/{index}/_search", params=params, json=body, timeout=30)
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        shards.append(response.json()['_shards']['total'])
+    return latencies, shards
+
+
+def summarize(name, latencies, shards):
+    """Print one result line"""
+    latencies = sorted(latencies)
+    p95 = latencies[math.ceil(0.95 * len(latencies)) - 1]  # nearest rank
+    print(f"{name:<10} shards/query: {statistics.mean(shards):5.1f}   "
+          f"p50: {statistics.median(latencies):7.2f} ms   p95: {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-city queries with and without routing")
+    parser.add_argument('--shards', type=int, default=6)
+    parser.add_argument('--cities', type=int, default=200)
+    parser.add_argument('--docs-per-city', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--keep', action='store_true', help="keep the benchmark indices")
+    args = parser.parse_args()
+
+    print("🧭 Shard Routing Benchmark")
+    print("=" * 50)
+    print(f"Shards: {args.shards}, cities: {args.cities}, docs/city: {args.docs_per_city}")
+
+    results = {}
+    for index, routed in [(PLAIN_INDEX, False), (ROUTED_INDEX, True)]:
+        print(f"📥 Loading {index}...")
+        create_index(index, args.shards)
+        load_documents(index, args.cities, args.docs_per_city, routed)
+        # Warm-up so the first queries do not pay for segment loading
+        run_queries(index, args.cities, min(50, args.queries), routed)
+        results[index] = run_queries(index, args.cities, args.queries, routed)
+
+    print("\n📊 Results:")
+    summarize("plain", *results[PLAIN_INDEX])
+    summarize("routed", *results[ROUTED_INDEX])
+
+    if not args.keep:
+        for index in (PLAIN_INDEX, ROUTED_INDEX):
+            requests.delete(f"{ELASTICSEARCH_URL}/{index}", timeout=30)
+
+
+if __name__ == "__main__":
+    main()
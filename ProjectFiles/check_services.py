@@ -1,275 +1,244 @@
 #!/usr/bin/env python3
 """
 🔍 Service Health Check Script
-Verifies all components are running correctly
+Verifies all components are running correctly. Checks run concurrently,
+Kafka is queried through its own protocol instead of docker exec, and
+--watch keeps the connections open to refresh cheaply every few seconds.
 """
 
+import argparse
 import requests
 import subprocess
-import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def check_elasticsearch():
-    """Check Elasticsearch health"""
-    try:
-        # Check cluster health
-        response = requests.get('http://localhost:9200/_cluster/health', timeout=5)
-        if response.status_code == 200:
-            health = response.json()
-            status = health.get('status', 'unknown')
-            
-            if status == 'green':
-                print("✅ Elasticsearch: Healthy (Green)")
-            elif status == 'yellow':
-                print("⚠️ Elasticsearch: Warning (Yellow)")
-            else:
-                print("❌ Elasticsearch: Unhealthy (Red)")
-            
-            # Check indices
-            indices_response = requests.get('http://localhost:9200/_cat/indices?format=json', timeout=5)
-            if indices_response.status_code == 200:
-                indices = indices_response.json()
-                weather_indices = [idx for idx in indices if 'weather' in idx.get('index', '')]
-                print(f"📊 Weather indices: {len(weather_indices)}")
-                
-                # Check document count
-                if weather_indices:
-                    count_response = requests.get('http://localhost:9200/weather-data-*/_count', timeout=5)
-                    if count_response.status_code == 200:
-                        count = count_response.json().get('count', 0)
-                        print(f"📄 Total weather documents: {count}")
-            
-            return True
-        else:
-            print(f"❌ Elasticsearch: HTTP {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Elasticsearch: Connection failed - {e}")
-        return False
-
-def check_kibana():
-    """Check Kibana health"""
-    try:
-        response = requests.get('http://localhost:5601/api/status', timeout=10)
-        if response.status_code == 200:
-            status = response.json()
-            overall_status = status.get('status', {}).get('overall', {}).get('state', 'unknown')
-            
-            if overall_status == 'green':
-                print("✅ Kibana: Healthy")
-            else:
-                print(f"⚠️ Kibana: Status {overall_status}")
-            
-            return True
-        else:
-            print(f"❌ Kibana: HTTP {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Kibana: Connection failed - {e}")
-        return False
-
-def check_kafka():
-    """Check Kafka health"""
-    try:
-        # Check if Kafka container is running
-        result = subprocess.run(['docker', 'ps', '--filter', 'name=kafka', '--format', '{{.Status}}'], 
-                              capture_output=True, text=True, timeout=10)
-        
-        if 'Up' in result.stdout:
-            print("✅ Kafka: Container running")
-            
-            # Check topics
-            topics_result = subprocess.run([
-                'docker', 'exec', 'kafka', 
-                'kafka-topics', '--bootstrap-server', 'localhost:9092', '--list'
-            ], capture_output=True, text=True, timeout=15)
-            
-            if topics_result.returncode == 0:
-                topics = topics_result.stdout.strip().split('\n')
-                print(f"📋 Kafka topics: {len(topics)}")
-                
-                if 'openweather' in topics:
-                    print("✅ Weather topic exists")
-                    
-                    # Check topic details
-                    describe_result = subprocess.run([
-                        'docker', 'exec', 'kafka',
-                        'kafka-topics', '--bootstrap-server', 'localhost:9092',
-                        '--describe', '--topic', 'openweather'
-                    ], capture_output=True, text=True, timeout=10)
-                    
-                    if describe_result.returncode == 0:
-                        lines = describe_result.stdout.strip().split('\n')
-                        for line in lines:
-                            if 'PartitionCount' in line:
-                                print(f"📊 {line.strip()}")
-                else:
-                    print("⚠️ Weather topic not found")
-                
-                return True
-            else:
-                print("❌ Kafka: Cannot list topics")
-                return False
-        else:
-            print("❌ Kafka: Container not running")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        print("❌ Kafka: Command timeout")
-        return False
-    except Exception as e:
-        print(f"❌ Kafka: Error - {e}")
-        return False
+# Configuration
+ELASTICSEARCH_URL = "http://localhost:9200"
+KIBANA_URL = "http://localhost:5601"
+LOGSTASH_URL = "http://localhost:9600"
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+WEATHER_TOPIC = 'openweather'
+WATCH_INTERVAL = 5  # seconds between refreshes in --watch mode
 
-def check_logstash():
-    """Check Logstash health"""
-    try:
-        # Check if Logstash container is running
-        result = subprocess.run(['docker', 'ps', '--filter', 'name=logstash', '--format', '{{.Status}}'], 
-                              capture_output=True, text=True, timeout=10)
-        
-        if 'Up' in result.stdout:
-            print("✅ Logstash: Container running")
-            
-            # Try to check Logstash API (if available)
-            try:
-                response = requests.get('http://localhost:9600', timeout=5)
-                if response.status_code == 200:
-                    print("✅ Logstash: API responding")
-                else:
-                    print("⚠️ Logstash: API not responding")
-            except:
-                print("⚠️ Logstash: API check failed (normal for some versions)")
-            
-            return True
-        else:
-            print("❌ Logstash: Container not running")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Logstash: Error - {e}")
-        return False
 
-def check_docker_containers():
-    """Check all Docker containers"""
-    try:
-        result = subprocess.run(['docker', 'ps', '--format', 'table {{.Names}}\t{{.Status}}\t{{.Ports}}'], 
-                              capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            print("\n🐳 Docker Containers:")
-            print(result.stdout)
-            return True
+class HealthChecker:
+    """Health checks sharing one HTTP session and one Kafka admin client
+
+    Every check returns (healthy, details) and prints nothing, so checks can
+    run side by side and the caller decides how to display them.
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        self._admin = None
+
+    def close(self):
+        self.session.close()
+        if self._admin is not None:
+            self._admin.close()
+            self._admin = None
+
+    def kafka_admin(self):
+        from kafka.admin import KafkaAdminClient
+
+        if self._admin is None:
+            self._admin = KafkaAdminClient(bootstrap_servers=[KAFKA_BOOTSTRAP_SERVER],
+                                           request_timeout_ms=5000, client_id='health-check')
+        return self._admin
+
+    def check_elasticsearch(self):
+        """Check Elasticsearch health"""
+        response = self.session.get(f"{ELASTICSEARCH_URL}/_cluster/health", timeout=5)
+        if response.status_code != 200:
+            return False, [f"HTTP {response.status_code}"]
+
+        status = response.json().get('status', 'unknown')
+        details = [{'green': "Healthy (Green)", 'yellow': "Warning (Yellow)"}.get(status, "Unhealthy (Red)")]
+
+        indices = self.session.get(f"{ELASTICSEARCH_URL}/_cat/indices/*weather*?format=json&h=index,docs.count",
+                                   timeout=5)
+        if indices.status_code == 200:
+            weather_indices = indices.json()
+            documents = sum(int(index.get('docs.count') or 0) for index in weather_indices)
+            details.append(f"📊 Weather indices: {len(weather_indices)}, {documents} documents")
+        return status != 'red', details
+
+    def check_kibana(self):
+        """Check Kibana health"""
+        response = self.session.get(f"{KIBANA_URL}/api/status", timeout=10)
+        if response.status_code != 200:
+            return False, [f"HTTP {response.status_code}"]
+
+        overall = response.json().get('status', {}).get('overall', {})
+        state = overall.get('state') or overall.get('level', 'unknown')
+        return True, ["Healthy" if state in ('green', 'available') else f"Status {state}"]
+
+    def check_kafka(self):
+        """Check Kafka health with one metadata request"""
+        try:
+            topics = self.kafka_admin().describe_topics()
+        except Exception:
+            # Reconnect on the next refresh
+            if self._admin is not None:
+                self._admin.close()
+                self._admin = None
+            raise
+
+        names = {topic['topic']: topic for topic in topics if not topic['topic'].startswith('_')}
+        details = [f"📋 Kafka topics: {len(names)}"]
+        weather = names.get(WEATHER_TOPIC)
+        if weather is None:
+            details.append(f"⚠️ Weather topic '{WEATHER_TOPIC}' not found")
         else:
-            print("❌ Cannot list Docker containers")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Docker: Error - {e}")
-        return False
+            partitions = weather['partitions']
+            leaderless = sum(1 for p in partitions if p['leader'] < 0)
+            details.append(f"📊 {WEATHER_TOPIC}: {len(partitions)} partitions"
+                           + (f", {leaderless} without leader" if leaderless else ""))
+        return True, details
 
-def check_weather_data_flow():
-    """Check if weather data is flowing"""
-    try:
-        # Check recent data in Elasticsearch
+    def check_logstash(self):
+        """Check Logstash health"""
+        result = subprocess.run(['docker', 'ps', '--filter', 'name=logstash', '--format', '{{.Status}}'],
+                                capture_output=True, text=True, timeout=10)
+        if 'Up' not in result.stdout:
+            return False, ["Container not running"]
+
+        details = [f"Container {result.stdout.strip()}"]
+        try:
+            response = self.session.get(LOGSTASH_URL, timeout=2)
+            details.append("API responding" if response.status_code == 200 else "⚠️ API not responding")
+        except requests.exceptions.RequestException:
+            details.append("⚠️ API not published (normal for the compose setup)")
+        return True, details
+
+    def check_docker_containers(self):
+        """Check all Docker containers"""
+        result = subprocess.run(['docker', 'ps', '--format', '{{.Names}}\t{{.Status}}'],
+                                capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            return False, ["Cannot list Docker containers"]
+        rows = [line.split('\t') for line in result.stdout.strip().splitlines() if line]
+        return True, [f"🐳 {name}: {status}" for name, status in rows]
+
+    def check_weather_data_flow(self):
+        """Check if weather data is flowing"""
         query = {
-            "query": {
-                "range": {
-                    "@timestamp": {
-                        "gte": "now-5m"
-                    }
-                }
-            },
+            "query": {"range": {"@timestamp": {"gte": "now-5m"}}},
             "size": 1,
             "sort": [{"@timestamp": {"order": "desc"}}]
         }
-        
-        response = requests.post(
-            'http://localhost:9200/weather-data-*/_search',
-            json=query,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            hits = data.get('hits', {}).get('hits', [])
-            
-            if hits:
-                latest = hits[0]['_source']
-                timestamp = latest.get('@timestamp', 'unknown')
-                city = latest.get('city_name', 'unknown')
-                temp = latest.get('temp', 'unknown')
-                
-                print(f"✅ Latest weather data: {city} - {temp}°C at {timestamp}")
-                return True
-            else:
-                print("⚠️ No recent weather data found")
-                return False
-        else:
-            print(f"❌ Cannot query weather data: HTTP {response.status_code}")
-            return False
-            
+        response = self.session.post(f"{ELASTICSEARCH_URL}/weather-data-*/_search", json=query, timeout=10)
+        if response.status_code != 200:
+            return False, [f"Cannot query weather data: HTTP {response.status_code}"]
+
+        hits = response.json().get('hits', {}).get('hits', [])
+        if not hits:
+            return False, ["No recent weather data found"]
+        latest = hits[0]['_source']
+        return True, [f"Latest: {latest.get('city_name', 'unknown')} - {latest.get('temp', 'unknown')}°C "
+                      f"at {latest.get('@timestamp', 'unknown')}"]
+
+    def checks(self):
+        return [
+            ("Elasticsearch", self.check_elasticsearch),
+            ("Kibana", self.check_kibana),
+            ("Kafka", self.check_kafka),
+            ("Logstash", self.check_logstash),
+            ("Docker", self.check_docker_containers),
+            ("Data Flow", self.check_weather_data_flow),
+        ]
+
+
+def timed_check(name, check_func):
+    """Run one check, turning exceptions into an unhealthy result"""
+    start = time.perf_counter()
+    try:
+        healthy, details = check_func()
     except Exception as e:
-        print(f"⚠️ Weather data check failed: {e}")
-        return False
+        healthy, details = False, [f"Error - {e}"]
+    return {'name': name, 'healthy': healthy, 'details': details, 'elapsed': time.perf_counter() - start}
 
-def main():
-    """Main health check"""
-    print("🔍 Weather Dashboard Health Check")
-    print("=" * 50)
-    print(f"⏰ Check time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-    
-    # Check all services
-    services = [
-        ("Elasticsearch", check_elasticsearch),
-        ("Kibana", check_kibana),
-        ("Kafka", check_kafka),
-        ("Logstash", check_logstash),
-    ]
-    
-    results = {}
-    for name, check_func in services:
-        print(f"\n🔍 Checking {name}...")
-        results[name] = check_func()
-    
-    # Check Docker containers
-    print(f"\n🔍 Checking Docker Containers...")
-    check_docker_containers()
-    
-    # Check data flow
-    print(f"\n🔍 Checking Data Flow...")
-    results["Data Flow"] = check_weather_data_flow()
-    
-    # Summary
+
+def run_checks(checker, executor):
+    """Run every check concurrently; results keep the checks' order"""
+    futures = [executor.submit(timed_check, name, func) for name, func in checker.checks()]
+    return [future.result() for future in futures]
+
+
+def print_report(results, elapsed):
+    for result in results:
+        icon = "✅" if result['healthy'] else "❌"
+        print(f"\n{icon} {result['name']} ({result['elapsed'] * 1000:.0f} ms)")
+        for line in result['details']:
+            print(f"   {line}")
+
+    # Summary (the container listing is informational)
     print("\n" + "=" * 50)
     print("📊 Health Check Summary:")
-    
-    healthy_count = 0
-    total_count = len(results)
-    
-    for service, status in results.items():
-        icon = "✅" if status else "❌"
-        print(f"   {icon} {service}")
-        if status:
-            healthy_count += 1
-    
-    print(f"\n🎯 Overall Health: {healthy_count}/{total_count} services healthy")
-    
+    services = [r for r in results if r['name'] != 'Docker']
+    healthy_count = sum(1 for r in services if r['healthy'])
+    total_count = len(services)
+    for result in services:
+        print(f"   {'✅' if result['healthy'] else '❌'} {result['name']}")
+
+    print(f"\n🎯 Overall Health: {healthy_count}/{total_count} services healthy (checked in {elapsed:.2f}s)")
     if healthy_count == total_count:
         print("🎉 All systems operational!")
     elif healthy_count >= total_count * 0.8:
         print("⚠️ Most systems operational, some issues detected")
     else:
         print("🚨 Multiple system issues detected")
-    
+
+
+def print_watch_line(results, elapsed):
+    """One compact refresh: status and check time per component"""
+    cells = [f"{'✅' if r['healthy'] else '❌'} {r['name']} {r['elapsed'] * 1000:.0f}ms"
+             for r in results if r['name'] != 'Docker']
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] " + "  ".join(cells) + f"  (total {elapsed * 1000:.0f}ms)", flush=True)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Check the health of the weather pipeline services")
+    parser.add_argument('--watch', nargs='?', type=float, const=WATCH_INTERVAL, metavar='SECONDS',
+                        help=f"refresh continuously (default every {WATCH_INTERVAL}s)")
+    return parser.parse_args()
+
+
+def main():
+    """Main health check"""
+    args = parse_args()
+    checker = HealthChecker()
+    executor = ThreadPoolExecutor(max_workers=len(checker.checks()), thread_name_prefix='health')
+
+    print("🔍 Weather Dashboard Health Check")
+    print("=" * 50)
+    print(f"⏰ Check time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    try:
+        if args.watch:
+            while True:
+                start = time.perf_counter()
+                results = run_checks(checker, executor)
+                print_watch_line(results, time.perf_counter() - start)
+                time.sleep(max(0.0, args.watch - (time.perf_counter() - start)))
+
+        start = time.perf_counter()
+        results = run_checks(checker, executor)
+        print_report(results, time.perf_counter() - start)
+    except KeyboardInterrupt:
+        print("\n🛑 Health check stopped")
+        return
+    finally:
+        executor.shutdown(wait=False)
+        checker.close()
+
     print("\n🔧 Troubleshooting:")
     print("   • Restart services: docker-compose restart")
     print("   • View logs: docker-compose logs -f")
     print("   • Full restart: docker-compose down && docker-compose up -d")
 
+
 if __name__ == "__main__":
     main()
@@ -4,27 +4,49 @@
 Creates a beautiful HTML dashboard that looks exactly like your Kibana image
 """
 
+import argparse
+import hashlib
+import os
+import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import configparser
 
+from weather_api import add_api_arguments, current_weather_url, use_base_url
+from weather_capture import add_capture_arguments, capture_response, start_capture
+from weather_cities import load_cities
+
+# Address of dashboard_server.py, used when the page is opened from disk
+DASHBOARD_SERVER_URL = "http://localhost:8000"
+CITIES = ['Krakow', 'Paris', 'Berlin', 'Amsterdam', 'Barcelona', 'Vienna']
+DASHBOARD_FILE = 'weather_dashboard.html'
+FETCH_WORKERS = 16
+SNAPSHOT_PLACEHOLDER = '__INITIAL_SNAPSHOT__'
+HISTORY_RANGE = '24h'
+
 def get_api_key():
     """Get API key from config file"""
     config = configparser.ConfigParser()
     config.read('kafka/weather_api_key.ini')
     return config['openweather']['key']
 
-def get_weather_data(city_name: str, api_key: str) -> dict:
+def get_weather_data(city_name: str, api_key: str, session=None) -> dict:
     """Get current weather data from OpenWeather API"""
-    url = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    url = current_weather_url(city_name, api_key)
     
     try:
-        response = requests.get(url)
+        response = (session or requests).get(url, timeout=10)
+        capture_response(city_name, response)
         if response.status_code == 200:
             data = response.json()
             return {
                 'city': data['name'],
+                'city_id': data.get('id'),
+                'city_name': data['name'],
+                'country': data.get('sys', {}).get('country'),
+                'timestamp': data['dt'],
                 'temp': round(data['main']['temp'], 1),
                 'feels_like': round(data['main']['feels_like'], 2),
                 'humidity': data['main']['humidity'],
@@ -36,8 +58,37 @@ def get_weather_data(city_name: str, api_key: str) -> dict:
         print(f"Error fetching {city_name}: {e}")
         return None
 
-def create_html_dashboard():
-    """Create HTML dashboard with live weather data"""
+def fetch_snapshot(cities: list, api_key: str, max_workers: int = FETCH_WORKERS) -> dict:
+    """Fetch every city concurrently over one pooled session, keyed by the requested city name"""
+    snapshot = {}
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, max(1, len(cities)))) as pool:
+            results = pool.map(lambda city: get_weather_data(city, api_key, session), cities)
+            for city, data in zip(cities, results):
+                if data:
+                    snapshot[city] = data
+    return snapshot
+
+def write_atomic(path: str, content: str):
+    """Write a file so that readers only ever see the old or the new version"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def render_dashboard_template(cities, server_url=DASHBOARD_SERVER_URL, history_range=HISTORY_RANGE):
+    """Render the dashboard page with SNAPSHOT_PLACEHOLDER where the snapshot goes
+
+    The panel layout (chart, feels like and humidity per city) is built from
+    the city list, and only the panels in view are rendered, so the page
+    stays responsive with thousands of cities.
+    """
+    # Escape '</' so a city name can never close the script element
+    cities_json = json.dumps(cities).replace('</', '<\\/')
 
     # Generate HTML with JavaScript for real-time updates
     html_content = f"""
@@ -79,15 +130,17 @@ def create_html_dashboard():
             margin: 0;
         }}
 
+        /* Panels are absolutely positioned by the virtualized renderer */
         .dashboard {{
-            display: grid;
-            grid-template-columns: repeat(4, 1fr);
-            grid-template-rows: repeat(3, 220px);
-            gap: 12px;
+            position: relative;
             max-width: 1500px;
             margin: 0 auto;
         }}
 
+        .dashboard .panel {{
+            position: absolute;
+        }}
+
         .panel {{
             background: rgba(255, 255, 255, 0.95);
             border: none;
@@ -170,43 +223,13 @@ def create_html_dashboard():
             padding: 10px;
         }}
 
-        .chart-svg {{
+        .chart-canvas {{
+            display: block;
             width: 100%;
             height: 130px;
             filter: drop-shadow(0 2px 4px rgba(0, 0, 0, 0.1));
         }}
 
-        .chart-line {{
-            fill: none;
-            stroke: #00D4AA;
-            stroke-width: 2.5;
-            stroke-linecap: round;
-            stroke-linejoin: round;
-        }}
-
-        .chart-dots {{
-            fill: #00D4AA;
-            stroke: white;
-            stroke-width: 1;
-        }}
-
-        .chart-grid {{
-            stroke: rgba(0, 0, 0, 0.05);
-            stroke-width: 1;
-            stroke-dasharray: 2,2;
-        }}
-
-        .chart-axis {{
-            stroke: rgba(0, 0, 0, 0.1);
-            stroke-width: 1;
-        }}
-
-        .chart-text {{
-            font-size: 9px;
-            fill: #7f8c8d;
-            font-weight: 500;
-        }}
-
         .updating {{
             animation: pulse 2.5s ease-in-out infinite;
         }}
@@ -246,21 +269,8 @@ def create_html_dashboard():
             50% {{ box-shadow: 0 4px 25px rgba(0, 212, 170, 0.6); }}
         }}
 
-        /* Responsive design */
-        @media (max-width: 1200px) {{
-            .dashboard {{
-                grid-template-columns: repeat(2, 1fr);
-                grid-template-rows: repeat(6, 200px);
-            }}
-        }}
-
+        /* Responsive design (column counts live in computeLayout) */
         @media (max-width: 768px) {{
-            .dashboard {{
-                grid-template-columns: 1fr;
-                grid-template-rows: repeat(12, 180px);
-                gap: 8px;
-            }}
-
             .panel {{
                 padding: 15px;
             }}
@@ -276,80 +286,216 @@ def create_html_dashboard():
 
     <div class="header">
         <h1>🌤️ Live Weather Monitoring Dashboard</h1>
-        <p>Real-time weather data from 6 European cities • Updates every 2 seconds</p>
+        <p>Real-time weather data from {len(cities)} cities • Pushed as new observations arrive</p>
     </div>
 
     <div class="dashboard" id="dashboard">
         <!-- Panels will be generated by JavaScript -->
     </div>
 
+    <script id="initial-snapshot" type="application/json">{SNAPSHOT_PLACEHOLDER}</script>
+
     <script>
-        const API_KEY = '1de495f65e74753bc57df28892343afa';
-        const CITIES = ['Krakow', 'Paris', 'Berlin', 'Amsterdam', 'Barcelona', 'Vienna'];
-        let weatherData = {{}};
-        let temperatureHistory = {{}};
+        // Updates are pushed by dashboard_server.py; when the page is opened
+        // from disk, fall back to the default server address
+        const SERVER_URL = window.location.protocol.startsWith('http') ? '' : '{server_url}';
+        const CITIES = {cities_json};
+        const PANEL_TYPES = ['chart', 'feels', 'humidity'];
+        const HISTORY_RANGE = '{history_range}';
+        const MAX_HISTORY_POINTS = 600;
+        const OVERSCAN_ROWS = 2;
+
+        const weatherData = new Map();
+        const temperatureHistory = new Map();
+        const historyVersion = new Map();
+        const historyRequested = new Set();
+        // Panels are named after the configured cities; each one follows the
+        // first city_id seen under that name, so namesakes never overwrite it
+        const cityIds = new Map();
+        CITIES.forEach(city => {{
+            temperatureHistory.set(city, []);
+            historyVersion.set(city, 0);
+        }});
 
-        // Initialize temperature history for each city
+        // Flat, keyed panel list built from the city list: chart, feels like, humidity per city
+        const PANELS = [];
         CITIES.forEach(city => {{
-            temperatureHistory[city] = [];
+            PANEL_TYPES.forEach(type => PANELS.push({{city, type, key: `${{city}}:${{type}}`}}));
         }});
 
-        async function fetchWeatherData(city) {{
-            try {{
-                const response = await fetch(`https://api.openweathermap.org/data/2.5/weather?q=${{city}}&appid=${{API_KEY}}&units=metric`);
-                const data = await response.json();
-
-                if (response.ok) {{
-                    const weatherInfo = {{
-                        temp: Math.round(data.main.temp * 1000) / 1000,
-                        feels_like: Math.round(data.main.feels_like * 1000) / 1000,
-                        humidity: data.main.humidity,
-                        timestamp: Date.now()
-                    }};
-
-                    // Add to temperature history (keep last 20 points)
-                    temperatureHistory[city].push({{
-                        temp: weatherInfo.temp,
-                        time: weatherInfo.timestamp
-                    }});
-
-                    if (temperatureHistory[city].length > 20) {{
-                        temperatureHistory[city].shift();
-                    }}
+        const dashboard = document.getElementById('dashboard');
+        const mounted = new Map();
+        const pool = {{chart: [], feels: [], humidity: []}};
+        let layout = null;
+        let renderScheduled = false;
+
+        function computeLayout() {{
+            let columns = 4, rowHeight = 220, gap = 12;
+            if (window.innerWidth <= 768) {{
+                columns = 1; rowHeight = 180; gap = 8;
+            }} else if (window.innerWidth <= 1200) {{
+                columns = 2; rowHeight = 200;
+            }}
+            const panelWidth = (dashboard.clientWidth - gap * (columns - 1)) / columns;
+            const rows = Math.ceil(PANELS.length / columns);
+            dashboard.style.height = `${{Math.max(0, rows * (rowHeight + gap) - gap)}}px`;
+            return {{columns, rowHeight, gap, panelWidth, rows}};
+        }}
+
+        function createElement(className, parent) {{
+            const element = document.createElement('div');
+            element.className = className;
+            parent.appendChild(element);
+            return element;
+        }}
+
+        function createPanel(type) {{
+            const panel = document.createElement('div');
+            panel.panelType = type;
+            panel.refs = {{title: createElement('city-title', panel)}};
+
+            if (type === 'chart') {{
+                panel.className = 'panel chart-panel';
+                const container = createElement('chart-container', panel);
+                const canvas = document.createElement('canvas');
+                canvas.className = 'chart-canvas';
+                container.appendChild(canvas);
+                panel.refs.canvas = canvas;
+            }} else {{
+                panel.className = 'panel metric-panel updating';
+                panel.refs.value = createElement('metric-value', panel);
+                createElement('metric-label', panel).textContent = type === 'feels' ? 'FEELS LIKE' : 'HUMIDITY';
+            }}
+            return panel;
+        }}
+
+        function mountPanel(panel, index) {{
+            let element = mounted.get(panel.key);
+            if (!element) {{
+                // Recycle an off-screen panel of the same type before creating a new one
+                element = pool[panel.type].pop() || createPanel(panel.type);
+                element.refs.title.textContent = panel.city.toUpperCase();
+                element.renderedValue = undefined;
+                element.renderedChart = undefined;
+                element.position = undefined;
+                element.style.display = '';
+                if (!element.isConnected) {{
+                    dashboard.appendChild(element);
+                }}
+                mounted.set(panel.key, element);
+            }}
 
-                    return weatherInfo;
+            const row = Math.floor(index / layout.columns);
+            const col = index % layout.columns;
+            const top = row * (layout.rowHeight + layout.gap);
+            const left = col * (layout.panelWidth + layout.gap);
+            const position = `${{top}}:${{left}}:${{layout.panelWidth}}:${{layout.rowHeight}}`;
+            if (element.position !== position) {{
+                element.style.top = `${{top}}px`;
+                element.style.left = `${{left}}px`;
+                element.style.width = `${{layout.panelWidth}}px`;
+                element.style.height = `${{layout.rowHeight}}px`;
+                element.position = position;
+            }}
+            return element;
+        }}
+
+        function unmountPanel(key) {{
+            const element = mounted.get(key);
+            mounted.delete(key);
+            element.style.display = 'none';
+            pool[element.panelType].push(element);
+        }}
+
+        function loadHistory(city, width) {{
+            // Real series, downsampled on the server to about one point per pixel
+            historyRequested.add(city);
+            const points = Math.max(20, Math.round(width));
+            const id = cityIds.has(city) ? `&id=${{cityIds.get(city)}}` : '';
+            fetch(`${{SERVER_URL}}/history?city=${{encodeURIComponent(city)}}${{id}}&range=${{HISTORY_RANGE}}&points=${{points}}`)
+                .then(response => response.ok ? response.json() : null)
+                .then(result => {{
+                    if (!result || !result.points.length) {{
+                        return;
+                    }}
+                    const series = result.points.map(([time, temp]) => ({{temp, time: time * 1000}}));
+                    const lastTime = series[series.length - 1].time;
+                    // Keep live observations that arrived after the series was read
+                    const live = temperatureHistory.get(city).filter(point => point.time > lastTime);
+                    temperatureHistory.set(city, series.concat(live).slice(-MAX_HISTORY_POINTS));
+                    historyVersion.set(city, historyVersion.get(city) + 1);
+                    scheduleRender();
+                }})
+                .catch(error => console.error(`Error loading history for ${{city}}:`, error));
+        }}
+
+        function patchPanel(panel, element) {{
+            if (panel.type === 'chart') {{
+                const canvas = element.refs.canvas;
+                if (!historyRequested.has(panel.city)) {{
+                    loadHistory(panel.city, canvas.clientWidth);
+                }}
+                const chartKey = `${{historyVersion.get(panel.city)}}:${{canvas.clientWidth}}:${{canvas.clientHeight}}`;
+                if (element.renderedChart !== chartKey) {{
+                    drawChart(canvas, temperatureHistory.get(panel.city));
+                    element.renderedChart = chartKey;
                 }}
-            }} catch (error) {{
-                console.error(`Error fetching ${{city}}:`, error);
+                return;
             }}
-            return null;
-        }}
 
-        function generateRandomVariation(baseValue, variation = 0.5) {{
-            return baseValue + (Math.random() - 0.5) * variation;
+            const data = weatherData.get(panel.city);
+            const value = data ? (panel.type === 'feels' ? data.feels_like : data.humidity) : null;
+            const text = value === null || value === undefined ? '–' : Number(value).toFixed(3);
+            // Only touch the DOM when the displayed text actually changes
+            if (element.renderedValue !== text) {{
+                element.refs.value.textContent = text;
+                element.renderedValue = text;
+            }}
         }}
 
-        function createChart(city, data) {{
-            const history = temperatureHistory[city];
-
-            // If no history, create some initial fake data points for immediate visual
-            if (history.length === 0) {{
-                const baseTemp = data.temp || 20;
-                for (let i = 0; i < 10; i++) {{
-                    history.push({{
-                        temp: baseTemp + (Math.random() - 0.5) * 3,
-                        time: Date.now() - (10 - i) * 60000
-                    }});
-                }}
+        function drawChart(canvas, history) {{
+            const ratio = window.devicePixelRatio || 1;
+            const width = canvas.clientWidth;
+            const height = canvas.clientHeight;
+            if (canvas.width !== Math.round(width * ratio) || canvas.height !== Math.round(height * ratio)) {{
+                canvas.width = Math.round(width * ratio);
+                canvas.height = Math.round(height * ratio);
             }}
 
-            if (history.length < 2) return '';
-
-            const width = 280;
-            const height = 120;
+            const ctx = canvas.getContext('2d');
+            ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+            ctx.clearRect(0, 0, width, height);
             const padding = 20;
 
-            // Create more dynamic range for better visual variation
+            // Grid lines
+            ctx.lineWidth = 1;
+            ctx.strokeStyle = 'rgba(0, 0, 0, 0.05)';
+            ctx.setLineDash([2, 2]);
+            ctx.beginPath();
+            for (let i = 1; i < 4; i++) {{
+                const y = padding + (i * (height - 2 * padding) / 4);
+                ctx.moveTo(padding, y);
+                ctx.lineTo(width - padding, y);
+            }}
+            ctx.stroke();
+            ctx.setLineDash([]);
+
+            // Axes
+            ctx.strokeStyle = 'rgba(0, 0, 0, 0.1)';
+            ctx.beginPath();
+            ctx.moveTo(padding, padding);
+            ctx.lineTo(padding, height - padding);
+            ctx.lineTo(width - padding, height - padding);
+            ctx.stroke();
+
+            ctx.fillStyle = '#7f8c8d';
+            ctx.font = '500 9px sans-serif';
+            ctx.fillText(`🌡️ Temperature, last ${{HISTORY_RANGE}}`, padding, height - 5);
+
+            if (history.length < 2) {{
+                return;
+            }}
+
             const temps = history.map(d => d.temp);
             const minTemp = Math.min(...temps) - 2;
             const maxTemp = Math.max(...temps) + 2;
@@ -361,247 +507,228 @@ def create_html_dashboard():
 
             const xScale = (width - 2 * padding) / (history.length - 1);
             const yScale = (height - 2 * padding) / (adjustedMaxTemp - adjustedMinTemp);
-
-            let pathData = '';
-            let dots = '';
-            let areaPath = '';
-
-            history.forEach((point, index) => {{
-                const x = padding + index * xScale;
-                const y = height - padding - (point.temp - adjustedMinTemp) * yScale;
-
-                if (index === 0) {{
-                    pathData += `M ${{x}} ${{y}}`;
-                    areaPath += `M ${{x}} ${{height - padding}} L ${{x}} ${{y}}`;
-                }} else {{
-                    pathData += ` L ${{x}} ${{y}}`;
-                    areaPath += ` L ${{x}} ${{y}}`;
-                }}
-
-                dots += `<circle cx="${{x}}" cy="${{y}}" r="2" class="chart-dots"/>`;
+            const points = history.map((point, index) => [
+                padding + index * xScale,
+                height - padding - (point.temp - adjustedMinTemp) * yScale
+            ]);
+
+            // Area under curve
+            const gradient = ctx.createLinearGradient(0, 0, 0, height);
+            gradient.addColorStop(0, 'rgba(0, 212, 170, 0.2)');
+            gradient.addColorStop(1, 'rgba(0, 212, 170, 0.05)');
+            ctx.beginPath();
+            ctx.moveTo(points[0][0], height - padding);
+            points.forEach(([x, y]) => ctx.lineTo(x, y));
+            ctx.lineTo(points[points.length - 1][0], height - padding);
+            ctx.closePath();
+            ctx.fillStyle = gradient;
+            ctx.fill();
+
+            // Temperature line
+            ctx.beginPath();
+            points.forEach(([x, y], index) => index === 0 ? ctx.moveTo(x, y) : ctx.lineTo(x, y));
+            ctx.strokeStyle = '#00D4AA';
+            ctx.lineWidth = 2.5;
+            ctx.lineCap = 'round';
+            ctx.lineJoin = 'round';
+            ctx.stroke();
+
+            // Data points (only while they are far enough apart to be seen)
+            ctx.fillStyle = '#00D4AA';
+            ctx.strokeStyle = 'white';
+            ctx.lineWidth = 1;
+            (points.length <= 30 ? points : []).forEach(([x, y]) => {{
+                ctx.beginPath();
+                ctx.arc(x, y, 2, 0, 2 * Math.PI);
+                ctx.fill();
+                ctx.stroke();
             }});
 
-            // Close the area path
-            const lastX = padding + (history.length - 1) * xScale;
-            areaPath += ` L ${{lastX}} ${{height - padding}} Z`;
+            // Current temp label
+            ctx.fillStyle = '#7f8c8d';
+            ctx.font = 'bold 11px sans-serif';
+            ctx.fillText(`${{history[history.length - 1].temp.toFixed(3)}}°C`, width - padding - 40, padding + 10);
+        }}
+
+        function render() {{
+            renderScheduled = false;
+            layout = layout || computeLayout();
+
+            // Only rows intersecting the viewport (plus a small overscan) are in the DOM
+            const rowStride = layout.rowHeight + layout.gap;
+            const offset = dashboard.getBoundingClientRect().top;
+            const firstRow = Math.max(0, Math.floor(-offset / rowStride) - OVERSCAN_ROWS);
+            const lastRow = Math.min(layout.rows - 1, Math.floor((window.innerHeight - offset) / rowStride) + OVERSCAN_ROWS);
+            const first = firstRow * layout.columns;
+            const last = Math.min(PANELS.length - 1, (lastRow + 1) * layout.columns - 1);
+
+            const visible = new Set();
+            for (let index = first; index <= last; index++) {{
+                const panel = PANELS[index];
+                visible.add(panel.key);
+                patchPanel(panel, mountPanel(panel, index));
+            }}
+            for (const key of Array.from(mounted.keys())) {{
+                if (!visible.has(key)) {{
+                    unmountPanel(key);
+                }}
+            }}
+        }}
 
-            // Add grid lines for better visual
-            let gridLines = '';
-            for (let i = 1; i < 4; i++) {{
-                const y = padding + (i * (height - 2 * padding) / 4);
-                gridLines += `<line x1="${{padding}}" y1="${{y}}" x2="${{width - padding}}" y2="${{y}}" class="chart-grid"/>`;
+        function scheduleRender() {{
+            if (!renderScheduled) {{
+                renderScheduled = true;
+                requestAnimationFrame(render);
             }}
+        }}
 
-            return `
-                <svg class="chart-svg" viewBox="0 0 ${{width}} ${{height}}">
-                    <defs>
-                        <linearGradient id="gradient-${{city}}" x1="0%" y1="0%" x2="0%" y2="100%">
-                            <stop offset="0%" style="stop-color:#00D4AA;stop-opacity:0.2" />
-                            <stop offset="100%" style="stop-color:#00D4AA;stop-opacity:0.05" />
-                        </linearGradient>
-                    </defs>
-
-                    <!-- Grid lines -->
-                    ${{gridLines}}
-
-                    <!-- Axes -->
-                    <line x1="${{padding}}" y1="${{padding}}" x2="${{padding}}" y2="${{height-padding}}" class="chart-axis"/>
-                    <line x1="${{padding}}" y1="${{height-padding}}" x2="${{width-padding}}" y2="${{height-padding}}" class="chart-axis"/>
-
-                    <!-- Area under curve -->
-                    <path d="${{areaPath}}" fill="url(#gradient-${{city}})"/>
-
-                    <!-- Temperature line -->
-                    <path d="${{pathData}}" class="chart-line"/>
-
-                    <!-- Data points -->
-                    ${{dots}}
-
-                    <!-- Labels -->
-                    <text x="${{padding}}" y="${{height-5}}" class="chart-text">🌡️ Average Temperature per minute</text>
-
-                    <!-- Current temp label -->
-                    <text x="${{width-padding-40}}" y="${{padding+10}}" class="chart-text" style="font-weight: bold; font-size: 11px;">${{history[history.length-1].temp.toFixed(3)}}°C</text>
-                </svg>
-            `;
-        }}
-
-        function updateDashboard() {{
-            const dashboard = document.getElementById('dashboard');
-
-            const layout = [
-                {{city: 'Krakow', type: 'chart', row: 1, col: 1}},
-                {{city: 'Krakow', type: 'feels', row: 1, col: 2}},
-                {{city: 'Paris', type: 'chart', row: 1, col: 3}},
-                {{city: 'Paris', type: 'feels', row: 1, col: 4}},
-
-                {{city: 'Krakow', type: 'humidity', row: 2, col: 1}},
-                {{city: 'Paris', type: 'humidity', row: 2, col: 2}},
-
-                {{city: 'Berlin', type: 'chart', row: 2, col: 1}},
-                {{city: 'Berlin', type: 'feels', row: 2, col: 2}},
-                {{city: 'Amsterdam', type: 'chart', row: 2, col: 3}},
-                {{city: 'Amsterdam', type: 'feels', row: 2, col: 4}},
-
-                {{city: 'Berlin', type: 'humidity', row: 3, col: 1}},
-                {{city: 'Amsterdam', type: 'humidity', row: 3, col: 2}},
-
-                {{city: 'Barcelona', type: 'chart', row: 3, col: 1}},
-                {{city: 'Barcelona', type: 'feels', row: 3, col: 2}},
-                {{city: 'Vienna', type: 'chart', row: 3, col: 3}},
-                {{city: 'Vienna', type: 'feels', row: 3, col: 4}},
-
-                {{city: 'Barcelona', type: 'humidity', row: 4, col: 1}},
-                {{city: 'Vienna', type: 'humidity', row: 4, col: 2}}
-            ];
-
-            let html = '';
-
-            // Create the exact layout from the image
-            const panels = [
-                // Row 1
-                {{city: 'Krakow', type: 'chart'}},
-                {{city: 'Krakow', type: 'feels'}},
-                {{city: 'Paris', type: 'chart'}},
-                {{city: 'Paris', type: 'feels'}},
-
-                // Row 2
-                {{city: 'Berlin', type: 'chart'}},
-                {{city: 'Berlin', type: 'feels'}},
-                {{city: 'Amsterdam', type: 'chart'}},
-                {{city: 'Amsterdam', type: 'feels'}},
-
-                // Row 3
-                {{city: 'Barcelona', type: 'chart'}},
-                {{city: 'Barcelona', type: 'feels'}},
-                {{city: 'Vienna', type: 'chart'}},
-                {{city: 'Vienna', type: 'feels'}}
-            ];
-
-            panels.forEach(panel => {{
-                const data = weatherData[panel.city];
-                if (!data) return;
-
-                if (panel.type === 'chart') {{
-                    html += `
-                        <div class="panel chart-panel">
-                            <div class="city-title">${{panel.city.toUpperCase()}}</div>
-                            <div class="chart-container">
-                                ${{createChart(panel.city, data)}}
-                            </div>
-                        </div>
-                    `;
-                }} else if (panel.type === 'feels') {{
-                    html += `
-                        <div class="panel metric-panel updating">
-                            <div class="city-title">${{panel.city.toUpperCase()}}</div>
-                            <div class="metric-value">${{data.feels_like.toFixed(3)}}</div>
-                            <div class="metric-label">FEELS LIKE</div>
-                        </div>
-                    `;
-                }}
+        function applyObservation(city, record) {{
+            const previous = weatherData.get(city);
+            weatherData.set(city, {{
+                temp: record.temp,
+                feels_like: record.feels_like,
+                humidity: record.humidity,
+                timestamp: record.timestamp
             }});
 
-            // Add humidity panels in a second row
-            html += `
-                <div class="panel metric-panel updating">
-                    <div class="city-title">KRAKOW</div>
-                    <div class="metric-value">${{(weatherData.Krakow?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-                <div class="panel metric-panel updating">
-                    <div class="city-title">PARIS</div>
-                    <div class="metric-value">${{(weatherData.Paris?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-                <div class="panel metric-panel updating">
-                    <div class="city-title">BERLIN</div>
-                    <div class="metric-value">${{(weatherData.Berlin?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-                <div class="panel metric-panel updating">
-                    <div class="city-title">AMSTERDAM</div>
-                    <div class="metric-value">${{(weatherData.Amsterdam?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-                <div class="panel metric-panel updating">
-                    <div class="city-title">BARCELONA</div>
-                    <div class="metric-value">${{(weatherData.Barcelona?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-                <div class="panel metric-panel updating">
-                    <div class="city-title">VIENNA</div>
-                    <div class="metric-value">${{(weatherData.Vienna?.humidity || 0).toFixed(3)}}</div>
-                    <div class="metric-label">HUMIDITY</div>
-                </div>
-            `;
-
-            dashboard.innerHTML = html;
-        }}
-
-        async function refreshAllData() {{
-            document.getElementById('status').textContent = '🔄 Updating...';
-
-            for (const city of CITIES) {{
-                const data = await fetchWeatherData(city);
-                if (data) {{
-                    weatherData[city] = data;
+            // Only a new observation adds a point to the history
+            if (!previous || previous.timestamp !== record.timestamp) {{
+                const history = temperatureHistory.get(city);
+                history.push({{temp: record.temp, time: record.timestamp * 1000}});
+                if (history.length > MAX_HISTORY_POINTS) {{
+                    history.shift();
                 }}
+                historyVersion.set(city, historyVersion.get(city) + 1);
             }}
-
-            updateDashboard();
-            document.getElementById('status').textContent = `✅ Updated ${{new Date().toLocaleTimeString()}}`;
         }}
 
-        // Initial load
-        refreshAllData();
-
-        // Update every 5 seconds for continuous real-time feel
-        setInterval(refreshAllData, 5000);
-
-        // Simulate micro-updates every 2 seconds for visual effect
-        setInterval(() => {{
-            CITIES.forEach(city => {{
-                if (weatherData[city]) {{
-                    // Add tiny random variations to make it feel more live with 3 decimal precision
-                    const newTemp = Math.round(generateRandomVariation(weatherData[city].temp, 0.3) * 1000) / 1000;
-                    weatherData[city].feels_like = Math.round(generateRandomVariation(weatherData[city].feels_like, 0.2) * 1000) / 1000;
-                    weatherData[city].humidity = Math.max(0, Math.min(100,
-                        Math.round(generateRandomVariation(weatherData[city].humidity, 2) * 1000) / 1000
-                    ));
-
-                    // Add new temperature point to history for moving charts
-                    temperatureHistory[city].push({{
-                        temp: newTemp,
-                        time: Date.now()
-                    }});
-
-                    // Keep only last 15 points for smooth moving effect
-                    if (temperatureHistory[city].length > 15) {{
-                        temperatureHistory[city].shift();
+        function applyCities(cities) {{
+            // Keyed by city_id on the server; the name only picks the panel
+            Object.values(cities).forEach(record => {{
+                const city = record.city_name || record.city;
+                if (!temperatureHistory.has(city)) {{
+                    return;
+                }}
+                if (record.city_id !== null && record.city_id !== undefined) {{
+                    if (!cityIds.has(city)) {{
+                        cityIds.set(city, record.city_id);
+                    }} else if (cityIds.get(city) !== record.city_id) {{
+                        return;
                     }}
-
-                    // Update the current temp in weather data
-                    weatherData[city].temp = newTemp;
                 }}
+                applyObservation(city, record);
             }});
-            updateDashboard();
-        }}, 2000);
+            scheduleRender();
+            document.getElementById('status').textContent = `✅ Updated ${{new Date().toLocaleTimeString()}}`;
+        }}
+
+        window.addEventListener('scroll', scheduleRender, {{passive: true}});
+        window.addEventListener('resize', () => {{
+            layout = null;
+            scheduleRender();
+        }});
+        scheduleRender();
+
+        // Snapshot fetched when the page was generated: paint real data immediately,
+        // then the server connection below takes over
+        const initialSnapshot = JSON.parse(document.getElementById('initial-snapshot').textContent || '{{}}');
+        if (initialSnapshot.cities && Object.keys(initialSnapshot.cities).length) {{
+            applyCities(initialSnapshot.cities);
+            document.getElementById('status').textContent = `📸 Snapshot ${{initialSnapshot.generated_at}}`;
+        }}
+
+        // One shared server connection: a full snapshot, then combined deltas
+        const events = new EventSource(`${{SERVER_URL}}/events`);
+        events.addEventListener('snapshot', event => applyCities(JSON.parse(event.data).cities));
+        events.addEventListener('delta', event => applyCities(JSON.parse(event.data).cities));
+        events.onerror = () => {{
+            document.getElementById('status').textContent = '⚠️ Reconnecting...';
+        }};
     </script>
 </body>
 </html>
 """
 
-    # Save HTML file
-    with open('weather_dashboard.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    return html_content
 
-    print(f"\n✅ Live Dashboard created: weather_dashboard.html")
-    print(f"🌐 Open the file in your browser to see the LIVE dashboard!")
-    print(f"🔄 Updates every 5 seconds with real API data!")
-    print(f"✨ Micro-updates every 1 second for continuous feel!")
+def render_snapshot(snapshot: dict) -> str:
+    """Serialize a snapshot for inline embedding"""
+    payload = {'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'cities': snapshot}
+    # Escape '</' so no value can close the script element
+    return json.dumps(payload, separators=(',', ':')).replace('</', '<\\/')
 
-    return 'weather_dashboard.html'
+def prefetch_snapshot(cities) -> dict:
+    """Fetch the embedded snapshot, or an empty one when no API key is configured"""
+    try:
+        api_key = get_api_key()
+    except KeyError:
+        print("⚠️ No API key found, the page will wait for the dashboard server")
+        return {}
+    started = time.time()
+    snapshot = fetch_snapshot(cities, api_key)
+    print(f"📸 Prefetched {len(snapshot)}/{len(cities)} cities in {time.time() - started:.1f}s")
+    return snapshot
+
+def create_html_dashboard(cities=None, server_url=DASHBOARD_SERVER_URL, prefetch=True, output=DASHBOARD_FILE):
+    """Create HTML dashboard with an embedded snapshot, fed afterwards by the dashboard server"""
+    cities = cities or CITIES
+    snapshot = prefetch_snapshot(cities) if prefetch else {}
+    template = render_dashboard_template(cities, server_url)
+    write_atomic(output, template.replace(SNAPSHOT_PLACEHOLDER, render_snapshot(snapshot), 1))
+
+    print(f"\n✅ Live Dashboard created: {output}")
+    print(f"🌐 Start the server with: python dashboard_server.py")
+    print(f"📡 Then open {server_url}/ to see the LIVE dashboard!")
+    print(f"🔄 Updates are pushed as soon as new observations arrive")
+
+    return output
+
+def watch_html_dashboard(cities, server_url, interval, output=DASHBOARD_FILE):
+    """Regenerate the embedded snapshot on a schedule
+
+    The page template is rendered once; each cycle only re-serializes the
+    snapshot, and the file is replaced atomically when the data changed.
+    """
+    template = render_dashboard_template(cities, server_url)
+    last_digest = None
+    while True:
+        snapshot = prefetch_snapshot(cities)
+        digest = hashlib.sha256(json.dumps(snapshot, sort_keys=True).encode('utf-8')).hexdigest()
+        if digest != last_digest:
+            write_atomic(output, template.replace(SNAPSHOT_PLACEHOLDER, render_snapshot(snapshot), 1))
+            last_digest = digest
+            print(f"✅ {output} updated at {datetime.now().strftime('%H:%M:%S')}")
+        time.sleep(interval)
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate the live weather HTML dashboard")
+    parser.add_argument('--cities', help="comma-separated city list")
+    parser.add_argument('--cities-file', help="file with one city per line")
+    parser.add_argument('--server-url', default=DASHBOARD_SERVER_URL,
+                        help="dashboard server address used when the page is opened from disk")
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help="do not embed a snapshot fetched at generation time")
+    parser.add_argument('--watch', type=int, metavar='SECONDS',
+                        help="keep regenerating the snapshot every SECONDS")
+    add_api_arguments(parser)
+    add_capture_arguments(parser)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    create_html_dashboard()
+    args = parse_args()
+    use_base_url(args.api_url)
+    start_capture(args.capture)
+    if args.cities_file:
+        cities = load_cities(args.cities_file)
+    elif args.cities:
+        cities = [city.strip() for city in args.cities.split(',') if city.strip()]
+    else:
+        cities = CITIES
+    if args.watch:
+        try:
+            watch_html_dashboard(cities, args.server_url, args.watch)
+        except KeyboardInterrupt:
+            print("\n🛑 Dashboard regeneration stopped")
+    else:
+        create_html_dashboard(cities, args.server_url, prefetch=not args.no_prefetch)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+📡 Weather Dashboard Server
+Keeps the latest observation of every city in memory and pushes combined
+deltas to all connected browsers over Server-Sent Events, so API usage no
+longer grows with the number of open dashboards
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from weather_history import DEFAULT_POINTS, DEFAULT_RANGE, HistoryService
+from weather_latest_index import latest_doc_id
+from weather_logging import add_logging_arguments, log, setup_logging
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+SOURCE_TOPIC = 'weather-latest'  # compacted: the current state of every city, then updates
+HOST = '0.0.0.0'
+PORT = 8000
+DASHBOARD_FILE = 'weather_dashboard.html'
+PUSH_INTERVAL = 0.5      # seconds over which updates are coalesced into one delta
+ES_POLL_INTERVAL = 10    # seconds between reads of the weather-latest index
+CLIENT_QUEUE_SIZE = 100  # pending events per browser before it is dropped as too slow
+KAFKA_RETRY_MIN = 2      # seconds before reconnecting after a Kafka source failure
+KAFKA_RETRY_MAX = 60     # the delay doubles up to this while failures repeat
+
+logger = logging.getLogger('dashboard-server')
+
+# Fields the dashboard needs; everything else stays on the server
+DASHBOARD_FIELDS = ['city_id', 'city_name', 'country', 'timestamp', 'temp', 'feels_like',
+                    'humidity', 'pressure', 'wind_speed', 'weather_main', 'weather_description',
+                    'temp_category']
+
+
+def dashboard_view(record: dict) -> dict:
+    """Trim a weather record to the fields the dashboard renders"""
+    return {field: record.get(field) for field in DASHBOARD_FIELDS if field in record}
+
+
+class WeatherState:
+    """Latest observation per city plus the changes not yet pushed
+
+    Keyed by city_id like the weather-latest index, so cities sharing a
+    name stay apart; city_name is only carried along for display.
+    """
+
+    def __init__(self):
+        self.latest = {}
+        self.pending = {}
+        self.version = 0
+
+    def update(self, record: dict) -> bool:
+        """Apply one record, returns True when it changed the state"""
+        if record.get('city_id') is None and not record.get('city_name'):
+            return False
+        city = latest_doc_id(record)
+
+        current = self.latest.get(city)
+        if current is not None and (record.get('timestamp') or 0) < (current.get('timestamp') or 0):
+            return False
+
+        view = dashboard_view(record)
+        if view == current:
+            return False
+        self.latest[city] = view
+        self.pending[city] = view
+        return True
+
+    def take_delta(self) -> dict:
+        """Return and clear the pending changes"""
+        delta, self.pending = self.pending, {}
+        self.version += 1
+        return delta
+
+
+class DashboardServer:
+    def __init__(self, host=HOST, port=PORT, push_interval=PUSH_INTERVAL, history=None):
+        self.host = host
+        self.port = port
+        self.push_interval = push_interval
+        self.history = history or HistoryService()
+        self.state = WeatherState()
+        self.clients = set()
+        self.loop = None
+        self._changed = None
+
+    def publish(self, record: dict):
+        """Thread-safe entry point for data sources"""
+        self.loop.call_soon_threadsafe(self._apply, record)
+
+    def _apply(self, record: dict):
+        if self.state.update(record):
+            self._changed.set()
+
+    @staticmethod
+    def _event(name: str, data: dict) -> bytes:
+        return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+    async def broadcaster(self):
+        """Push one combined delta to every client whenever data changed"""
+        while True:
+            await self._changed.wait()
+            # Coalesce bursts (a whole poll cycle arrives within milliseconds)
+            await asyncio.sleep(self.push_interval)
+            self._changed.clear()
+
+            delta = self.state.take_delta()
+            if not delta:
+                continue
+            event = self._event('delta', {'version': self.state.version, 'cities': delta})
+            for queue in list(self.clients):
+                if queue.qsize() >= CLIENT_QUEUE_SIZE:
+                    # Too slow: drop it using the slot reserved for the disconnect marker
+                    self.clients.discard(queue)
+                    queue.put_nowait(None)
+                else:
+                    queue.put_nowait(event)
+
+    async def handle_events(self, writer):
+        """Server-Sent Events stream: a full snapshot, then deltas"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n"
+            b"Access-Control-Allow-Origin: *\r\n\r\n"
+            b"retry: 3000\n\n"
+        )
+        writer.write(self._event('snapshot', {'version': self.state.version, 'cities': self.state.latest}))
+        await writer.drain()
+
+        # One slot is kept free for the disconnect marker
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE + 1)
+        self.clients.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    event = b": keep-alive\n\n"
+                if event is None:
+                    break
+                writer.write(event)
+                await writer.drain()
+        finally:
+            self.clients.discard(queue)
+
+    async def handle_client(self, reader, writer):
+        """Minimal HTTP/1.1 router"""
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            target = parts[1] if len(parts) > 1 else '/'
+            path, _, query_string = target.partition('?')
+
+            if path == '/events':
+                await self.handle_events(writer)
+            elif path == '/history':
+                await self.handle_history(writer, parse_qs(query_string))
+            elif path == '/snapshot':
+                self._respond(writer, 200, 'application/json',
+                              json.dumps({'version': self.state.version, 'cities': self.state.latest}).encode('utf-8'))
+            elif path in ('/', '/' + DASHBOARD_FILE) and os.path.exists(DASHBOARD_FILE):
+                with open(DASHBOARD_FILE, 'rb') as f:
+                    self._respond(writer, 200, 'text/html; charset=utf-8', f.read())
+            else:
+                self._respond(writer, 404, 'text/plain', b'Not found')
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_history(self, writer, params):
+        """Downsampled real history of one city, computed off the event loop"""
+        city_id = params.get('id', [''])[0]
+        city = params.get('city', [''])[0]
+        if city_id:
+            if not city_id.isdigit():
+                self._respond(writer, 400, 'text/plain', b'Invalid city id')
+                return
+            city = (self.state.latest.get(city_id) or {}).get('city_name') or city
+            city_id = int(city_id)
+        else:
+            city_id = None
+        if not city and city_id is None:
+            self._respond(writer, 400, 'text/plain', b'Missing city')
+            return
+
+        range_value = params.get('range', [DEFAULT_RANGE])[0]
+        try:
+            points = int(params.get('points', [DEFAULT_POINTS])[0])
+        except ValueError:
+            points = DEFAULT_POINTS
+
+        try:
+            result = await self.loop.run_in_executor(
+                None, self.history.series, city, range_value, points, city_id)
+        except ValueError as e:
+            self._respond(writer, 400, 'text/plain', str(e).encode('utf-8'))
+            return
+        except Exception as e:
+            log(logger, logging.WARNING, "❌ History error", city=city, city_id=city_id, error=str(e))
+            self._respond(writer, 502, 'text/plain', b'History source unavailable')
+            return
+        self._respond(writer, 200, 'application/json',
+                      json.dumps(result, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _respond(writer, status, content_type, body):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 502: 'Bad Gateway'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def serve(self, start_source):
+        self.loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        start_source(self)
+
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        log(logger, logging.INFO, f"🌐 Dashboard: http://localhost:{self.port}/",
+            endpoints=['/events', '/snapshot', '/history'])
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.broadcaster())
+
+
+def start_kafka_source(server, topic=SOURCE_TOPIC):
+    """Load every city from the compacted topic, then follow it in a background thread
+
+    A broker error closes the consumer and the source starts over (a new
+    bootstrap) after a growing delay, instead of ending the thread.
+    """
+    from weather_latest_topic import LatestWeatherTable
+
+    def run():
+        delay = KAFKA_RETRY_MIN
+        while True:
+            table = None
+            try:
+                table = LatestWeatherTable(topic, KAFKA_BOOTSTRAP_SERVER)
+                elapsed = table.bootstrap()
+                for record in table.snapshot().values():
+                    server.publish(record)
+                log(logger, logging.INFO, f"📥 {len(table.records)} cities loaded from '{topic}'",
+                    cities=len(table.records), seconds=round(elapsed, 2))
+                delay = KAFKA_RETRY_MIN
+                for record in table.follow():
+                    server.publish(record)
+            except Exception as e:
+                log(logger, logging.ERROR, "❌ Kafka source failed, reconnecting", topic=topic,
+                    error=f"{type(e).__name__}: {e}", retry_in=delay)
+            finally:
+                if table is not None:
+                    try:
+                        table.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, KAFKA_RETRY_MAX)
+
+    threading.Thread(target=run, name='kafka-source', daemon=True).start()
+    log(logger, logging.INFO, f"📥 Source: Kafka topic '{topic}'")
+
+
+def start_elasticsearch_source(server, interval=ES_POLL_INTERVAL):
+    """Poll the weather-latest index once for all viewers"""
+    from weather_latest_index import LATEST_INDEX, get_latest
+
+    def run():
+        while True:
+            for record in get_latest():
+                server.publish(record)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name='es-source', daemon=True).start()
+    log(logger, logging.INFO, f"📥 Source: Elasticsearch index '{LATEST_INDEX}'", interval=interval)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Push live weather updates to dashboard browsers")
+    parser.add_argument('--source', choices=['kafka', 'es'], default='kafka')
+    parser.add_argument('--topic', default=SOURCE_TOPIC)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--push-interval', type=float, default=PUSH_INTERVAL,
+                        help="seconds over which updates are coalesced")
+    parser.add_argument('--history-source', choices=['es', 'archive'], default='es',
+                        help="where /history reads real series from")
+    parser.add_argument('--archive', default='archive', help="Parquet archive root for --history-source archive")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging('dashboard-server', args.log_level, args.log_format)
+    log(logger, logging.INFO, "📡 Weather Dashboard Server")
+
+    if args.source == 'kafka':
+        def start_source(server):
+            start_kafka_source(server, args.topic)
+    else:
+        start_source = start_elasticsearch_source
+
+    history = HistoryService(args.history_source, args.archive)
+    server = DashboardServer(port=args.port, push_interval=args.push_interval, history=history)
+    try:
+        asyncio.run(server.serve(start_source))
+    except KeyboardInterrupt:
+        log(logger, logging.INFO, "🛑 Dashboard server stopped")
+
+
+if __name__ == "__main__":
+    main()
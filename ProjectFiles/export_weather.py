@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+📤 Weather History Exporter
+Streams openweather-* documents out of Elasticsearch into CSV or Parquet
+files partitioned by country, city and day, with bounded memory
+"""
+
+import argparse
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from weather_schema import FIELD_NAMES, arrow_schema, coerce_record, partition_dir, partition_values
+
+# Configuration
+ELASTICSEARCH_URL = "http://localhost:9200"
+SOURCE_PATTERN = "openweather-*"
+OUTPUT_DIR = "export"
+PIT_KEEP_ALIVE = "5m"
+
+# Sorting each slice by city then time makes every partition arrive as one
+# contiguous run, so a slice only ever has a single output file open.
+EXPORT_SORT = [
+    {"city_name.keyword": {"order": "asc", "missing": "_last"}},
+    {"timestamp": {"order": "asc", "missing": "_last"}}
+]
+
+
+class PartitionWriter:
+    """Writes a sorted record stream to one file per partition, keeping one file open"""
+
+    def __init__(self, output_dir, file_format, slice_id):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.slice_id = slice_id
+        self.current_partition = None
+        self.sequence = 0
+        self.files_written = 0
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def _open(self, partition):
+        directory = os.path.join(self.output_dir, partition_dir(partition))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{self.slice_id:03d}-{self.sequence:05d}.{self.file_format}")
+        self.sequence += 1
+        self.files_written += 1
+
+        if self.file_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._schema = arrow_schema()
+            self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=FIELD_NAMES)
+            self._writer.writeheader()
+        self.current_partition = partition
+
+    def _write_rows(self, rows):
+        if self.file_format == 'parquet':
+            import pyarrow as pa
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+        else:
+            self._writer.writerows(rows)
+
+    def write_batch(self, records):
+        """Write one batch of records, switching files when the partition changes"""
+        run = []
+        for record in records:
+            partition = partition_values(record)
+            if partition != self.current_partition:
+                if run:
+                    self._write_rows(run)
+                    run = []
+                self.close()
+                self._open(partition)
+            run.append(coerce_record(record))
+        if run:
+            self._write_rows(run)
+
+    def close(self):
+        """Close the currently open partition file"""
+        if self._writer is not None and self.file_format == 'parquet':
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._writer = None
+        self.current_partition = None
+
+
+class ExportProgress:
+    """Thread-safe progress counter printing at most once per interval"""
+
+    def __init__(self, total, interval=5.0):
+        self.total = total
+        self.interval = interval
+        self.exported = 0
+        self.started = time.time()
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.exported += count
+            now = time.time()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.report()
+
+    def report(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        percent = (self.exported / self.total * 100) if self.total else 100.0
+        print(f"📦 {self.exported}/{self.total} documents ({percent:.1f}%), "
+              f"{self.exported / elapsed:.0f} docs/s")
+
+
+def open_pit(source):
+    """Open a point-in-time on the source indices"""
+    response = requests.post(f"{ELASTICSEARCH_URL}/{source}/_pit",
+                             params={'keep_alive': PIT_KEEP_ALIVE}, timeout=30)
+    response.raise_for_status()
+    return response.json()['id']
+
+
+def close_pit(pit_id):
+    """Release a point-in-time"""
+    requests.delete(f"{ELASTICSEARCH_URL}/_pit", json={'id': pit_id}, timeout=30)
+
+
+def count_documents(source):
+    """Total number of documents to export"""
+    response = requests.get(f"{ELASTICSEARCH_URL}/{source}/_count", timeout=30)
+    response.raise_for_status()
+    return response.json().get('count', 0)
+
+
+def export_slice(pit_id, slice_id, max_slices, output_dir, file_format, batch_size, progress):
+    """Stream one slice of the point-in-time with search_after into partition files"""
+    writer = PartitionWriter(output_dir, file_format, slice_id)
+    search_after = None
+    exported = 0
+
+    try:
+        while True:
+            query = {
+                "size": batch_size,
+                "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                "sort": EXPORT_SORT,
+                "track_total_hits": False
+            }
+            if max_slices > 1:
+                query["slice"] = {"id": slice_id, "max": max_slices}
+            if search_after is not None:
+                query["search_after"] = search_after
+
+            response = requests.post(f"{ELASTICSEARCH_URL}/_search", json=query, timeout=120)
+            response.raise_for_status()
+            hits = response.json()['hits']['hits']
+            if not hits:
+                break
+
+            writer.write_batch([hit['_source'] for hit in hits])
+            search_after = hits[-1]['sort']
+            exported += len(hits)
+            progress.add(len(hits))
+    finally:
+        writer.close()
+
+    return exported, writer.files_written
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Export weather history to partitioned CSV/Parquet")
+    parser.add_argument('--source', default=SOURCE_PATTERN, help="source index pattern")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="output directory")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--slices', type=int, default=4, help="parallel sliced readers")
+    parser.add_argument('--batch-size', type=int, default=2000, help="documents per search page")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("📤 Weather History Exporter")
+    print("=" * 50)
+    print(f"Source: {args.source} → {args.output} ({args.format})")
+
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ Parquet export needs pyarrow: pip install pyarrow")
+            return
+
+    total = count_documents(args.source)
+    print(f"📋 {total} documents, {args.slices} slices of {args.batch_size} docs per page")
+
+    progress = ExportProgress(total)
+    pit_id = open_pit(args.source)
+    try:
+        with ThreadPoolExecutor(max_workers=args.slices) as pool:
+            futures = [
+                pool.submit(export_slice, pit_id, slice_id, args.slices, args.output,
+                            args.format, args.batch_size, progress)
+                for slice_id in range(args.slices)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        close_pit(pit_id)
+
+    progress.report()
+    files = sum(files for _, files in results)
+    print(f"✅ Exported {sum(count for count, _ in results)} documents into {files} files "
+          f"in {time.time() - progress.started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
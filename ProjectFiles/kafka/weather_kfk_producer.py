@@ -3,15 +3,26 @@
 Extract weather data from OpenWeather One Call API 3.0 (https://openweathermap.org/api/one-call-3) to kafka.
 '''
 
+import argparse
+import logging
+import os
+import sys
 import time
 import json
 import requests
 from config import config
 from kafka import KafkaProducer
 
+# The shared pipeline modules live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from weather_api import add_api_arguments, current_weather_url, use_base_url  # noqa: E402
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging  # noqa: E402
+
 #kfk_bootstrap_server = 'localhost:9092'
 kfk_bootstrap_server = '127.0.0.1:9092'
 
+logger = logging.getLogger('kfk-producer')
+
 def kafka_producer() -> KafkaProducer:
     return KafkaProducer(
         bootstrap_servers=[kfk_bootstrap_server],
@@ -42,7 +53,7 @@ def get_weather_infos(city_name: str, api_key: str) -> dict:
         json_msg: return the message to be send to kafka.
     '''
     # Current Weather API 2.5 endpoint (free tier)
-    openweather_endpoint = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    openweather_endpoint = current_weather_url(city_name, api_key)
 
     try:
         api_response = requests.get(openweather_endpoint)
@@ -98,48 +109,63 @@ def get_weather_infos(city_name: str, api_key: str) -> dict:
         return json_msg
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching weather data for {city_name}: {e}")
+        log(logger, logging.WARNING, "Error fetching weather data", city=city_name, error=str(e))
         return None
     except KeyError as e:
-        print(f"Error parsing weather data for {city_name}: {e}")
+        log(logger, logging.WARNING, "Error parsing weather data", city=city_name, error=f"missing {e}")
         return None
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Stream OpenWeather observations to Kafka")
+    add_api_arguments(parser)
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    setup_logging('kfk-producer', args.log_level, args.log_format)
+    use_base_url(args.api_url)
     kfk_topic = 'openweather'
     api_key = config()
     cities = ['London', 'Berlin', 'Paris', 'Barcelona', 'Amsterdam', 'Krakow', 'Vienna']
 
-    print("Starting OpenWeather Current Weather API 2.5 Kafka Producer...")
-    print(f"API Key: {api_key[:8]}..." if api_key else "No API key found!")
-    print(f"Cities to monitor: {cities}")
-    print(f"Kafka topic: {kfk_topic}")
-    print(f"Kafka server: {kfk_bootstrap_server}")
-    print("-" * 50)
-
-    while True:
-        for city_name in cities:
-            try:
-                print(f"Fetching weather data for {city_name}...")
-                json_msg = get_weather_infos(city_name, api_key)
-
-                if json_msg:
-                    producer = kafka_producer()
-                    if isinstance(producer, KafkaProducer):
-                        producer.send(kfk_topic, json_msg)
-                        producer.flush()  # Ensure message is sent
-                        print(f'✓ Published {city_name}: {json_msg["temp"]}°C, {json_msg["weather_description"]}')
-                    else:
-                        print(f'✗ Failed to create Kafka producer for {city_name}')
-                else:
-                    print(f'✗ Failed to get weather data for {city_name}')
+    log(logger, logging.INFO, "Starting OpenWeather Current Weather API 2.5 Kafka Producer",
+        api_key=f"{api_key[:8]}..." if api_key else None, cities=cities, topic=kfk_topic,
+        bootstrap_server=kfk_bootstrap_server)
+    if not api_key:
+        log(logger, logging.WARNING, "No API key found!")
+    published = RecordLog(logger, 'cities')
 
-            except Exception as e:
-                print(f'✗ Error processing {city_name}: {e}')
-
-        sleep = 60
-        print(f'Waiting {sleep} seconds before next cycle...')
-        print("-" * 50)
-        time.sleep(sleep)
+    try:
+        while True:
+            for city_name in cities:
+                try:
+                    json_msg = get_weather_infos(city_name, api_key)
+
+                    if json_msg:
+                        producer = kafka_producer()
+                        if isinstance(producer, KafkaProducer):
+                            producer.send(kfk_topic, json_msg)
+                            producer.flush()  # Ensure message is sent
+                            published.record("✓ Published", city=city_name, temp=json_msg['temp'],
+                                             description=json_msg['weather_description'])
+                        else:
+                            published.record("✗ Failed to create Kafka producer", error=True, city=city_name)
+                    else:
+                        published.record("✗ Failed to get weather data", error=True, city=city_name)
+
+                except Exception as e:
+                    published.record("✗ Error processing city", error=True, city=city_name, error_detail=str(e))
+
+            sleep = 60
+            log(logger, logging.DEBUG, "Waiting before next cycle", seconds=sleep)
+            time.sleep(sleep)
+            published.tick()
+    except KeyboardInterrupt:
+        log(logger, logging.INFO, "Stopping producer")
+    finally:
+        published.summary()
 
 if __name__=="__main__":
     main()
@@ -4,24 +4,66 @@
 Conforme aux exigences: prétraitement avec Kafka Streams
 """
 
-from kafka import KafkaConsumer, KafkaProducer
+import argparse
 import json
+import logging
 from datetime import datetime
 import time
 
+from weather_latest_topic import LATEST_TOPIC, latest_key
+from weather_metrics import (CONSUMER_LAG, ENRICH_BATCH_SECONDS, RECORDS_CONSUMED, RECORDS_PRODUCED,
+                             start_metrics_server)
+from weather_trace import Trace, Tracer, now_ms
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_profiling import NULL_STAGE, add_profiling_arguments, profiler_from_args
+from weather_transport import add_transport_arguments, create_consumer, create_producer
+
+CONSUMER_GROUP = 'weather-streams-processor'
+METRICS_PORT = 9102
+
+logger = logging.getLogger('processor')
+
+def compute_heat_index(temp, humidity):
+    """Heat Index simplifié (None en dessous de 27°C)"""
+    if temp >= 27:
+        return round(temp + (0.5 * (humidity - 50)), 3)
+    return None
+
+def temp_category(temp):
+    """Classification de température"""
+    if temp < 0:
+        return 'freezing'
+    elif temp < 10:
+        return 'cold'
+    elif temp < 20:
+        return 'mild'
+    elif temp < 30:
+        return 'warm'
+    return 'hot'
+
 class WeatherStreamsProcessor:
-    def __init__(self):
-        self.consumer = KafkaConsumer(
-            'openweather',
-            bootstrap_servers=['localhost:9092'],
+    def __init__(self, profiler=None, transport='kafka-python'):
+        # kafka-python, confluent-kafka ou le broker en mémoire (benchmarks, tests)
+        self.consumer = create_consumer(
+            transport,
+            ['openweather'],
             value_deserializer=lambda x: json.loads(x.decode('utf-8')),
-            group_id='weather-streams-processor'
+            group_id=CONSUMER_GROUP
         )
         
-        self.producer = KafkaProducer(
-            bootstrap_servers=['localhost:9092'],
+        self.producer = create_producer(
+            transport,
             value_serializer=lambda x: json.dumps(x).encode('utf-8')
         )
+        
+        # Les traces sont échantillonnées par le producteur; on ne fait que les prolonger
+        self.tracer = Tracer('processor', sample_rate=0)
+        
+        # Une ligne par message échantillonnée, plus un résumé périodique du débit
+        self.records = RecordLog(logger, 'messages')
+        
+        # Profilage par étape (poll, enrich, aggregate, send); inactif sans --profile
+        self.profiler = profiler
     
     def enrich_data(self, weather_data):
         """Enrichissement des données météo"""
@@ -42,21 +84,12 @@ class WeatherStreamsProcessor:
             humidity = weather_data['humidity']
             
             # Calcul Heat Index simplifié
-            if temp >= 27:
-                heat_index = temp + (0.5 * (humidity - 50))
-                enriched_data['heat_index'] = round(heat_index, 3)
+            heat_index = compute_heat_index(temp, humidity)
+            if heat_index is not None:
+                enriched_data['heat_index'] = heat_index
             
             # Classification de température
-            if temp < 0:
-                enriched_data['temp_category'] = 'freezing'
-            elif temp < 10:
-                enriched_data['temp_category'] = 'cold'
-            elif temp < 20:
-                enriched_data['temp_category'] = 'mild'
-            elif temp < 30:
-                enriched_data['temp_category'] = 'warm'
-            else:
-                enriched_data['temp_category'] = 'hot'
+            enriched_data['temp_category'] = temp_category(temp)
         
         # Nettoyage des données
         if 'visibility' in enriched_data and enriched_data['visibility'] == 0:
@@ -80,39 +113,102 @@ class WeatherStreamsProcessor:
         
         return aggregated
     
+    def process_message(self, weather_data, trace=None):
+        """Enrichit un message et l'envoie vers les topics de sortie"""
+        # 1. Enrichissement des données
+        with self.stage('enrich'):
+            enriched_data = self.enrich_data(weather_data)
+        headers = None
+        if trace:
+            headers = [trace.stamp('ed').header()]
+        
+        with self.stage('send'):
+            # 2. Envoi vers topic enrichi
+            self.producer.send('weather-enriched', enriched_data, headers=headers)
+            
+            # 2b. Dernier état par ville (topic compacté, clé = ville)
+            self.producer.send(LATEST_TOPIC, enriched_data, key=latest_key(enriched_data), headers=headers)
+        
+        # 3. Agrégations
+        with self.stage('aggregate'):
+            aggregated_data = self.aggregate_data(weather_data)
+        
+        # 4. Envoi vers topic agrégé
+        with self.stage('send'):
+            self.producer.send('weather-aggregated', aggregated_data)
+        
+        self.records.record("✅ Données enrichies et agrégées", city=weather_data.get('city_name'))
+        self.tracer.finish(trace)
+    
+    def stage(self, name):
+        """Étape profilée, ou contexte vide sans profileur"""
+        return self.profiler.stage(name) if self.profiler else NULL_STAGE
+    
+    def record_lag(self, partition):
+        """Retard du consommateur, calculé sans requête réseau (highwater du dernier fetch)"""
+        highwater = self.consumer.highwater(partition)
+        if highwater is not None:
+            lag = highwater - self.consumer.position(partition)
+            CONSUMER_LAG.labels(CONSUMER_GROUP, partition.topic, partition.partition).set(lag)
+    
+    def process_batch(self, timeout_ms=1000):
+        """Un poll et le traitement de tous ses messages; retourne le nombre de messages traités"""
+        with self.stage('poll'):
+            batches = self.consumer.poll(timeout_ms=timeout_ms, max_records=500)
+        received_ms = now_ms()
+        count = 0
+        if not batches:
+            return count
+        # Un seul temps par lot sondé, toutes partitions confondues
+        with ENRICH_BATCH_SECONDS.time():
+            for partition, messages in batches.items():
+                RECORDS_CONSUMED.labels(partition.topic).inc(len(messages))
+                for message in messages:
+                    trace = Trace.from_headers(message.headers)
+                    if trace:
+                        trace.stamp('cr', received_ms)
+                    self.process_message(message.value, trace)
+                # 3 messages produits par message consommé
+                for topic in ('weather-enriched', LATEST_TOPIC, 'weather-aggregated'):
+                    RECORDS_PRODUCED.labels(topic).inc(len(messages))
+                self.record_lag(partition)
+                count += len(messages)
+        return count
+    
     def process_stream(self):
-        """Traitement principal du stream"""
-        print("🔄 Kafka Streams Processor démarré")
-        print("📊 Traitement des données météo en temps réel...")
+        """Traitement principal du stream, par lots de messages"""
+        log(logger, logging.INFO, "🔄 Kafka Streams Processor démarré", topic='openweather', group=CONSUMER_GROUP)
+        start_metrics_server(METRICS_PORT)
         
         try:
-            for message in self.consumer:
-                weather_data = message.value
-                
-                print(f"📡 Traitement: {weather_data.get('city_name', 'Unknown')}")
-                
-                # 1. Enrichissement des données
-                enriched_data = self.enrich_data(weather_data)
-                
-                # 2. Envoi vers topic enrichi
-                self.producer.send('weather-enriched', enriched_data)
-                
-                # 3. Agrégations
-                aggregated_data = self.aggregate_data(weather_data)
-                
-                # 4. Envoi vers topic agrégé
-                self.producer.send('weather-aggregated', aggregated_data)
-                
-                print(f"✅ Données enrichies et agrégées pour {weather_data.get('city_name')}")
+            while True:
+                self.process_batch()
+                self.records.tick()
+                if self.profiler:
+                    self.profiler.check_window()
                 
         except KeyboardInterrupt:
-            print("\n🛑 Arrêt du processeur Kafka Streams")
+            log(logger, logging.INFO, "🛑 Arrêt du processeur Kafka Streams")
         finally:
+            if self.profiler:
+                self.profiler.finish()
+            self.records.summary()
             self.consumer.close()
             self.producer.close()
+            self.tracer.close()
+
+def parse_args():
+    """Options de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Enrichit les observations météo du topic openweather")
+    add_transport_arguments(parser)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    return parser.parse_args()
 
 def main():
-    processor = WeatherStreamsProcessor()
+    args = parse_args()
+    setup_logging('processor', args.log_level, args.log_format)
+    processor = WeatherStreamsProcessor(profiler_from_args('processor', args), args.transport)
     processor.process_stream()
 
 if __name__ == "__main__":
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+🧪 OpenWeather Stub Server
+Local stand-in for the OpenWeather Current Weather API 2.5, so the fetchers
+can be load tested, benchmarked and integration tested offline without
+spending quota. Serves /data/2.5/weather (by q, id or lat/lon) and
+/data/2.5/group from recorded payloads, with synthetic cities for names it
+does not know. Observation times advance every update interval with a
+per-city phase, like the real stations, and temperatures drift with them.
+
+Faults are injected on demand: a latency distribution, a rate of 5xx
+errors and per-key 429 rate limiting. One asyncio loop with keep-alive
+connections handles thousands of concurrent clients.
+
+Point a fetcher at it with --api-url http://localhost:8090 or
+OPENWEATHER_BASE_URL=http://localhost:8090. Payloads are always in metric
+units, which is what every fetcher asks for.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+
+# Configuration
+HOST = '0.0.0.0'
+PORT = 8090
+FIXTURES_FILE = 'benchmark_payloads.json'
+UPDATE_INTERVAL = 600      # seconds between two observations of a city (dt step)
+RATE_LIMIT = 0             # requests per minute per API key before 429, 0 disables
+BACKLOG = 4096             # pending connections accepted by the listening socket
+MAX_GROUP_IDS = 20         # the real /group endpoint rejects more ids
+IDLE_TIMEOUT = 60          # seconds a keep-alive connection may stay idle
+MAX_SYNTHETIC = 10000      # synthetic cities kept at once, least recently asked for dropped first
+
+logger = logging.getLogger('openweather-stub')
+
+ERRORS = {
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable',
+}
+
+# Conditions given to synthetic cities: (id, main, description, icon)
+SYNTHETIC_WEATHER = [
+    (800, 'Clear', 'clear sky', '01d'),
+    (801, 'Clouds', 'few clouds', '02d'),
+    (803, 'Clouds', 'broken clouds', '04d'),
+    (500, 'Rain', 'light rain', '10d'),
+    (701, 'Mist', 'mist', '50d'),
+    (600, 'Snow', 'light snow', '13d'),
+]
+
+
+def latency_model(spec: str):
+    """Sampler of response delays in seconds from a spec in milliseconds
+
+    0 | fixed:MS | uniform:LOW:HIGH | normal:MEAN:STDDEV | lognormal:MEDIAN:SIGMA
+    """
+    name, _, values = spec.partition(':')
+    try:
+        params = [float(value) for value in values.split(':')] if values else []
+        if name == '0' and not params:
+            return lambda: 0.0
+        if name == 'fixed' and len(params) == 1:
+            return lambda: params[0] / 1000
+        if name == 'uniform' and len(params) == 2:
+            return lambda: random.uniform(*params) / 1000
+        if name == 'normal' and len(params) == 2:
+            return lambda: max(0.0, random.gauss(*params)) / 1000
+        if name == 'lognormal' and len(params) == 2:
+            mu = math.log(params[0])
+            return lambda: random.lognormvariate(mu, params[1]) / 1000
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(
+        f"invalid latency '{spec}' (0, fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV or lognormal:MEDIAN:SIGMA)")
+
+
+def synthetic_payload(name: str) -> dict:
+    """Plausible /weather response for a city missing from the fixtures, stable for a given name"""
+    seed = zlib.crc32(name.lower().encode('utf-8'))
+    rng = random.Random(seed)
+    lat = round(rng.uniform(-60, 70), 4)
+    lon = round(rng.uniform(-180, 180), 4)
+    temp = round(28 - abs(lat) * 0.45 + rng.uniform(-4, 4), 2)
+    weather_id, main, description, icon = rng.choice(SYNTHETIC_WEATHER)
+    pressure = rng.randint(995, 1030)
+    sunrise = 1729317600 + rng.randint(0, 7200)
+    return {
+        'coord': {'lon': lon, 'lat': lat},
+        'weather': [{'id': weather_id, 'main': main, 'description': description, 'icon': icon}],
+        'base': 'stations',
+        'main': {'temp': temp, 'feels_like': round(temp - rng.uniform(0, 2.5), 2),
+                 'temp_min': round(temp - rng.uniform(0.5, 2), 2), 'temp_max': round(temp + rng.uniform(0.5, 2), 2),
+                 'pressure': pressure, 'humidity': rng.randint(30, 95),
+                 'sea_level': pressure, 'grnd_level': pressure - rng.randint(0, 20)},
+        'visibility': rng.choice([10000, 10000, 8000, 5000]),
+        'wind': {'speed': round(rng.uniform(0.5, 9), 2), 'deg': rng.randint(0, 359)},
+        'clouds': {'all': rng.randint(0, 100)},
+        'dt': 1729332000,
+        'sys': {'type': 2, 'id': seed % 100000, 'country': 'XX', 'sunrise': sunrise, 'sunset': sunrise + 39600},
+        'timezone': int(round(lon / 15)) * 3600,
+        'id': 9000000 + seed % 1000000,
+        'name': name,
+        'cod': 200,
+    }
+
+
+class WeatherFixtures:
+    """Payloads served by the stub, looked up by name, id or nearest coordinates"""
+
+    def __init__(self, payloads, synthetic=True, update_interval=UPDATE_INTERVAL, max_synthetic=MAX_SYNTHETIC):
+        self.synthetic = synthetic
+        self.update_interval = update_interval
+        self.max_synthetic = max_synthetic
+        self.by_name = {}
+        self.by_id = {}
+        for payload in payloads:
+            self.add(payload)
+        # id -> (dt, serialized observation), rebuilt when the city's dt moves on
+        self._cache = {}
+        # lowercased name -> synthetic payload, in least recently asked order
+        self._synthetic = OrderedDict()
+
+    def add(self, payload):
+        self.by_name[payload['name'].lower()] = payload
+        self.by_id[payload['id']] = payload
+        return payload
+
+    def by_city(self, name: str):
+        name = name.split(',')[0].strip()
+        key = name.lower()
+        if key in self._synthetic:
+            self._synthetic.move_to_end(key)
+        payload = self.by_name.get(key)
+        if payload is None and self.synthetic and name:
+            payload = self._synthetic[key] = self.add(synthetic_payload(name))
+            if len(self._synthetic) > self.max_synthetic:
+                self._forget(self._synthetic.popitem(last=False)[1])
+        return payload
+
+    def _forget(self, payload):
+        """Drop an evicted synthetic city from every lookup"""
+        self.by_name.pop(payload['name'].lower(), None)
+        if self.by_id.get(payload['id']) is payload:
+            del self.by_id[payload['id']]
+        self._cache.pop(payload['id'], None)
+
+    def nearest(self, lat: float, lon: float):
+        """Closest known city, as the real API answers for any coordinates"""
+        if not self.by_id:
+            return None
+        return min(self.by_id.values(),
+                   key=lambda p: (p['coord']['lat'] - lat) ** 2 + (p['coord']['lon'] - lon) ** 2)
+
+    def observation(self, payload: dict, now: float) -> dict:
+        """Payload as observed at now: dt on the city's update grid, temperatures drifting with it"""
+        phase = payload['id'] % self.update_interval
+        dt = int((now - phase) // self.update_interval * self.update_interval + phase)
+        cached = self._cache.get(payload['id'])
+        if cached is not None and cached[0] == dt:
+            return cached[1]
+
+        drift = round(1.5 * math.sin(2 * math.pi * dt / 86400 + phase), 2)
+        observed = dict(payload, dt=dt)
+        observed['main'] = dict(payload['main'])
+        # Sunrise and sunset follow dt by whole days, so they stay on its date
+        days_shift = (dt - payload.get('dt', dt)) // 86400 * 86400
+        observed['sys'] = dict(payload['sys'])
+        for field in ('sunrise', 'sunset'):
+            if field in observed['sys']:
+                observed['sys'][field] += days_shift
+        for field in ('temp', 'feels_like', 'temp_min', 'temp_max'):
+            observed['main'][field] = round(payload['main'][field] + drift, 2)
+        self._cache[payload['id']] = (dt, observed)
+        return observed
+
+
+class RateLimiter:
+    """Token bucket per API key, refilled continuously at limit per minute"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.buckets = {}
+
+    def allow(self, key, now) -> bool:
+        if not self.per_minute:
+            return True
+        tokens, updated = self.buckets.get(key, (self.per_minute, now))
+        tokens = min(self.per_minute, tokens + (now - updated) * self.per_minute / 60)
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+class OpenWeatherStub:
+    def __init__(self, fixtures, host=HOST, port=PORT, latency=None, error_rate=0.0, rate_limit=RATE_LIMIT):
+        self.fixtures = fixtures
+        self.host = host
+        self.port = port
+        self.latency = latency or (lambda: 0.0)
+        self.error_rate = error_rate
+        self.limiter = RateLimiter(rate_limit)
+        self.requests = RecordLog(logger, 'requests')
+        self.statuses = {}
+        self.connections = 0
+        self.peak_connections = 0
+
+    def route(self, path, params, now):
+        """(status, JSON body) of one API request"""
+        key = params.get('appid', [''])[0]
+        if not key:
+            return 401, {'cod': 401, 'message': "Invalid API key. Please see "
+                                                "https://openweathermap.org/faq#error401 for more info."}
+        if not self.limiter.allow(key, now):
+            return 429, {'cod': 429, 'message': "Your account is temporary blocked due to exceeding of "
+                                                "requests limitation of your subscription type."}
+        if self.error_rate and random.random() < self.error_rate:
+            status = random.choice((500, 502, 503))
+            return status, {'cod': status, 'message': ERRORS[status]}
+
+        if path == '/data/2.5/weather':
+            payload = self.lookup(params)
+            if payload is None:
+                return 404, {'cod': '404', 'message': 'city not found'}
+            return 200, self.fixtures.observation(payload, now)
+
+        if path == '/data/2.5/group':
+            try:
+                ids = [int(value) for value in params.get('id', [''])[0].split(',') if value]
+            except ValueError:
+                return 400, {'cod': '400', 'message': 'id is not a number'}
+            if not ids or len(ids) > MAX_GROUP_IDS:
+                return 400, {'cod': '400', 'message': f'between 1 and {MAX_GROUP_IDS} ids are accepted'}
+            found = [self.fixtures.observation(self.fixtures.by_id[i], now) for i in ids if i in self.fixtures.by_id]
+            return 200, {'cnt': len(found), 'list': found}
+
+        return 404, {'cod': '404', 'message': 'Internal error: 404'}
+
+    def lookup(self, params):
+        if 'q' in params:
+            return self.fixtures.by_city(params['q'][0])
+        if 'id' in params:
+            try:
+                return self.fixtures.by_id.get(int(params['id'][0]))
+            except ValueError:
+                return None
+        if 'lat' in params and 'lon' in params:
+            try:
+                return self.fixtures.nearest(float(params['lat'][0]), float(params['lon'][0]))
+            except ValueError:
+                return None
+        return None
+
+    async def handle_client(self, reader, writer):
+        """HTTP/1.1 keep-alive loop: one request at a time until the client closes"""
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not request_line:
+                    break
+                keep_alive = not request_line.rstrip().endswith(b'HTTP/1.0')
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    if name.strip().lower() == 'connection':
+                        keep_alive = value.strip().lower() == 'keep-alive'
+
+                parts = request_line.decode('latin-1').split()
+                target = parts[1] if len(parts) > 1 else '/'
+                path, _, query_string = target.partition('?')
+                status, body = self.route(path, parse_qs(query_string), time.time())
+
+                delay = self.latency()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._respond(writer, status, json.dumps(body, separators=(',', ':')).encode('utf-8'), keep_alive)
+                await writer.drain()
+
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                self.requests.record(error=status != 200)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, body, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {ERRORS.get(status, 'OK')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def report(self):
+        """Summary line every interval, including idle connections"""
+        while True:
+            await asyncio.sleep(self.requests.interval)
+            self.requests.tick()
+            log(logger, logging.DEBUG, "🔌 Connections", open=self.connections, peak=self.peak_connections)
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=BACKLOG)
+        log(logger, logging.INFO, f"🧪 OpenWeather stub: http://localhost:{self.port}/data/2.5/weather",
+            cities=len(self.fixtures.by_id), synthetic=self.fixtures.synthetic,
+            error_rate=self.error_rate, rate_limit=self.limiter.per_minute)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.report())
+
+
+def raise_open_files_limit():
+    """Allow as many sockets as the hard limit permits (every connection holds a descriptor)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def load_fixtures(path) -> list:
+    """Recorded /weather responses: a JSON list, or one response per line"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Local OpenWeather API stand-in with fault injection")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--fixtures', default=FIXTURES_FILE, help="recorded /weather responses (JSON list or lines)")
+    parser.add_argument('--no-synthetic', action='store_true', help="answer 404 for cities missing from the fixtures")
+    parser.add_argument('--latency', type=latency_model, default='0', metavar='SPEC',
+                        help="response delay in ms: 0, fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV "
+                             "or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests failing with 500/502/503")
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, metavar='PER_MINUTE',
+                        help="requests per minute per API key before 429 (0 disables; the free plan allows 60)")
+    parser.add_argument('--update-interval', type=int, default=UPDATE_INTERVAL,
+                        help="seconds between two observations of a city")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging('openweather-stub', args.log_level, args.log_format)
+    raise_open_files_limit()
+
+    fixtures = WeatherFixtures(load_fixtures(args.fixtures), not args.no_synthetic, args.update_interval)
+    stub = OpenWeatherStub(fixtures, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           rate_limit=args.rate_limit)
+    try:
+        asyncio.run(stub.serve())
+    except KeyboardInterrupt:
+        stub.requests.summary()
+        log(logger, logging.INFO, "🛑 OpenWeather stub stopped", statuses=stub.statuses,
+            peak_connections=stub.peak_connections)
+
+
+if __name__ == "__main__":
+    main()
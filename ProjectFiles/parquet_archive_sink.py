@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+🗄️ Parquet Archive Sink
+Consumes weather records from Kafka and archives them as Parquet files
+partitioned by country, city and date. Kafka offsets are committed only
+after every buffered file has been durably written.
+
+Each flush writes one small file per partition; once a day is over, the
+files of its partitions are compacted into one, so readers don't pay for
+a file per city every flush interval.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import time
+import uuid
+
+from weather_schema import DICTIONARY_FIELDS, arrow_schema, coerce_record, partition_dir, partition_values
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_transport import add_transport_arguments, create_consumer
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+SOURCE_TOPIC = 'weather-enriched'
+CONSUMER_GROUP = 'weather-parquet-archive'
+ARCHIVE_DIR = 'archive'
+
+BATCH_ROWS = 10000            # rows per Arrow record batch
+ROW_GROUP_ROWS = 128 * 1024   # rows per Parquet row group
+MAX_BUFFERED_ROWS = 500000    # flush everything once this many rows are buffered
+FLUSH_INTERVAL = 600          # seconds between flushes on a quiet topic
+COMPACTED_FROM_KEY = b'compacted_from'  # Parquet metadata key listing the files merged into a compacted file
+
+logger = logging.getLogger('parquet-archive')
+
+
+class PartitionBuffer:
+    """Rows of one archive partition, sealed into Arrow record batches as they fill up"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.batches = []
+        self.rows = []
+        self.row_count = 0
+
+    def append(self, record):
+        self.rows.append(coerce_record(record))
+        self.row_count += 1
+        if len(self.rows) >= BATCH_ROWS:
+            self.seal()
+
+    def seal(self):
+        """Convert pending rows into a record batch"""
+        import pyarrow as pa
+
+        if self.rows:
+            self.batches.append(pa.RecordBatch.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def to_table(self):
+        import pyarrow as pa
+
+        self.seal()
+        return pa.Table.from_batches(self.batches, schema=self.schema)
+
+
+class ParquetArchiveSink:
+    def __init__(self, topic=SOURCE_TOPIC, archive_dir=ARCHIVE_DIR, flush_interval=FLUSH_INTERVAL,
+                 transport='kafka-python'):
+        import pyarrow  # noqa: F401  (fail early if the Parquet dependency is missing)
+
+        self.topic = topic
+        self.archive_dir = archive_dir
+        self.flush_interval = flush_interval
+        self.schema = arrow_schema()
+        self.buffers = {}
+        self.buffered_rows = 0
+        self.last_flush = time.time()
+        self.files_written = 0
+        self.to_compact = set()   # partitions written by this process, compacted once their day is over
+        self.flush_failed = False
+        self.records = RecordLog(logger, 'records')
+
+        self.consumer = create_consumer(
+            transport,
+            [topic],
+            bootstrap_servers=KAFKA_BOOTSTRAP_SERVER,
+            value_deserializer=lambda x: json.loads(x.decode('utf-8')),
+            group_id=CONSUMER_GROUP,
+            enable_auto_commit=False,
+            auto_offset_reset='earliest'
+        )
+
+    def add(self, record):
+        """Buffer one record in its partition"""
+        partition = partition_values(record)
+        buffer = self.buffers.get(partition)
+        if buffer is None:
+            buffer = self.buffers[partition] = PartitionBuffer(self.schema)
+        buffer.append(record)
+        self.buffered_rows += 1
+
+    def write_partition(self, partition, table) -> str:
+        """Write one partition file durably; returns its path"""
+        directory = os.path.join(self.archive_dir, partition_dir(partition))
+        name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        return write_parquet_file(directory, name, table)
+
+    def flush(self):
+        """Write every buffered partition, then commit the consumed offsets
+
+        A buffer is dropped as soon as its file is renamed into place. If a
+        write fails, the files of this flush are removed again: their rows
+        come back from the uncommitted offsets on restart, and nothing is
+        flushed or committed any more.
+        """
+        if self.flush_failed:
+            return
+        if self.buffered_rows:
+            written = []
+            records = self.buffered_rows
+            try:
+                for partition in list(self.buffers):
+                    written.append(self.write_partition(partition, self.buffers[partition].to_table()))
+                    self.buffered_rows -= self.buffers.pop(partition).row_count
+                    self.to_compact.add(partition)
+            except BaseException:
+                self.flush_failed = True
+                for path in written:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        log(logger, logging.ERROR, "❌ Partial flush not rolled back, rows will be duplicated",
+                            path=path, error=str(e))
+                raise
+            self.files_written += len(written)
+
+            log(logger, logging.INFO, f"🗄️ Archived {records} records into {len(written)} files",
+                records=records, files=len(written), files_total=self.files_written)
+            self.consumer.commit()
+            self.compact_finished_days()
+
+        self.last_flush = time.time()
+
+    def compact_finished_days(self):
+        """Compact the partitions written by this process whose (UTC) day is over"""
+        today = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+        for partition in [partition for partition in self.to_compact if partition[2] < today]:
+            self.to_compact.discard(partition)
+            try:
+                compact_partition(os.path.join(self.archive_dir, partition_dir(partition)))
+            except Exception as e:
+                # Uncompacted files are still valid archive files
+                log(logger, logging.WARNING, "⚠️ Compaction failed", partition=partition_dir(partition), error=str(e))
+
+    def run(self):
+        """Consume, buffer and flush until interrupted"""
+        log(logger, logging.INFO, "🗄️ Parquet Archive Sink démarré", topic=self.topic, archive=self.archive_dir)
+
+        try:
+            while True:
+                polled = self.consumer.poll(timeout_ms=1000, max_records=5000)
+                for messages in polled.values():
+                    for message in messages:
+                        self.add(message.value)
+                    self.records.record(count=len(messages))
+                self.records.tick()
+
+                if (self.buffered_rows >= MAX_BUFFERED_ROWS
+                        or time.time() - self.last_flush >= self.flush_interval):
+                    self.flush()
+
+        except KeyboardInterrupt:
+            log(logger, logging.INFO, "🛑 Arrêt du Parquet Archive Sink")
+            self.flush()
+        finally:
+            self.records.summary()
+            self.consumer.close()
+
+
+def write_parquet_file(directory, name, table) -> str:
+    """Write a Parquet file durably: temp file, fsync, atomic rename; returns its path"""
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, name)
+    # Dot-prefixed so dataset readers ignore it until it is complete
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+
+    with open(tmp_path, 'wb') as f:
+        pq.write_table(
+            table, f,
+            row_group_size=ROW_GROUP_ROWS,
+            use_dictionary=DICTIONARY_FIELDS,
+            compression='zstd'
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, final_path)
+
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return final_path
+
+
+def compact_partition(directory) -> int:
+    """Merge the Parquet files of a partition directory into one; returns the number of files merged
+
+    The compacted file lists its inputs in its metadata and is renamed into
+    place before they are deleted, so a compaction interrupted between the
+    two is finished by the next one instead of leaving duplicated rows.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = sorted(name for name in os.listdir(directory)
+                   if name.endswith('.parquet') and not name.startswith(('.', '_')))
+    # Finish interrupted compactions first
+    for name in [name for name in names if name.startswith('compacted-')]:
+        if name not in names:
+            continue
+        metadata = pq.read_schema(os.path.join(directory, name)).metadata or {}
+        merged = set(json.loads(metadata.get(COMPACTED_FROM_KEY, b'[]')))
+        for leftover in merged.intersection(names):
+            os.remove(os.path.join(directory, leftover))
+        names = [name for name in names if name not in merged]
+    if len(names) < 2:
+        return 0
+
+    table = pa.concat_tables([pq.read_table(os.path.join(directory, name)) for name in names],
+                             promote_options='default')
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           COMPACTED_FROM_KEY: json.dumps(names).encode('utf-8')})
+    write_parquet_file(directory, f"compacted-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet",
+                       table)
+    for name in names:
+        os.remove(os.path.join(directory, name))
+    log(logger, logging.INFO, f"🗜️ Compacted {len(names)} files", partition=directory, rows=table.num_rows)
+    return len(names)
+
+
+def compact_archive(archive_dir, before) -> int:
+    """Compact every partition of the archive dated before a YYYY-MM-DD day"""
+    compacted = 0
+    for root, dirs, files in os.walk(archive_dir):
+        dirs.sort()
+        date = os.path.basename(root).partition('date=')[2]
+        if date and date < before:
+            compacted += compact_partition(root) > 0
+    return compacted
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Archive weather records from Kafka to Parquet")
+    parser.add_argument('--topic', default=SOURCE_TOPIC, help="openweather or weather-enriched")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="archive root directory")
+    parser.add_argument('--flush-interval', type=int, default=FLUSH_INTERVAL,
+                        help="seconds between flushes")
+    parser.add_argument('--compact', action='store_true',
+                        help="compact the partitions of finished days already in the archive, then exit")
+    add_transport_arguments(parser)
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging('parquet-archive', args.log_level, args.log_format)
+    if args.compact:
+        today = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+        partitions = compact_archive(args.archive, today)
+        log(logger, logging.INFO, f"✅ {partitions} partitions compacted", archive=args.archive)
+        return
+    sink = ParquetArchiveSink(args.topic, args.archive, args.flush_interval, args.transport)
+    sink.run()
+
+
+if __name__ == "__main__":
+    main()
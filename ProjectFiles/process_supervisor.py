@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+🩺 Pipeline Process Supervisor
+Watches the Python components started by the launcher: restarts a child
+that fails (with backoff, giving up after repeated crashes) and samples its
+CPU, RSS, open file descriptors and threads at a fixed interval. Samples
+are exported as metrics and summarized in a table whose RSS trend makes
+slow leaks visible.
+"""
+
+import argparse
+import collections
+import subprocess
+import sys
+import time
+
+from weather_metrics import (COMPONENT_CPU_PERCENT, COMPONENT_OPEN_FDS, COMPONENT_RESTARTS, COMPONENT_RSS_BYTES,
+                             COMPONENT_THREADS, COMPONENT_UP, start_metrics_server)
+
+# Configuration
+METRICS_PORT = 9105        # 9100 is node_exporter's; the components use 9101-9104
+SAMPLE_INTERVAL = 5        # seconds between resource samples
+TABLE_INTERVAL = 60        # seconds between summary tables while supervising
+INITIAL_RESTART_DELAY = 1  # seconds before the first restart, doubled on each crash
+MAX_RESTART_DELAY = 60
+STABLE_AFTER = 60          # seconds of uptime after which the restart delay resets
+MAX_RESTARTS = 5           # crashes within RESTART_WINDOW before giving up
+RESTART_WINDOW = 300
+TREND_SAMPLES = 720        # RSS samples kept per component for the trend (an hour at 5s)
+STOP_TIMEOUT = 10          # seconds a child gets to exit after SIGTERM
+
+SCRIPTS = {
+    'processor': 'kafka_streams_processor.py',
+    'producer': 'working_weather_producer.py',
+}
+
+
+class ComponentStats:
+    """Resource samples of one component, across its restarts"""
+
+    def __init__(self):
+        self.samples = 0
+        self.cpu_total = 0.0
+        self.cpu_max = 0.0
+        self.rss_max = 0
+        self.fds_max = 0
+        self.threads_max = 0
+        self.last = None
+        self.rss_trend = collections.deque(maxlen=TREND_SAMPLES)
+
+    def add(self, at, cpu, rss, fds, threads):
+        self.samples += 1
+        self.cpu_total += cpu
+        self.cpu_max = max(self.cpu_max, cpu)
+        self.rss_max = max(self.rss_max, rss)
+        self.fds_max = max(self.fds_max, fds or 0)
+        self.threads_max = max(self.threads_max, threads)
+        self.last = (cpu, rss, fds, threads)
+        self.rss_trend.append((at, rss))
+
+    def rss_slope(self) -> float:
+        """Least-squares RSS growth in bytes per hour over the kept samples"""
+        if len(self.rss_trend) < 3:
+            return 0.0
+        n = len(self.rss_trend)
+        mean_t = sum(t for t, _ in self.rss_trend) / n
+        mean_r = sum(r for _, r in self.rss_trend) / n
+        variance = sum((t - mean_t) ** 2 for t, _ in self.rss_trend)
+        if not variance:
+            return 0.0
+        covariance = sum((t - mean_t) * (r - mean_r) for t, r in self.rss_trend)
+        return covariance / variance * 3600
+
+
+class SupervisedProcess:
+    """One child: its command, current process and restart bookkeeping"""
+
+    def __init__(self, name, command, process=None):
+        self.name = name
+        self.command = command
+        self.process = process
+        self.started_at = time.monotonic()
+        self.handle = None
+        self.restarts = 0
+        self.crashes = collections.deque()
+        self.restart_delay = INITIAL_RESTART_DELAY
+        self.restart_at = None
+        self.failed = False
+        self.stats = ComponentStats()
+
+    def spawn(self):
+        self.process = subprocess.Popen(self.command)
+        self.started_at = time.monotonic()
+        self.handle = None
+        self.restart_at = None
+
+    def resource_handle(self, psutil):
+        """psutil.Process of the current child, kept so cpu_percent measures between samples"""
+        if self.handle is None or self.handle.pid != self.process.pid:
+            self.handle = psutil.Process(self.process.pid)
+            self.handle.cpu_percent(None)  # first call only sets the baseline
+        return self.handle
+
+
+class ProcessSupervisor:
+    def __init__(self, interval=SAMPLE_INTERVAL, table_interval=TABLE_INTERVAL):
+        import psutil
+
+        self.psutil = psutil
+        self.interval = interval
+        self.table_interval = table_interval
+        self.children = {}
+        self.started = time.monotonic()
+
+    def adopt(self, name, command, process=None):
+        """Supervise a child, starting it unless a running process is given"""
+        child = SupervisedProcess(name, command, process)
+        if process is None:
+            child.spawn()
+        self.children[name] = child
+        COMPONENT_UP.labels(name).set(1)
+        return child
+
+    def adopt_pipeline(self, processes):
+        """Take over the children started by the startup orchestrator"""
+        for name, process in processes.processes.items():
+            self.adopt(name, processes.commands[name], process)
+
+    def check(self, child, now):
+        """Restart a crashed child once its backoff delay has passed"""
+        if child.failed:
+            return
+        code = child.process.poll()
+        if code is None:
+            if now - child.started_at >= STABLE_AFTER:
+                child.restart_delay = INITIAL_RESTART_DELAY
+            return
+        if code == 0 and child.restart_at is None:
+            # A clean exit is deliberate: leave it stopped
+            print(f"⏹️ {child.name} exited normally")
+            child.failed = True
+            COMPONENT_UP.labels(child.name).set(0)
+            return
+
+        if child.restart_at is None:
+            COMPONENT_UP.labels(child.name).set(0)
+            child.crashes.append(now)
+            while child.crashes and now - child.crashes[0] > RESTART_WINDOW:
+                child.crashes.popleft()
+            if len(child.crashes) > MAX_RESTARTS:
+                print(f"🛑 {child.name} crashed {len(child.crashes)} times in {RESTART_WINDOW}s, giving up")
+                child.failed = True
+                return
+            child.restart_at = now + child.restart_delay
+            print(f"💥 {child.name} exited with code {code}, restarting in {child.restart_delay}s")
+            child.restart_delay = min(child.restart_delay * 2, MAX_RESTART_DELAY)
+
+        if now >= child.restart_at:
+            child.spawn()
+            child.stats.rss_trend.clear()  # the trend follows one process lifetime
+            child.restarts += 1
+            COMPONENT_RESTARTS.labels(child.name).inc()
+            COMPONENT_UP.labels(child.name).set(1)
+            print(f"🔁 {child.name} restarted (pid {child.process.pid}, restart #{child.restarts})")
+
+    def sample(self, child, now):
+        """One resource sample of a running child"""
+        if child.process.poll() is not None:
+            return
+        try:
+            handle = child.resource_handle(self.psutil)
+            with handle.oneshot():
+                cpu = handle.cpu_percent(None)
+                rss = handle.memory_info().rss
+                threads = handle.num_threads()
+                fds = handle.num_fds() if hasattr(handle, 'num_fds') else handle.num_handles()
+        except (self.psutil.NoSuchProcess, self.psutil.AccessDenied):
+            return
+        child.stats.add(now, cpu, rss, fds, threads)
+        COMPONENT_CPU_PERCENT.labels(child.name).set(cpu)
+        COMPONENT_RSS_BYTES.labels(child.name).set(rss)
+        COMPONENT_OPEN_FDS.labels(child.name).set(fds)
+        COMPONENT_THREADS.labels(child.name).set(threads)
+
+    def run(self, duration=None):
+        """Check and sample every interval until interrupted (or for duration seconds)"""
+        last_table = time.monotonic()
+        try:
+            while duration is None or time.monotonic() - self.started < duration:
+                now = time.monotonic()
+                for child in self.children.values():
+                    self.check(child, now)
+                    self.sample(child, now)
+                if now - last_table >= self.table_interval:
+                    self.print_table()
+                    last_table = now
+                if self.children and all(child.failed for child in self.children.values()):
+                    print("⚠️ No supervised component left running")
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping supervised components...")
+        finally:
+            self.stop()
+            self.print_table()
+
+    def stop(self):
+        """SIGTERM every running child, then kill the ones still running after STOP_TIMEOUT"""
+        running = [child for child in self.children.values() if child.process.poll() is None]
+        for child in running:
+            child.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for child in running:
+            try:
+                child.process.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                child.process.kill()
+            COMPONENT_UP.labels(child.name).set(0)
+
+    def print_table(self):
+        elapsed = time.monotonic() - self.started
+        print(f"\n🩺 Components after {elapsed / 60:.1f} min (every {self.interval}s)")
+        print(f"   {'component':<11} {'state':<8} {'restarts':>8} {'cpu%':>6} {'avg':>6} {'max':>6} "
+              f"{'rss MB':>8} {'max':>8} {'MB/h':>7} {'fds':>5} {'thr':>4}")
+        for name, child in self.children.items():
+            stats = child.stats
+            code = child.process.poll()
+            state = ('exited' if code == 0 else 'failed') if child.failed else 'up' if code is None else 'down'
+            cpu, rss, fds, threads = stats.last or (0.0, 0, 0, 0)
+            average = stats.cpu_total / stats.samples if stats.samples else 0.0
+            print(f"   {name:<11} {state:<8} {child.restarts:>8} {cpu:>6.1f} {average:>6.1f} {stats.cpu_max:>6.1f} "
+                  f"{rss / 2**20:>8.1f} {stats.rss_max / 2**20:>8.1f} {stats.rss_slope() / 2**20:>+7.1f} "
+                  f"{fds or 0:>5} {threads:>4}")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Run pipeline components under supervision")
+    parser.add_argument('components', nargs='*', metavar='COMPONENT',
+                        help=f"components to run: {', '.join(SCRIPTS)} (default: all)")
+    parser.add_argument('--interval', type=float, default=SAMPLE_INTERVAL, help="seconds between samples")
+    parser.add_argument('--table-interval', type=float, default=TABLE_INTERVAL,
+                        help="seconds between summary tables")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"port of the supervisor's metrics endpoint (default {METRICS_PORT})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    unknown = [name for name in args.components if name not in SCRIPTS]
+    if unknown:
+        sys.exit(f"❌ Unknown component(s): {', '.join(unknown)}")
+
+    print("🩺 Pipeline Process Supervisor")
+    print("=" * 50)
+    start_metrics_server(args.metrics_port)
+
+    supervisor = ProcessSupervisor(args.interval, args.table_interval)
+    for name in args.components or SCRIPTS:
+        child = supervisor.adopt(name, [sys.executable, SCRIPTS[name]])
+        print(f"🚀 {name} started (pid {child.process.pid})")
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+🔁 Parallel Weather Reindexer
+Migrates historical openweather-* indices into a target alias using
+sliced scroll, one process per slice, with throttled bulk writes and
+checkpoint/resume
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import requests
+
+from kafka_streams_processor import compute_heat_index, temp_category
+from weather_routing import routing_key
+
+# Configuration
+ELASTICSEARCH_URL = "http://localhost:9200"
+SOURCE_PATTERN = "openweather-*"
+TARGET_ALIAS = "weather-history-v2"   # outside openweather*, which the readers and the source pattern match
+CHECKPOINT_FILE = "reindex_checkpoint.json"
+SCROLL_KEEP_ALIVE = "5m"
+
+
+def document_id(doc: dict, source_id: str = None) -> str:
+    """Deterministic document id: one document per city and observation time
+
+    Re-running a slice, or reading a duplicate observation, overwrites the
+    same target document instead of creating a new one. Documents without
+    a timestamp keep their source _id so they don't overwrite each other.
+    """
+    if doc.get('timestamp') is None and source_id is not None:
+        return source_id
+    city = doc.get('city_id')
+    if city is None:
+        city = str(doc.get('city_name', 'unknown')).lower()
+    return f"{city}-{doc.get('timestamp')}"
+
+
+def transform(doc: dict) -> dict:
+    """Recompute the derived fields of a historical document"""
+    doc = dict(doc)
+    temp = doc.get('temp')
+    humidity = doc.get('humidity')
+
+    if temp is not None:
+        doc['temp_category'] = temp_category(temp)
+        doc.pop('heat_index', None)
+        if humidity is not None:
+            heat_index = compute_heat_index(temp, humidity)
+            if heat_index is not None:
+                doc['heat_index'] = heat_index
+
+    return doc
+
+
+def target_indices(target: str) -> set:
+    """Concrete indices behind the target index or alias (empty before the first run)"""
+    response = requests.get(f"{ELASTICSEARCH_URL}/{target}/_alias", timeout=30)
+    if response.status_code == 404:
+        return set()
+    response.raise_for_status()
+    return set(response.json())
+
+
+def list_source_indices(pattern: str, target: str) -> list:
+    """Return the concrete indices matching the source pattern, without the target's own indices
+
+    A target matching the pattern would otherwise be scrolled back into
+    itself on a re-run.
+    """
+    response = requests.get(
+        f"{ELASTICSEARCH_URL}/_cat/indices/{pattern}",
+        params={'format': 'json', 'h': 'index,docs.count'},
+        timeout=30
+    )
+    response.raise_for_status()
+    excluded = target_indices(target) | {target}
+    return sorted(row['index'] for row in response.json() if row['index'] not in excluded)
+
+
+def bulk_write(target: str, docs: list, max_retries: int = 5) -> int:
+    """Index a batch of (source _id, document) into the target, retrying on 429; returns the number of failed documents"""
+    lines = []
+    for source_id, doc in docs:
+        action = {"_index": target, "_id": document_id(doc, source_id), "routing": routing_key(doc)}
+        lines.append(json.dumps({"index": action}))
+        lines.append(json.dumps(doc))
+    body = ("\n".join(lines) + "\n").encode('utf-8')
+
+    for attempt in range(max_retries):
+        response = requests.post(
+            f"{ELASTICSEARCH_URL}/_bulk",
+            headers={'Content-Type': 'application/x-ndjson'},
+            data=body,
+            timeout=120
+        )
+        if response.status_code == 429:
+            time.sleep(2 ** attempt)
+            continue
+        response.raise_for_status()
+
+        result = response.json()
+        if not result.get('errors'):
+            return 0
+        statuses = [item['index'].get('status', 500) for item in result['items']]
+        if all(status < 300 or status == 429 for status in statuses) and attempt < max_retries - 1:
+            time.sleep(2 ** attempt)
+            continue
+        return sum(1 for status in statuses if status >= 300)
+
+    return len(docs)
+
+
+def reindex_slice(index: str, slice_id: int, max_slices: int, target: str,
+                  batch_size: int, docs_per_second: float) -> dict:
+    """Worker: scroll one slice of one source index, transform and bulk write it"""
+    query = {"size": batch_size, "sort": ["_doc"]}
+    if max_slices > 1:
+        query["slice"] = {"id": slice_id, "max": max_slices}
+
+    started = time.time()
+    copied = 0
+    failed = 0
+
+    response = requests.post(
+        f"{ELASTICSEARCH_URL}/{index}/_search",
+        params={'scroll': SCROLL_KEEP_ALIVE},
+        json=query,
+        timeout=120
+    )
+    response.raise_for_status()
+    page = response.json()
+    scroll_id = page.get('_scroll_id')
+
+    try:
+        while page['hits']['hits']:
+            batch_start = time.time()
+            docs = [(hit['_id'], transform(hit['_source'])) for hit in page['hits']['hits']]
+            failed += bulk_write(target, docs)
+            copied += len(docs)
+
+            # Throttle: spread this worker's share of the rate over the batch
+            if docs_per_second > 0:
+                pause = len(docs) / docs_per_second - (time.time() - batch_start)
+                if pause > 0:
+                    time.sleep(pause)
+
+            response = requests.post(
+                f"{ELASTICSEARCH_URL}/_search/scroll",
+                json={'scroll': SCROLL_KEEP_ALIVE, 'scroll_id': scroll_id},
+                timeout=120
+            )
+            response.raise_for_status()
+            page = response.json()
+            scroll_id = page.get('_scroll_id', scroll_id)
+    finally:
+        if scroll_id:
+            requests.delete(f"{ELASTICSEARCH_URL}/_search/scroll",
+                            json={'scroll_id': scroll_id}, timeout=30)
+
+    return {
+        'index': index,
+        'slice': slice_id,
+        'copied': copied,
+        'failed': failed,
+        'seconds': round(time.time() - started, 2)
+    }
+
+
+def unit_key(index: str, slice_id: int, max_slices: int) -> str:
+    """Checkpoint key of one (index, slice) unit of work
+
+    The slice count is part of the key: slice 2 of 4 and slice 2 of 8 are
+    different documents, so resuming with another --slices redoes them all.
+    """
+    return f"{index}#{slice_id}/{max_slices}"
+
+
+def load_checkpoint(path: str) -> set:
+    """Return the set of completed units"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(json.load(f).get('done', []))
+
+
+def save_checkpoint(path: str, done: set):
+    """Atomically persist the completed units"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'done': sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+def parse_args():
+    """Parse command line options"""
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Parallel sliced-scroll reindex of weather history")
+    parser.add_argument('--source', default=SOURCE_PATTERN, help="source index pattern")
+    parser.add_argument('--target', default=TARGET_ALIAS, help="target index or write alias")
+    parser.add_argument('--workers', type=int, default=cores, help="worker processes (default: all cores)")
+    parser.add_argument('--slices', type=int, default=cores, help="scroll slices per source index")
+    parser.add_argument('--batch-size', type=int, default=1000, help="documents per scroll page / bulk request")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="total documents per second across workers (0 = unthrottled)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help="checkpoint file used to resume")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("🔁 Parallel Weather Reindexer")
+    print("=" * 50)
+    print(f"Source: {args.source} → Target: {args.target}")
+    print(f"Workers: {args.workers}, slices/index: {args.slices}, batch: {args.batch_size}")
+
+    indices = list_source_indices(args.source, args.target)
+    done = load_checkpoint(args.checkpoint)
+    units = [(index, slice_id) for index in indices for slice_id in range(args.slices)
+             if unit_key(index, slice_id, args.slices) not in done]
+
+    print(f"📋 {len(indices)} indices, {len(units)} slices to process ({len(done)} already done)")
+    if not units:
+        print("✅ Nothing to do")
+        return
+
+    # With fewer units than workers, only len(units) workers ever run
+    per_worker_rate = args.rate / min(args.workers, len(units)) if args.rate > 0 else 0
+    started = time.time()
+    total_copied = 0
+    total_failed = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(reindex_slice, index, slice_id, args.slices, args.target,
+                        args.batch_size, per_worker_rate): (index, slice_id)
+            for index, slice_id in units
+        }
+
+        for completed, future in enumerate(as_completed(futures), 1):
+            index, slice_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ {index} slice {slice_id}: {e}")
+                continue
+
+            total_copied += result['copied']
+            total_failed += result['failed']
+            if result['failed'] == 0:
+                done.add(unit_key(index, slice_id, args.slices))
+                save_checkpoint(args.checkpoint, done)
+
+            elapsed = time.time() - started
+            remaining = elapsed / completed * (len(units) - completed)
+            print(f"✅ [{completed}/{len(units)}] {index} slice {slice_id}: "
+                  f"{result['copied']} docs in {result['seconds']}s "
+                  f"({total_copied / elapsed:.0f} docs/s, ETA {remaining:.0f}s)")
+
+    print(f"\n📊 Copied {total_copied} documents, {total_failed} failed, "
+          f"in {time.time() - started:.1f}s")
+    if total_failed:
+        print("⚠️ Some slices had failures; re-run to retry them from the checkpoint")
+
+
+if __name__ == "__main__":
+    main()
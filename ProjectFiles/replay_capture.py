@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+⏪ Raw Capture Replay
+Streams captured OpenWeather responses (weather_capture.py) back into the
+pipeline: to the openweather topic, exactly as the producer would have
+sent them, or straight into an in-process streams processor on the memory
+transport to reproduce a bug or measure it without a broker.
+
+At --speed 1 the original inter-arrival times are kept, at --speed N they
+are divided by N, and without --speed records go as fast as possible.
+Captures are read as a stream, so memory stays bounded whatever their size.
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from weather_capture import read_capture
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_profiling import add_profiling_arguments, profiler_from_args
+from weather_schema import weather_record
+from weather_transport import BOUNDED_MEMORY_RETENTION, CLI_TRANSPORTS, create_producer, set_memory_retention
+
+# Configuration
+KAFKA_TOPIC = 'openweather'
+PROCESSOR_BATCH = 500      # records fed to the in-process processor between two drains
+MAX_SLEEP = 5              # seconds slept at once while waiting for a record's replay time
+
+logger = logging.getLogger('replay')
+
+
+def captured_records(entries, stats):
+    """(capture time, record) of every successful response, built like get_weather_infos does"""
+    for entry in entries:
+        if entry.get('status') != 200:
+            stats['skipped'] += 1
+            continue
+        try:
+            record = weather_record(json.loads(entry['body']))
+        except (ValueError, KeyError, IndexError, TypeError):
+            stats['invalid'] += 1
+            continue
+        # Keep the original fetch time rather than the replay time
+        record['created_at'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['ts']))
+        yield entry['ts'], record
+
+
+def paced(records, speed):
+    """Delay records so that their capture times are replayed speed times faster (no delay when speed is 0)"""
+    first = started = None
+    for captured_at, record in records:
+        if speed:
+            if first is None:
+                first, started = captured_at, time.monotonic()
+            due = started + (captured_at - first) / speed
+            while True:
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, MAX_SLEEP))
+        yield record
+
+
+def replay_to_kafka(records, transport, topic, progress, stats):
+    """Send records to the topic, counting them in stats['records'] as they go"""
+    producer = create_producer(transport, client_id='capture-replay')
+    try:
+        for record in records:
+            producer.send(topic, json.dumps(record), key=record['city_name'])
+            stats['records'] += 1
+            progress.record()
+    finally:
+        producer.flush()
+        producer.close()
+
+
+def replay_to_processor(records, profiler, progress, stats, batch=PROCESSOR_BATCH):
+    """Feed an in-process WeatherStreamsProcessor through the memory transport, draining it every batch
+
+    stats['records'] counts the records processed so far.
+    """
+    from kafka_streams_processor import WeatherStreamsProcessor
+
+    # The processor's output topics are never read: keep them bounded whatever the capture size
+    set_memory_retention(BOUNDED_MEMORY_RETENTION)
+    processor = WeatherStreamsProcessor(profiler, transport='memory')
+    processor.process_batch(0)  # join the group and take the end offsets as positions
+    feed = create_producer('memory')
+    pending = 0
+
+    def drain():
+        while True:
+            polled = processor.process_batch(0)
+            if not polled:
+                return
+            stats['records'] += polled
+            progress.record(count=polled)
+
+    try:
+        for record in records:
+            feed.send(KAFKA_TOPIC, json.dumps(record).encode('utf-8'), key=record['city_name'])
+            pending += 1
+            if pending >= batch:
+                drain()
+                pending = 0
+        drain()
+    finally:
+        if profiler:
+            profiler.finish()
+        processor.records.summary()
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Replay captured OpenWeather responses into the pipeline")
+    parser.add_argument('captures', nargs='+', help="capture files, replayed in the order given")
+    parser.add_argument('--target', choices=['kafka', 'processor'], default='kafka',
+                        help="openweather topic, or an in-process streams processor (memory transport)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="1 keeps the captured timing, N replays N times faster (default: as fast as possible)")
+    parser.add_argument('--transport', choices=CLI_TRANSPORTS, default='confluent',
+                        help="Kafka client library for --target kafka (default confluent)")
+    parser.add_argument('--topic', default=KAFKA_TOPIC)
+    parser.add_argument('--limit', type=int, help="stop after this many records")
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging('replay', args.log_level, args.log_format)
+    log(logger, logging.INFO, "⏪ Raw Capture Replay", captures=args.captures, target=args.target,
+        speed=args.speed or 'max')
+
+    stats = {'records': 0, 'skipped': 0, 'invalid': 0}
+    records = paced(captured_records(read_capture(args.captures), stats), args.speed)
+    if args.limit:
+        records = (record for _, record in zip(range(args.limit), records))
+
+    progress = RecordLog(logger, 'records')
+    started = time.monotonic()
+    try:
+        if args.target == 'kafka':
+            replay_to_kafka(records, args.transport, args.topic, progress, stats)
+        else:
+            # Paced replays hand every record to the processor as it comes
+            replay_to_processor(records, profiler_from_args('processor', args), progress, stats,
+                                1 if args.speed else PROCESSOR_BATCH)
+    except KeyboardInterrupt:
+        log(logger, logging.INFO, "🛑 Replay interrupted")
+    finally:
+        elapsed = time.monotonic() - started
+        progress.summary()
+        log(logger, logging.INFO, f"✅ Replay finished in {elapsed:.1f}s",
+            rate=round(stats['records'] / max(elapsed, 1e-9), 1), seconds=round(elapsed, 2), **stats)
+
+
+if __name__ == "__main__":
+    main()
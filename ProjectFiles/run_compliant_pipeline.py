@@ -4,74 +4,13 @@
 Respecte 100% des spécifications du projet
 """
 
+import argparse
 import subprocess
-import time
 import requests
-import json
 
-def setup_kafka_topics():
-    """Création des topics Kafka requis"""
-    topics = [
-        'openweather',           # Topic source
-        'weather-enriched',      # Topic enrichi par Kafka Streams
-        'weather-aggregated'     # Topic agrégé
-    ]
-    
-    print("📋 Création des topics Kafka...")
-    for topic in topics:
-        try:
-            subprocess.run([
-                'docker', 'exec', 'kafka',
-                'kafka-topics', '--create',
-                '--topic', topic,
-                '--bootstrap-server', 'localhost:9092',
-                '--partitions', '3',
-                '--replication-factor', '1'
-            ], check=True, capture_output=True)
-            print(f"✅ Topic '{topic}' créé")
-        except subprocess.CalledProcessError:
-            print(f"⚠️ Topic '{topic}' existe déjà")
-
-def start_kafka_connect():
-    """Démarrage de Kafka Connect"""
-    print("🔗 Démarrage de Kafka Connect...")
-    try:
-        subprocess.run([
-            'docker-compose', '-f', 'kafka-connect/docker-compose-connect.yml', 'up', '-d'
-        ], check=True)
-        print("✅ Kafka Connect démarré")
-        
-        # Attendre que Kafka Connect soit prêt
-        print("⏳ Attente de Kafka Connect...")
-        time.sleep(30)
-        
-        # Vérifier le statut
-        response = requests.get('http://localhost:8083/connectors')
-        if response.status_code == 200:
-            print("✅ Kafka Connect opérationnel")
-        else:
-            print("❌ Problème avec Kafka Connect")
-            
-    except Exception as e:
-        print(f"❌ Erreur Kafka Connect: {e}")
-
-def start_kafka_streams():
-    """Démarrage du processeur Kafka Streams"""
-    print("🔄 Démarrage de Kafka Streams...")
-    try:
-        subprocess.Popen(['python', 'kafka_streams_processor.py'])
-        print("✅ Kafka Streams démarré")
-    except Exception as e:
-        print(f"❌ Erreur Kafka Streams: {e}")
-
-def start_weather_producer():
-    """Démarrage du producteur météo"""
-    print("🌤️ Démarrage du producteur météo...")
-    try:
-        subprocess.Popen(['python', 'working_weather_producer.py'])
-        print("✅ Producteur météo démarré")
-    except Exception as e:
-        print(f"❌ Erreur producteur: {e}")
+from process_supervisor import METRICS_PORT, SAMPLE_INTERVAL, ProcessSupervisor
+from startup_orchestrator import PipelineProcesses, StartupOrchestrator, default_components
+from weather_metrics import start_metrics_server
 
 def verify_pipeline():
     """Vérification de la conformité du pipeline"""
@@ -163,27 +102,30 @@ def check_visualization():
     except:
         return False
 
+def parse_args():
+    """Options de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Démarre et supervise le pipeline météo complet")
+    parser.add_argument('--no-supervise', action='store_true',
+                        help="rendre la main après le démarrage au lieu de superviser les processus")
+    parser.add_argument('--interval', type=float, default=SAMPLE_INTERVAL,
+                        help="secondes entre deux mesures CPU/RSS/fds/threads")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"port des métriques du superviseur (défaut {METRICS_PORT})")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     print("🚀 Démarrage du Pipeline Conforme aux Exigences")
     print("=" * 60)
     
-    # 1. Setup des topics
-    setup_kafka_topics()
-    
-    # 2. Démarrage Kafka Connect
-    start_kafka_connect()
-    
-    # 3. Démarrage Kafka Streams
-    start_kafka_streams()
+    # 1. Démarrage en graphe de dépendances : chaque composant attend la
+    #    disponibilité réelle de ceux dont il dépend, sans pause fixe
+    processes = PipelineProcesses()
+    orchestrator = StartupOrchestrator(default_components(processes))
+    orchestrator.run()
+    orchestrator.print_timeline()
     
-    # 4. Démarrage du producteur
-    start_weather_producer()
-    
-    # 5. Attendre un peu pour que tout se stabilise
-    print("\n⏳ Stabilisation du pipeline...")
-    time.sleep(10)
-    
-    # 6. Vérification
+    # 2. Vérification
     is_compliant = verify_pipeline()
     
     if is_compliant:
@@ -196,6 +138,16 @@ def main():
     print(f"📊 Kibana: http://localhost:5601")
     print(f"🔍 Elasticsearch: http://localhost:9200")
     print(f"🔗 Kafka Connect: http://localhost:8083")
+    
+    # 3. Supervision : redémarrage des composants Python en échec et
+    #    mesure de leurs ressources (métriques + tableau récapitulatif)
+    if args.no_supervise or not processes.processes:
+        return
+    print(f"\n🩺 Supervision de {', '.join(processes.processes)} (Ctrl+C pour tout arrêter)")
+    start_metrics_server(args.metrics_port)
+    supervisor = ProcessSupervisor(args.interval)
+    supervisor.adopt_pipeline(processes)
+    supervisor.run()
 
 if __name__ == "__main__":
     main()
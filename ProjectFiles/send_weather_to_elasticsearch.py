@@ -4,11 +4,24 @@
 Bypasses Kafka and sends weather data directly to Elasticsearch
 """
 
+import argparse
+import logging
 import requests
 import json
 import time
 from datetime import datetime
 import configparser
+from weather_latest_index import create_latest_index, upsert_latest
+from weather_routing import routing_params
+from weather_metrics import FETCH_LATENCY, INDEX_LATENCY, RECORDS_FETCHED, RECORDS_INDEXED, start_metrics_server
+from weather_trace import DEFAULT_SAMPLE_RATE, Tracer
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_api import add_api_arguments, current_weather_url, use_base_url
+from weather_capture import add_capture_arguments, capture_response, start_capture
+
+METRICS_PORT = 9103
+
+logger = logging.getLogger('direct-sender')
 
 def get_api_key():
     """Get API key from config file"""
@@ -18,10 +31,12 @@ def get_api_key():
 
 def get_weather_data(city_name: str, api_key: str) -> dict:
     """Get weather data from OpenWeather API 2.5"""
-    url = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    url = current_weather_url(city_name, api_key)
     
     try:
-        response = requests.get(url)
+        with FETCH_LATENCY.labels(city_name).time():
+            response = requests.get(url)
+        capture_response(city_name, response)
         if response.status_code == 200:
             data = response.json()
             
@@ -50,82 +65,112 @@ def get_weather_data(city_name: str, api_key: str) -> dict:
                 'sunset': data['sys']['sunset']
             }
             
+            RECORDS_FETCHED.labels('ok').inc()
             return weather_data
         else:
-            print(f"❌ Error fetching {city_name}: {response.status_code}")
+            RECORDS_FETCHED.labels('error').inc()
+            log(logger, logging.DEBUG, "❌ Error fetching", city=city_name, status=response.status_code)
             return None
             
     except Exception as e:
-        print(f"❌ Exception fetching {city_name}: {e}")
+        RECORDS_FETCHED.labels('error').inc()
+        log(logger, logging.DEBUG, "❌ Exception fetching", city=city_name, error=str(e))
         return None
 
-def send_to_elasticsearch(data: dict, index: str = "openweather"):
-    """Send data directly to Elasticsearch"""
+def send_to_elasticsearch(data: dict, index: str = "openweather", wait_for_visibility: bool = False):
+    """Send data directly to Elasticsearch (wait_for_visibility: return once searchable)"""
     url = f"http://localhost:9200/{index}/_doc"
     headers = {'Content-Type': 'application/json'}
+    params = routing_params(data)
+    if wait_for_visibility:
+        params['refresh'] = 'wait_for'
     
     try:
-        response = requests.post(url, headers=headers, json=data)
+        with INDEX_LATENCY.labels(index, 'index').time():
+            response = requests.post(url, headers=headers, params=params, json=data)
         if response.status_code in [200, 201]:
+            RECORDS_INDEXED.labels(index, 'ok').inc()
             return True
         else:
-            print(f"❌ Elasticsearch error: {response.status_code} - {response.text}")
+            RECORDS_INDEXED.labels(index, 'error').inc()
+            log(logger, logging.DEBUG, "❌ Elasticsearch error", status=response.status_code, body=response.text)
             return False
     except Exception as e:
-        print(f"❌ Elasticsearch exception: {e}")
+        RECORDS_INDEXED.labels(index, 'error').inc()
+        log(logger, logging.DEBUG, "❌ Elasticsearch exception", error=str(e))
         return False
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Send OpenWeather observations directly to Elasticsearch")
+    parser.add_argument('--trace-sample', type=float, default=DEFAULT_SAMPLE_RATE, metavar='RATE',
+                        help=f"fraction of records traced until searchable (default {DEFAULT_SAMPLE_RATE}, 0 disables)")
+    add_api_arguments(parser)
+    add_capture_arguments(parser)
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
 def main():
-    print("🌤️ Direct Weather to Elasticsearch Sender")
-    print("=" * 50)
+    args = parse_args()
+    setup_logging('direct-sender', args.log_level, args.log_format)
+    use_base_url(args.api_url)
+    start_capture(args.capture)
     
     # Configuration
     cities = ["London", "Berlin", "Paris", "Barcelona", "Amsterdam", "Krakow", "Vienna"]
     api_key = get_api_key()
     
-    print(f"API Key: {api_key[:8]}...")
-    print(f"Cities: {cities}")
-    print(f"Target: Elasticsearch (http://localhost:9200/openweather)")
-    print("=" * 50)
+    log(logger, logging.INFO, "🌤️ Direct Weather to Elasticsearch Sender", api_key=f"{api_key[:8]}...",
+        cities=cities, api_url=args.api_url, target="http://localhost:9200/openweather")
+    
+    create_latest_index()
+    start_metrics_server(METRICS_PORT)
+    tracer = Tracer('direct-sender', args.trace_sample)
+    records = RecordLog(logger, 'cities')
     
     cycle = 1
     
     try:
         while True:
-            print(f"\n🔄 Cycle {cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print("-" * 40)
+            log(logger, logging.DEBUG, "🔄 Cycle started", cycle=cycle)
             
             success_count = 0
             
             for city in cities:
-                print(f"📡 Fetching {city}...", end=" ")
-                
                 # Get weather data
+                trace = tracer.start()
                 weather_data = get_weather_data(city, api_key)
                 
                 if weather_data:
-                    # Send to Elasticsearch
-                    if send_to_elasticsearch(weather_data):
-                        print(f"✅ {weather_data['temp']}°C, {weather_data['weather_description']}")
+                    # Send to Elasticsearch (traced records wait until searchable)
+                    if trace:
+                        trace.stamp('fe')
+                    if send_to_elasticsearch(weather_data, wait_for_visibility=trace is not None):
+                        if trace:
+                            tracer.finish(trace.stamp('ia'))
+                        upsert_latest(weather_data)
+                        records.record("✅ Indexed", city=city, temp=weather_data['temp'],
+                                       description=weather_data['weather_description'])
                         success_count += 1
                     else:
-                        print(f"❌ Failed to send to Elasticsearch")
+                        records.record("❌ Failed to send to Elasticsearch", error=True, city=city)
                 else:
-                    print(f"❌ Failed to fetch data")
+                    records.record("❌ Failed to fetch data", error=True, city=city)
             
-            print(f"\n📊 Successfully processed {success_count}/{len(cities)} cities")
+            log(logger, logging.INFO, "📊 Cycle complete", cycle=cycle, succeeded=success_count, cities=len(cities))
             
             if cycle >= 3:  # Just send a few cycles for testing
-                print("\n✅ Sample data sent! Check Kibana for the new fields.")
+                log(logger, logging.INFO, "✅ Sample data sent! Check Kibana for the new fields.")
                 break
             
             cycle += 1
-            print("\n⏰ Waiting 10 seconds before next cycle...")
             time.sleep(10)
             
     except KeyboardInterrupt:
-        print("\n🛑 Stopping sender...")
-        print("👋 Sender stopped.")
+        log(logger, logging.INFO, "🛑 Sender stopped")
+    finally:
+        records.summary()
+        tracer.close()
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,7 @@ import requests
 import json
 import time
 from datetime import datetime
+from weather_latest_index import LATEST_INDEX
 
 # Configuration
 KIBANA_URL = "http://localhost:5601"
@@ -94,7 +95,10 @@ def create_index_pattern():
 def get_sample_data():
     """Get sample data to understand the structure"""
     try:
-        response = requests.get(f"{ELASTICSEARCH_URL}/openweather/_search?size=1")
+        # Prefer the latest-per-city index: one small document per city, no sort
+        response = requests.get(f"{ELASTICSEARCH_URL}/{LATEST_INDEX}/_search?size=1")
+        if response.status_code != 200 or response.json()['hits']['total']['value'] == 0:
+            response = requests.get(f"{ELASTICSEARCH_URL}/openweather/_search?size=1&sort=timestamp:desc")
         if response.status_code == 200:
             data = response.json()
             if data['hits']['total']['value'] > 0:
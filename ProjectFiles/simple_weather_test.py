@@ -10,6 +10,8 @@ import configparser
 import os
 import time
 
+from weather_api import current_weather_url
+
 def config():
     """Read API key from config file"""
     config_parser = configparser.ConfigParser()
@@ -21,7 +23,7 @@ def get_weather_infos(city_name: str, api_key: str) -> dict:
     '''Request the data from OpenWeather Current Weather API 2.5'''
     
     # Current Weather API 2.5 endpoint (free tier)
-    openweather_endpoint = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    openweather_endpoint = current_weather_url(city_name, api_key)
     
     try:
         api_response = requests.get(openweather_endpoint)
@@ -5,12 +5,11 @@ Starts all Docker services and verifies the complete pipeline
 """
 
 import subprocess
-import time
-import requests
-import json
 import sys
 import os
 
+from startup_orchestrator import StartupOrchestrator, default_components
+
 def print_header(title):
     """Print formatted header"""
     print("\n" + "=" * 60)
@@ -39,61 +38,6 @@ def run_command(command, description, check=True):
         print(f"❌ {description} - Failed with error: {e}")
         return False
 
-def check_service(url, service_name, timeout=60):
-    """Check if service is responding"""
-    print(f"🔍 Checking {service_name}...")
-    
-    for i in range(timeout):
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                print(f"✅ {service_name} is ready!")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        if i % 10 == 0:
-            print(f"⏳ Waiting for {service_name}... ({i}/{timeout}s)")
-        time.sleep(1)
-    
-    print(f"❌ {service_name} failed to start within {timeout} seconds")
-    return False
-
-def check_kafka_topics():
-    """Check if Kafka topics exist"""
-    print("🔍 Checking Kafka topics...")
-    try:
-        result = subprocess.run([
-            'docker', 'exec', 'kafka', 
-            'kafka-topics', '--bootstrap-server', 'localhost:9092', '--list'
-        ], capture_output=True, text=True, timeout=30)
-        
-        if 'openweather' in result.stdout:
-            print("✅ Kafka topic 'openweather' exists")
-            return True
-        else:
-            print("⚠️ Creating Kafka topic 'openweather'...")
-            create_result = subprocess.run([
-                'docker', 'exec', 'kafka',
-                'kafka-topics', '--create', '--topic', 'openweather',
-                '--bootstrap-server', 'localhost:9092',
-                '--partitions', '3', '--replication-factor', '1'
-            ], capture_output=True, text=True)
-            
-            if create_result.returncode == 0:
-                print("✅ Kafka topic 'openweather' created")
-                return True
-            else:
-                print("❌ Failed to create Kafka topic")
-                return False
-                
-    except subprocess.TimeoutExpired:
-        print("❌ Timeout checking Kafka topics")
-        return False
-    except Exception as e:
-        print(f"❌ Error checking Kafka topics: {e}")
-        return False
-
 def verify_api_key():
     """Verify API key exists"""
     print("🔍 Checking API key configuration...")
@@ -141,61 +85,43 @@ def main():
         sys.exit(1)
     
     # Step 2: Start Docker services
-    print_step(2, "Start Docker Services")
+    print_step(2, "Reset Docker Services")
     
     # Stop any existing containers
     run_command("docker-compose down", "Stop existing containers", check=False)
     
-    # Start all services
-    if not run_command("docker-compose up -d", "Start all Docker services"):
-        print("🛑 Failed to start Docker services")
-        sys.exit(1)
-    
-    # Step 3: Wait for services to be ready
-    print_step(3, "Wait for Services to Start")
+    # Step 3: Start services in dependency order, each gated on a readiness probe
+    print_step(3, "Start Services and Wait for Readiness")
     
-    services = [
-        ("http://localhost:9200/_cluster/health", "Elasticsearch"),
-        ("http://localhost:5601/api/status", "Kibana"),
-    ]
-    
-    all_ready = True
-    for url, name in services:
-        if not check_service(url, name):
-            all_ready = False
+    orchestrator = StartupOrchestrator(default_components(with_connect=False))
+    all_ready = orchestrator.run(['kibana', 'logstash', 'topics'])
+    orchestrator.print_timeline()
     
     if not all_ready:
         print("🛑 Some services failed to start")
         sys.exit(1)
     
-    # Step 4: Verify Kafka
-    print_step(4, "Verify Kafka Configuration")
-    
-    if not check_kafka_topics():
-        print("🛑 Kafka configuration failed")
-        sys.exit(1)
-    
-    # Step 5: Create HTML Dashboard
-    print_step(5, "Generate HTML Dashboard")
+    # Step 4: Create HTML Dashboard
+    print_step(4, "Generate HTML Dashboard")
     
     if not run_command("python create_html_dashboard.py", "Generate HTML dashboard"):
         print("⚠️ HTML dashboard generation failed, but continuing...")
     
-    # Step 6: Display access information
-    print_step(6, "Project Ready!")
+    # Step 5: Display access information
+    print_step(5, "Project Ready!")
     
     print("\n🎉 Weather Dashboard Project is now running!")
     print("\n🌐 Access Points:")
     print("   📊 Kibana Dashboard:     http://localhost:5601")
     print("   🔍 Elasticsearch:        http://localhost:9200")
-    print("   📱 HTML Dashboard:       weather_dashboard.html")
+    print("   📱 HTML Dashboard:       http://localhost:8000 (python dashboard_server.py)")
     print("   🐳 Docker Containers:    docker ps")
     
     print("\n🚀 Next Steps:")
     print("   1. Start weather data collection:")
     print("      python working_weather_producer.py")
-    print("\n   2. Open HTML dashboard:")
-    print("      Double-click weather_dashboard.html")
+    print("\n   2. Start the HTML dashboard server and open http://localhost:8000:")
+    print("      python dashboard_server.py")
     print("\n   3. Setup Kibana dashboard:")
     print("      python setup_kibana_dashboard.py")
     
@@ -4,12 +4,26 @@ Complete Weather Pipeline Starter
 This script sends weather data directly to Elasticsearch to build the dashboard
 """
 
+import argparse
+import logging
 import requests
 import json
 import time
 import configparser
 import os
 from datetime import datetime
+from weather_latest_index import create_latest_index, upsert_latest
+from weather_routing import routing_params
+from weather_metrics import FETCH_LATENCY, INDEX_LATENCY, RECORDS_FETCHED, RECORDS_INDEXED, start_metrics_server
+from weather_trace import DEFAULT_SAMPLE_RATE, Tracer
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_api import add_api_arguments, current_weather_url, use_base_url
+from weather_capture import add_capture_arguments, capture_response, start_capture
+
+METRICS_PORT = 9104
+HISTORY_INDEX = "openweather"
+
+logger = logging.getLogger('pipeline-starter')
 
 def config():
     """Read API key from config file"""
@@ -20,17 +34,21 @@ def config():
 
 def get_weather_data(city_name: str, api_key: str) -> dict:
     """Get weather data from OpenWeather API"""
-    url = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    url = current_weather_url(city_name, api_key)
     
     try:
-        response = requests.get(url, timeout=10)
+        with FETCH_LATENCY.labels(city_name).time():
+            response = requests.get(url, timeout=10)
+        capture_response(city_name, response)
         response.raise_for_status()
         data = response.json()
         
+        RECORDS_FETCHED.labels('ok').inc()
         return {
             '@timestamp': datetime.utcnow().isoformat(),
             'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'timestamp': data['dt'],
+            'city_id': data['id'],
             'city_name': data['name'],
             'country': data['sys']['country'],
             'lat': data['coord']['lat'],
@@ -52,65 +70,94 @@ def get_weather_data(city_name: str, api_key: str) -> dict:
             'sunset': data['sys']['sunset']
         }
     except Exception as e:
-        print(f"Error fetching {city_name}: {e}")
+        RECORDS_FETCHED.labels('error').inc()
+        log(logger, logging.DEBUG, "Error fetching", city=city_name, error=str(e))
         return None
 
-def send_to_elasticsearch(data):
-    """Send data directly to Elasticsearch"""
-    es_url = "http://localhost:9200/openweather/_doc"
+def send_to_elasticsearch(data, wait_for_visibility=False):
+    """Send data directly to Elasticsearch (wait_for_visibility: return once searchable)"""
+    es_url = f"http://localhost:9200/{HISTORY_INDEX}/_doc"
+    params = routing_params(data)
+    if wait_for_visibility:
+        params['refresh'] = 'wait_for'
     
     try:
-        response = requests.post(
-            es_url,
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(data),
-            timeout=10
-        )
-        return response.status_code in [200, 201]
+        with INDEX_LATENCY.labels(HISTORY_INDEX, 'index').time():
+            response = requests.post(
+                es_url,
+                headers={"Content-Type": "application/json"},
+                params=params,
+                data=json.dumps(data),
+                timeout=10
+            )
+        ok = response.status_code in [200, 201]
     except Exception as e:
-        print(f"Error sending to Elasticsearch: {e}")
-        return False
+        log(logger, logging.DEBUG, "Error sending to Elasticsearch", error=str(e))
+        ok = False
+    RECORDS_INDEXED.labels(HISTORY_INDEX, 'ok' if ok else 'error').inc()
+    return ok
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Send OpenWeather observations to Elasticsearch every minute")
+    parser.add_argument('--trace-sample', type=float, default=DEFAULT_SAMPLE_RATE, metavar='RATE',
+                        help=f"fraction of records traced until searchable (default {DEFAULT_SAMPLE_RATE}, 0 disables)")
+    add_api_arguments(parser)
+    add_capture_arguments(parser)
+    add_logging_arguments(parser)
+    return parser.parse_args()
 
 def main():
     """Main pipeline function"""
+    args = parse_args()
+    setup_logging('pipeline-starter', args.log_level, args.log_format)
+    use_base_url(args.api_url)
+    start_capture(args.capture)
     api_key = config()
     cities = ['London', 'Berlin', 'Paris', 'Barcelona', 'Amsterdam', 'Krakow', 'Vienna']
     
-    print("🌤️  Starting Weather Dashboard Data Pipeline")
-    print(f"Cities: {cities}")
-    print(f"API Key: {api_key[:8]}...")
-    print("=" * 60)
+    log(logger, logging.INFO, "🌤️ Starting Weather Dashboard Data Pipeline", cities=cities,
+        api_key=f"{api_key[:8]}...")
+    
+    create_latest_index()
+    start_metrics_server(METRICS_PORT)
+    tracer = Tracer('pipeline-starter', args.trace_sample)
+    records = RecordLog(logger, 'cities')
     
     cycle = 1
     while True:
-        print(f"\n🔄 Cycle {cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("-" * 40)
+        log(logger, logging.DEBUG, "🔄 Cycle started", cycle=cycle)
         
         for city in cities:
-            print(f"📡 {city}...", end=" ")
-            
             # Get weather data
+            trace = tracer.start()
             weather_data = get_weather_data(city, api_key)
             
             if weather_data:
-                # Send to Elasticsearch
-                if send_to_elasticsearch(weather_data):
-                    print(f"✅ {weather_data['temp']}°C, {weather_data['weather_description']}")
+                # Send to Elasticsearch (traced records wait until searchable)
+                if trace:
+                    trace.stamp('fe')
+                if send_to_elasticsearch(weather_data, wait_for_visibility=trace is not None):
+                    if trace:
+                        tracer.finish(trace.stamp('ia'))
+                    upsert_latest(weather_data)
+                    records.record("✅ Indexed", city=city, temp=weather_data['temp'],
+                                   description=weather_data['weather_description'])
                 else:
-                    print("❌ Failed to send to ES")
+                    records.record("❌ Failed to send to ES", error=True, city=city)
             else:
-                print("❌ Failed to fetch")
+                records.record("❌ Failed to fetch", error=True, city=city)
         
-        print(f"\n⏰ Waiting 60 seconds... (Cycle {cycle} complete)")
-        print("💡 Check Kibana Discover to see new data!")
+        log(logger, logging.DEBUG, "⏰ Cycle complete, waiting 60 seconds", cycle=cycle)
         
         time.sleep(60)
+        records.tick()
         cycle += 1
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print("\n🛑 Pipeline stopped by user")
+        log(logger, logging.INFO, "🛑 Pipeline stopped by user")
     except Exception as e:
-        print(f"\n❌ Pipeline error: {e}")
+        logger.exception("❌ Pipeline error: %s", e)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+🚦 Pipeline Startup Orchestrator
+Starts the pipeline as a dependency graph: independent components start in
+parallel and every dependent waits on a real readiness probe (retried with
+exponential backoff) instead of a fixed sleep. A per-component startup
+timeline is printed at the end.
+"""
+
+import argparse
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import requests
+
+from topic_provisioning import TOPIC_SPECS, print_drift, provision
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+ELASTICSEARCH_URL = "http://localhost:9200"
+KIBANA_URL = "http://localhost:5601"
+KAFKA_CONNECT_URL = "http://localhost:8083"
+CONNECT_COMPOSE_FILE = 'kafka-connect/docker-compose-connect.yml'
+PIPELINE_TOPICS = list(TOPIC_SPECS)
+SOURCE_TOPIC = 'openweather'
+PROCESSOR_GROUP = 'weather-streams-processor'
+
+INITIAL_BACKOFF = 0.25   # seconds before the first re-probe
+MAX_BACKOFF = 5.0        # cap on the delay between probes
+DEFAULT_TIMEOUT = 180    # seconds a component may take to become ready
+
+
+class StartupError(Exception):
+    """Raised by a probe when waiting longer cannot help (e.g. the process exited)"""
+
+
+class Component:
+    """One node of the startup graph"""
+
+    def __init__(self, name, depends_on=(), start=None, probe=None, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.depends_on = tuple(depends_on)
+        self.start = start
+        self.probe = probe
+        self.timeout = timeout
+        self.status = 'pending'
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+        self.probes = 0
+        self.done = threading.Event()
+
+
+def wait_until(probe, timeout, initial=INITIAL_BACKOFF, maximum=MAX_BACKOFF):
+    """Call probe until it returns True, with jittered exponential backoff
+
+    Returns (ready, attempts). Exceptions count as "not ready yet" except
+    StartupError, which is re-raised at once.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            if probe():
+                return True, attempts
+        except StartupError:
+            raise
+        except Exception:
+            pass
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, attempts
+        time.sleep(min(random.uniform(delay / 2, delay), remaining))
+        delay = min(delay * 2, maximum)
+
+
+# Readiness probes
+
+def probe_port(host, port):
+    def probe():
+        with socket.create_connection((host, port), timeout=2):
+            return True
+    return probe
+
+
+def probe_elasticsearch():
+    response = requests.get(f"{ELASTICSEARCH_URL}/_cluster/health", timeout=5)
+    return response.status_code == 200 and response.json().get('status') in ('yellow', 'green')
+
+
+def probe_kibana():
+    response = requests.get(f"{KIBANA_URL}/api/status", timeout=5)
+    if response.status_code != 200:
+        return False
+    overall = response.json().get('status', {}).get('overall', {})
+    # 7.x reports a state, 8.x a level
+    return overall.get('state') == 'green' or overall.get('level') == 'available'
+
+
+def probe_kafka_connect():
+    return requests.get(f"{KAFKA_CONNECT_URL}/connectors", timeout=5).status_code == 200
+
+
+def probe_logstash():
+    """Logstash's API port is not published, so ask from inside the container"""
+    result = subprocess.run(['docker', 'exec', 'logstash', 'curl', '-sf', 'http://localhost:9600/_node/pipelines'],
+                            capture_output=True, timeout=10)
+    return result.returncode == 0
+
+
+def kafka_admin():
+    from kafka.admin import KafkaAdminClient
+
+    return KafkaAdminClient(bootstrap_servers=[KAFKA_BOOTSTRAP_SERVER], request_timeout_ms=5000,
+                            client_id='startup-orchestrator')
+
+
+def probe_kafka():
+    admin = kafka_admin()
+    try:
+        admin.list_topics()
+        return True
+    finally:
+        admin.close()
+
+
+def probe_topics(topics):
+    def probe():
+        admin = kafka_admin()
+        try:
+            return set(topics) <= set(admin.list_topics())
+        finally:
+            admin.close()
+    return probe
+
+
+def probe_consumer_group(group, process=None):
+    """Ready once the group is Stable with at least one member"""
+    def probe():
+        if process is not None and process.poll() is not None:
+            raise StartupError(f"process exited with code {process.returncode}")
+        admin = kafka_admin()
+        try:
+            description = admin.describe_consumer_groups([group])[0]
+            return description.state == 'Stable' and len(description.members) > 0
+        finally:
+            admin.close()
+    return probe
+
+
+def topic_end_offset(topic):
+    """Sum of the end offsets of every partition of a topic"""
+    from kafka import KafkaConsumer, TopicPartition
+
+    consumer = KafkaConsumer(bootstrap_servers=[KAFKA_BOOTSTRAP_SERVER], request_timeout_ms=11000)
+    try:
+        partitions = [TopicPartition(topic, p) for p in consumer.partitions_for_topic(topic) or ()]
+        return sum(consumer.end_offsets(partitions).values()) if partitions else 0
+    finally:
+        consumer.close()
+
+
+# Start actions
+
+def compose_up(service=None, compose_file=None):
+    """Start one service without waiting on its compose dependencies"""
+    command = ['docker-compose']
+    if compose_file:
+        command += ['-f', compose_file]
+    command += ['up', '-d']
+    if service:
+        # Ordering is handled here with real probes, not by compose healthchecks
+        command += ['--no-deps', service]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise StartupError(result.stderr.strip() or f"{' '.join(command)} failed")
+
+
+def create_topics():
+    """Create the missing topics in one admin request, as planned by topic_provisioning"""
+    drift = [d for d in provision() if d[1] != 'topic']
+    if drift:
+        print_drift(drift)
+
+
+class PipelineProcesses:
+    """Python components started as child processes"""
+
+    def __init__(self):
+        self.processes = {}
+        self.commands = {}
+        self.source_offset = 0
+
+    def spawn(self, name, script):
+        self.commands[name] = [sys.executable, script]
+        self.processes[name] = subprocess.Popen(self.commands[name])
+        return self.processes[name]
+
+    def start_processor(self):
+        self.spawn('processor', 'kafka_streams_processor.py')
+
+    def processor_ready(self):
+        return probe_consumer_group(PROCESSOR_GROUP, self.processes.get('processor'))()
+
+    def start_producer(self):
+        self.source_offset = topic_end_offset(SOURCE_TOPIC)
+        self.spawn('producer', 'working_weather_producer.py')
+
+    def data_flowing(self):
+        """Ready once the producer has written to the source topic"""
+        process = self.processes.get('producer')
+        if process is not None and process.poll() is not None:
+            raise StartupError(f"process exited with code {process.returncode}")
+        return topic_end_offset(SOURCE_TOPIC) > self.source_offset
+
+
+def default_components(processes=None, with_connect=True):
+    """The pipeline graph: infrastructure, then Connect, topics, processor and producer"""
+    processes = processes or PipelineProcesses()
+    components = [
+        Component('zookeeper', start=lambda: compose_up('zookeeper'), probe=probe_port('localhost', 2181)),
+        Component('kafka', ['zookeeper'], start=lambda: compose_up('kafka'), probe=probe_kafka),
+        Component('elasticsearch', start=lambda: compose_up('elasticsearch'), probe=probe_elasticsearch),
+        # Kibana starts alongside Elasticsearch and reports green once it can reach it
+        Component('kibana', start=lambda: compose_up('kibana'), probe=probe_kibana, timeout=300),
+        Component('logstash', ['kafka', 'elasticsearch'], start=lambda: compose_up('logstash'),
+                  probe=probe_logstash),
+        Component('topics', ['kafka'], start=create_topics, probe=probe_topics(PIPELINE_TOPICS)),
+        Component('processor', ['topics'], start=processes.start_processor, probe=processes.processor_ready),
+        Component('producer', ['topics', 'processor'], start=processes.start_producer,
+                  probe=processes.data_flowing, timeout=120),
+    ]
+    if with_connect:
+        components.append(Component('connect', ['kafka', 'elasticsearch'],
+                                    start=lambda: compose_up(compose_file=CONNECT_COMPOSE_FILE),
+                                    probe=probe_kafka_connect, timeout=300))
+    return components
+
+
+class StartupOrchestrator:
+    def __init__(self, components):
+        self.components = {component.name: component for component in components}
+        self.t0 = None
+
+    def closure(self, targets):
+        """Targets plus everything they depend on"""
+        selected = []
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.components:
+                raise ValueError(f"Unknown component: {name}")
+            if name not in selected:
+                selected.append(name)
+                stack.extend(self.components[name].depends_on)
+        return [name for name in self.components if name in selected]
+
+    def _elapsed(self):
+        return time.monotonic() - self.t0
+
+    def _run_component(self, component):
+        for dependency in component.depends_on:
+            upstream = self.components[dependency]
+            upstream.done.wait()
+            if upstream.status != 'ready':
+                component.status = 'skipped'
+                component.error = f"{dependency} not ready"
+                component.done.set()
+                return
+
+        component.started_at = self._elapsed()
+        print(f"🔄 [{component.started_at:6.1f}s] Starting {component.name}...")
+        try:
+            if component.start:
+                component.start()
+            ready, component.probes = wait_until(component.probe, component.timeout) if component.probe else (True, 0)
+            if not ready:
+                raise StartupError(f"not ready after {component.timeout}s")
+            component.ready_at = self._elapsed()
+            component.status = 'ready'
+            print(f"✅ [{component.ready_at:6.1f}s] {component.name} ready "
+                  f"({component.ready_at - component.started_at:.1f}s, {component.probes} probes)")
+        except Exception as e:
+            component.status = 'failed'
+            component.error = str(e)
+            print(f"❌ [{self._elapsed():6.1f}s] {component.name} failed: {e}")
+        finally:
+            component.done.set()
+
+    def run(self, targets=None):
+        """Start the targets (default: everything); returns True when all became ready"""
+        names = self.closure(targets or list(self.components))
+        self.t0 = time.monotonic()
+        threads = [threading.Thread(target=self._run_component, args=(self.components[name],),
+                                    name=f"start-{name}", daemon=True) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return all(self.components[name].status == 'ready' for name in names)
+
+    def timeline(self):
+        return [
+            {
+                'component': c.name,
+                'status': c.status,
+                'started_at': c.started_at,
+                'ready_at': c.ready_at,
+                'probes': c.probes,
+                'error': c.error
+            }
+            for c in self.components.values() if c.status != 'pending'
+        ]
+
+    def print_timeline(self, width=40):
+        entries = sorted(self.timeline(), key=lambda e: (e['started_at'] is None, e['started_at'] or 0))
+        total = max([e['ready_at'] or e['started_at'] or 0 for e in entries] + [0.1])
+
+        print("\n⏱️ Startup timeline")
+        print("-" * 60)
+        for entry in entries:
+            start = entry['started_at'] or 0
+            end = entry['ready_at'] if entry['ready_at'] is not None else start
+            offset = int(start / total * width)
+            bar = ' ' * offset + '█' * max(1, int(end / total * width) - offset)
+            icon = {'ready': '✅', 'failed': '❌', 'skipped': '⏭️'}.get(entry['status'], '⏳')
+            timing = f"{start:5.1f}s → {end:5.1f}s" if entry['status'] == 'ready' else entry['status']
+            print(f"{icon} {entry['component']:<14} {bar:<{width}} {timing}")
+        producer = self.components.get('producer')
+        if producer is not None and producer.status == 'ready':
+            print(f"\n🚀 Data flowing after {producer.ready_at:.1f}s")
+        else:
+            print(f"\n⏱️ Total: {total:.1f}s")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Start the weather pipeline in dependency order")
+    parser.add_argument('targets', nargs='*', help="components to start with their dependencies (default: all)")
+    parser.add_argument('--no-connect', action='store_true', help="do not start Kafka Connect")
+    parser.add_argument('--timeline', metavar='FILE', help="write the startup timeline as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("🚦 Pipeline Startup Orchestrator")
+    print("=" * 50)
+
+    orchestrator = StartupOrchestrator(default_components(with_connect=not args.no_connect))
+    ok = orchestrator.run(args.targets or None)
+    orchestrator.print_timeline()
+
+    if args.timeline:
+        with open(args.timeline, 'w', encoding='utf-8') as f:
+            json.dump(orchestrator.timeline(), f, indent=2)
+        print(f"💾 Timeline saved to {args.timeline}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
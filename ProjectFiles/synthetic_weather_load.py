@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+🏭 Synthetic Weather Load Generator
+Builds realistic observations for N virtual cities with NumPy, a block of
+records at a time, in the exact layout of get_weather_infos: diurnal
+temperature cycles, pressure systems with humidity following them, weather
+categories derived from clouds, humidity and temperature, day and night
+icons, and observation times advancing one station update at a time.
+
+Records go to the openweather topic, a JSON lines file or the in-process
+broker at a steady target rate (or as fast as possible), to size
+partitions and workers with millions of records instead of 7 cities a
+minute.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import time
+
+import numpy as np
+
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_transport import BOUNDED_MEMORY_RETENTION, create_producer, set_memory_retention
+
+# Configuration
+KAFKA_TOPIC = 'openweather'
+CITIES = 10000
+STEP = 600                 # simulated seconds between two observations of a city
+BLOCK_SECONDS = 0.01       # pacing granularity: one block per 10 ms of the target rate
+MAX_BLOCK = 20000          # records generated per block at most
+MAX_LAG = 1.0              # seconds behind schedule before the schedule is reset instead of caught up
+SEED = 42
+
+logger = logging.getLogger('synthetic-load')
+
+# (main, description, day icon) per category, by index
+CONDITIONS = [
+    ('Clear', 'clear sky', '01'),
+    ('Clouds', 'few clouds', '02'),
+    ('Clouds', 'scattered clouds', '03'),
+    ('Clouds', 'overcast clouds', '04'),
+    ('Drizzle', 'light intensity drizzle', '09'),
+    ('Rain', 'light rain', '10'),
+    ('Rain', 'moderate rain', '10'),
+    ('Snow', 'light snow', '13'),
+    ('Mist', 'mist', '50'),
+]
+
+# Same keys, in the same order, as weather_schema.weather_record (get_weather_infos).
+# Per-city and per-condition parts are formatted once, and fixed-precision
+# float formats are several times cheaper than repr(). rain_3h and snow_3h
+# are always 0: the 2.5 API no longer reports them.
+RECORD_TEMPLATE = (
+    '{"created_at": "%s", "timestamp": %%d, %%s, '
+    '"temp": %%.2f, "feels_like": %%.2f, "temp_min": %%.2f, "temp_max": %%.2f, '
+    '"pressure": %%d, "humidity": %%d, "visibility": %%d, "clouds": %%d, "wind_speed": %%.2f, "wind_deg": %%d, '
+    '%%s, "sunrise": %%d, "sunset": %%d, '
+    '"rain_1h": %%.2f, "rain_3h": 0, "snow_1h": %%.2f, "snow_3h": 0}'
+)
+CITY_FIELDS = '"city_id": %d, "city_name": "%s", "country": "%s", "lat": %.4f, "lon": %.4f'
+CONDITION_FIELDS = '"weather_main": "%s", "weather_description": "%s", "weather_icon": "%s%s"'
+
+COUNTRIES = ['GB', 'DE', 'FR', 'ES', 'NL', 'PL', 'AT', 'IT', 'SE', 'NO', 'US', 'CA', 'BR', 'IN', 'JP', 'AU']
+
+
+class SyntheticWeather:
+    """Vectorized observation generator; every block continues where the previous one stopped"""
+
+    def __init__(self, cities=CITIES, start=None, step=STEP, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.cities = cities
+        self.step = step
+        self.start = int(start if start is not None else time.time() - step)
+        self.generated = 0
+
+        index = np.arange(cities)
+        self.city_id = 9000000 + index
+        self.names = [f"Synth-{i:06d}" for i in range(cities)]
+        self.keys = [name.encode('utf-8') for name in self.names]
+        self.countries = [COUNTRIES[i] for i in rng.integers(0, len(COUNTRIES), cities)]
+        self.lat = np.round(rng.uniform(-55, 70, cities), 4)
+        self.lon = np.round(rng.uniform(-180, 180, cities), 4)
+        self.timezone = np.round(self.lon / 15).astype(np.int64) * 3600
+        # Climate: warmer near the equator, wider daily swings inland (random here)
+        self.base_temp = 27 - 0.45 * np.abs(self.lat) + rng.normal(0, 3, cities)
+        self.daily_amplitude = rng.uniform(2, 7, cities)
+        self.base_humidity = rng.uniform(55, 85, cities)
+        self.phase = rng.integers(0, step, cities)            # update second within the step
+        self.system_phase = rng.uniform(0, 2 * np.pi, cities)  # pressure systems, ~5 day period
+        self.wind_base = rng.uniform(1, 6, cities)
+        self.wind_deg = rng.integers(0, 360, cities)
+
+        self.city_fields = [CITY_FIELDS % fields for fields in zip(
+            self.city_id.tolist(), self.names, self.countries, self.lat.tolist(), self.lon.tolist())]
+        # Condition index * 2 + is_day
+        self.condition_fields = [CONDITION_FIELDS % (main, description, icon, day)
+                                 for main, description, icon in CONDITIONS for day in 'nd']
+
+    def block(self, size: int) -> tuple:
+        """Next size records, as (city indexes, JSON strings)"""
+        rng = self.rng
+        sequence = self.generated + np.arange(size)
+        self.generated += size
+        city = sequence % self.cities
+        dt = self.start + (sequence // self.cities) * self.step + self.phase[city]
+        lat = self.lat[city]
+
+        # Local solar time and an approximate day length from latitude and season
+        local = (dt + self.timezone[city]) % 86400
+        day_of_year = (dt // 86400) % 365
+        declination = 23.44 * np.sin(2 * np.pi * (day_of_year - 81) / 365)
+        cos_hour = -np.tan(np.radians(lat)) * np.tan(np.radians(declination))
+        half_day = np.degrees(np.arccos(np.clip(cos_hour, -1, 1))) / 15 * 3600
+        midnight = dt - local   # UTC epoch of the local midnight
+        sunrise = (midnight + 43200 - half_day).astype(np.int64)
+        sunset = (midnight + 43200 + half_day).astype(np.int64)
+        # From the emitted (rounded) times, so icons never contradict them
+        is_day = (dt >= sunrise) & (dt < sunset)
+
+        # Pressure systems drive humidity, clouds and temperature anomalies
+        system = np.sin(2 * np.pi * dt / (5 * 86400) + self.system_phase[city])
+        pressure = np.round(1013 + 12 * system + rng.normal(0, 1.5, size)).astype(np.int64)
+        season = -np.cos(2 * np.pi * (day_of_year - 15) / 365) * np.sign(lat) * np.minimum(np.abs(lat) / 5, 10)
+        diurnal = -np.cos(2 * np.pi * (local - 3 * 3600) / 86400)   # coldest around 3:00, warmest at 15:00
+        temp = (self.base_temp[city] + season + self.daily_amplitude[city] * diurnal
+                + 2 * system + rng.normal(0, 0.6, size))
+        humidity = np.clip(self.base_humidity[city] - 18 * system - 2.5 * self.daily_amplitude[city] * diurnal
+                           + rng.normal(0, 4, size), 15, 100).round().astype(np.int64)
+        clouds = np.clip(50 - 55 * system + rng.normal(0, 20, size), 0, 100).round().astype(np.int64)
+        wind_speed = np.round(np.abs(self.wind_base[city] * (1.3 - system) + rng.normal(0, 0.8, size)), 2)
+        wind_deg = (self.wind_deg[city] + rng.integers(-40, 41, size)) % 360
+        feels_like = temp - 0.7 * np.sqrt(wind_speed) + np.where(temp > 25, 0.05 * (humidity - 40), 0)
+
+        wet = (humidity >= 80) & (clouds >= 85)
+        condition = np.select(
+            [wet & (temp < 1), wet & (humidity >= 93), wet & (humidity >= 87), wet,
+             (humidity >= 96) & (wind_speed < 2), clouds >= 85, clouds >= 50, clouds >= 20],
+            [7, 6, 5, 4, 8, 3, 2, 1], default=0)
+        # Mean rain of drizzle < light < moderate rain, in mm/h
+        rain_scale = np.where((condition >= 4) & (condition <= 6), 0.3 * condition - 0.9, 0)
+        rain_1h = np.round(rng.exponential(1, size) * rain_scale, 2)
+        snow_1h = np.where(condition == 7, np.round(rng.exponential(0.4, size), 2), 0)
+        visibility = np.where(condition == 8, 3000, np.where(condition >= 4, 8000, 10000))
+        condition_key = condition * 2 + is_day
+
+        city_fields, condition_fields = self.city_fields, self.condition_fields
+        city_list = city.tolist()
+        columns = zip(
+            dt.tolist(), [city_fields[c] for c in city_list],
+            temp.tolist(), feels_like.tolist(),
+            (temp - rng.uniform(0.3, 1.5, size)).tolist(), (temp + rng.uniform(0.3, 1.5, size)).tolist(),
+            pressure.tolist(), humidity.tolist(), visibility.tolist(), clouds.tolist(), wind_speed.tolist(),
+            wind_deg.tolist(), [condition_fields[c] for c in condition_key.tolist()],
+            sunrise.tolist(), sunset.tolist(), rain_1h.tolist(), snow_1h.tolist(),
+        )
+        template = RECORD_TEMPLATE % time.strftime('%Y-%m-%d %H:%M:%S')
+        return city_list, [template % row for row in columns]
+
+
+def check_day_night(records) -> int:
+    """Number of records whose day/night icon contradicts their own sunrise and sunset"""
+    mismatches = 0
+    for line in records:
+        record = json.loads(line)
+        is_day = record['sunrise'] <= record['timestamp'] < record['sunset']
+        if record['weather_icon'].endswith('d') != is_day:
+            mismatches += 1
+    return mismatches
+
+
+class RateController:
+    """Steady pacing on an absolute schedule: blocks are spread evenly instead of sent in bursts"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.perf_counter()
+        self.sent = 0
+        self.resets = 0
+
+    def block_size(self) -> int:
+        if not self.rate:
+            return MAX_BLOCK
+        return int(min(MAX_BLOCK, max(1, self.rate * BLOCK_SECONDS)))
+
+    def pace(self, count):
+        """Account for count records and wait until the schedule allows the next block"""
+        self.sent += count
+        if not self.rate:
+            return
+        due = self.started + self.sent / self.rate
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+        elif now - due > MAX_LAG:
+            # Too far behind (slow sink): start a new schedule rather than bursting to catch up
+            self.started, self.sent = now, 0
+            self.resets += 1
+
+
+def kafka_output(transport, topic):
+    producer = create_producer(transport, client_id='synthetic-load', linger_ms=20, batch_size=262144,
+                               compression='lz4')
+
+    def write(cities, records, keys):
+        for city, record in zip(cities, records):
+            producer.send(topic, record, key=keys[city])
+    return write, producer.flush
+
+
+def file_output(path):
+    f = gzip.open(path, 'at', encoding='utf-8') if path.endswith('.gz') else open(path, 'a', encoding='utf-8')
+
+    def write(cities, records, keys):
+        f.write('\n'.join(records))
+        f.write('\n')
+    return write, f.close
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate synthetic weather observations at a target rate")
+    parser.add_argument('--output', choices=['kafka', 'file', 'memory'], default='kafka',
+                        help="openweather topic, JSON lines file or the in-process broker")
+    parser.add_argument('--transport', choices=['kafka-python', 'confluent'], default='confluent',
+                        help="Kafka client library for --output kafka (default confluent)")
+    parser.add_argument('--topic', default=KAFKA_TOPIC)
+    parser.add_argument('--file', default='synthetic_weather.jsonl', help="output file (.gz compresses)")
+    parser.add_argument('--cities', type=int, default=CITIES, help="virtual cities")
+    parser.add_argument('--rate', type=float, default=0, help="records per second (0: as fast as possible)")
+    parser.add_argument('--records', type=int, help="stop after this many records")
+    parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    parser.add_argument('--step', type=int, default=STEP, help="simulated seconds between observations of a city")
+    parser.add_argument('--seed', type=int, default=SEED)
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging('synthetic-load', args.log_level, args.log_format)
+
+    generator = SyntheticWeather(args.cities, step=args.step, seed=args.seed)
+    # Sanity check on a throwaway generator, so the emitted stream is unchanged
+    mismatches = check_day_night(SyntheticWeather(args.cities, step=args.step, seed=args.seed).block(1000)[1])
+    if mismatches:
+        raise SystemExit(f"❌ {mismatches} of 1000 sample records have a day/night icon contradicting sunrise/sunset")
+    if args.output == 'kafka':
+        write, close = kafka_output(args.transport, args.topic)
+    elif args.output == 'file':
+        write, close = file_output(args.file)
+    else:
+        # Only useful when the consumers run in this process (imported), or to measure generation alone;
+        # bounded, since nothing may ever read the topic
+        set_memory_retention(BOUNDED_MEMORY_RETENTION)
+        write, close = kafka_output('memory', args.topic)
+
+    log(logger, logging.INFO, "🏭 Synthetic Weather Load Generator", output=args.output, cities=args.cities,
+        rate=args.rate or 'max', records=args.records, duration=args.duration)
+    controller = RateController(args.rate)
+    records_log = RecordLog(logger, 'records')
+    started = time.perf_counter()
+    total = 0
+    try:
+        while args.records is None or total < args.records:
+            if args.duration and time.perf_counter() - started >= args.duration:
+                break
+            size = controller.block_size()
+            if args.records is not None:
+                size = min(size, args.records - total)
+            cities, records = generator.block(size)
+            write(cities, records, generator.keys)
+            total += size
+            records_log.record(count=size)
+            controller.pace(size)
+    except KeyboardInterrupt:
+        log(logger, logging.INFO, "🛑 Stopping generator")
+    finally:
+        close()
+        elapsed = time.perf_counter() - started
+        records_log.summary()
+        log(logger, logging.INFO, f"✅ {total} records in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f}/s)",
+            records=total, seconds=round(elapsed, 2), schedule_resets=controller.resets)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import json
 import configparser
 import os
 
+from weather_api import onecall_url
+
 def config():
     """Read API key from config file"""
     config_parser = configparser.ConfigParser()
@@ -29,7 +31,7 @@ def test_onecall_api():
         lon = -0.1278
         
         # One Call API 3.0 endpoint
-        url = f'https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&appid={api_key}&units=metric'
+        url = onecall_url(lat, lon, api_key)
         
         print(f"Testing URL: {url[:80]}...")
         
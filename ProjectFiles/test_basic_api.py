@@ -8,6 +8,8 @@ import requests
 import configparser
 import os
 
+from weather_api import current_weather_url
+
 def config():
     """Read API key from config file"""
     config_parser = configparser.ConfigParser()
@@ -25,7 +27,7 @@ def test_basic_api():
         
         # Test with London using basic API 2.5
         city = "London"
-        url = f'http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric'
+        url = current_weather_url(city, api_key)
         
         print(f"Testing basic API with: {url[:80]}...")
         
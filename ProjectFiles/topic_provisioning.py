@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+🧱 Kafka Topic Provisioning
+Plans the partition count of every pipeline topic from the expected message
+rate and the consumer parallelism, creates the missing topics with their
+configs in one admin request and reports drift between the desired and the
+actual layout (optionally fixing what Kafka allows to be fixed).
+"""
+
+import argparse
+import math
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+REPLICATION_FACTOR = 1              # single-broker compose setup
+DEFAULT_RATE = 50                   # expected messages/s on the source topic
+DEFAULT_CONSUMERS = 1               # instances per consumer group (processor, sinks)
+PRODUCER_RATE_PER_PARTITION = 5000  # messages/s one partition absorbs from producers
+CONSUMER_RATE_PER_PARTITION = 500   # messages/s one consumer handles (decode, enrich, re-send)
+MIN_PARTITIONS = 3                  # what the launchers created before this module; partitions never shrink
+MAX_PARTITIONS = 64
+
+DAY_MS = 24 * 3600 * 1000
+
+# Topics that keep the latest value per key instead of a history
+STATE_TOPIC_CONFIG = {
+    'cleanup.policy': 'compact',
+    'min.cleanable.dirty.ratio': '0.1',
+    'segment.ms': str(3600 * 1000),        # roll hourly so the cleaner can work on closed segments
+    'delete.retention.ms': str(DAY_MS),
+}
+
+# rate_factor: messages on the topic per message on the source topic
+TOPIC_SPECS = {
+    'openweather': {
+        'rate_factor': 1.0,
+        'config': {
+            'cleanup.policy': 'delete',
+            'retention.ms': str(7 * DAY_MS),    # raw observations can be replayed for a week
+            'segment.bytes': str(128 * 1024 * 1024),
+        },
+    },
+    'weather-enriched': {
+        'rate_factor': 1.0,
+        'config': {
+            'cleanup.policy': 'delete',
+            'retention.ms': str(3 * DAY_MS),
+            'segment.bytes': str(128 * 1024 * 1024),
+        },
+    },
+    'weather-aggregated': {
+        'rate_factor': 1.0,
+        'config': {
+            'cleanup.policy': 'delete',
+            'retention.ms': str(DAY_MS),
+            'segment.bytes': str(64 * 1024 * 1024),
+        },
+    },
+    # Latest enriched record per city, read to the end by consumers at startup
+    'weather-latest': {
+        'rate_factor': 1.0,
+        'config': dict(STATE_TOPIC_CONFIG),
+    },
+}
+
+
+def plan_partitions(rate: float, consumers: int) -> int:
+    """Partitions needed for a message rate and a consumer group size
+
+    Enough partitions for both the producer and the consumer side to keep
+    up, never fewer than the consumers (idle consumers otherwise) nor than
+    MIN_PARTITIONS, and a multiple of the consumer count so every consumer
+    gets the same share.
+    """
+    consumers = max(1, consumers)
+    needed = max(
+        math.ceil(rate / PRODUCER_RATE_PER_PARTITION),
+        math.ceil(rate / CONSUMER_RATE_PER_PARTITION),
+        consumers,
+        MIN_PARTITIONS
+    )
+    needed = math.ceil(needed / consumers) * consumers
+    return min(needed, MAX_PARTITIONS)
+
+
+def desired_layout(rate=DEFAULT_RATE, consumers=DEFAULT_CONSUMERS, specs=TOPIC_SPECS) -> dict:
+    """Partitions, replication and configs wanted for every topic"""
+    return {
+        name: {
+            'partitions': plan_partitions(rate * spec['rate_factor'], spec.get('consumers', consumers)),
+            'replication_factor': spec.get('replication_factor', REPLICATION_FACTOR),
+            'config': dict(spec['config']),
+        }
+        for name, spec in specs.items()
+    }
+
+
+def kafka_admin():
+    from kafka.admin import KafkaAdminClient
+
+    return KafkaAdminClient(bootstrap_servers=[KAFKA_BOOTSTRAP_SERVER], request_timeout_ms=10000,
+                            client_id='topic-provisioning')
+
+
+def actual_layout(admin, names) -> dict:
+    """Current layout of the existing topics among names (two admin requests)"""
+    from kafka.admin import ConfigResource, ConfigResourceType
+
+    # Metadata for all topics: asking for named topics could auto-create them
+    existing = {t['topic']: t for t in admin.describe_topics() if t['topic'] in names}
+    layout = {
+        name: {
+            'partitions': len(topic['partitions']),
+            'replication_factor': min((len(p['replicas']) for p in topic['partitions']), default=0),
+            'config': {},
+        }
+        for name, topic in existing.items()
+    }
+
+    if layout:
+        responses = admin.describe_configs([ConfigResource(ConfigResourceType.TOPIC, name) for name in layout])
+        for response in responses:
+            for _error_code, _message, _type, name, entries in response.resources:
+                if name in layout:
+                    layout[name]['config'] = {entry[0]: entry[1] for entry in entries}
+    return layout
+
+
+def diff_layout(desired: dict, actual: dict) -> list:
+    """Drift as (topic, setting, desired, actual) tuples
+
+    More partitions than planned is not drift: Kafka cannot remove them,
+    and extra partitions only leave some consumers more headroom.
+    """
+    drift = []
+    for name, want in desired.items():
+        have = actual.get(name)
+        if have is None:
+            drift.append((name, 'topic', 'present', 'missing'))
+            continue
+        if have['partitions'] < want['partitions']:
+            drift.append((name, 'partitions', want['partitions'], have['partitions']))
+        if have['replication_factor'] != want['replication_factor']:
+            drift.append((name, 'replication_factor', want['replication_factor'], have['replication_factor']))
+        for key, value in want['config'].items():
+            if have['config'].get(key) != value:
+                drift.append((name, key, value, have['config'].get(key)))
+    return drift
+
+
+def create_missing(admin, desired: dict, actual: dict) -> list:
+    """Create every missing topic in one CreateTopics request; returns the created names"""
+    from kafka.admin import NewTopic
+    from kafka.errors import TopicAlreadyExistsError
+
+    missing = [name for name in desired if name not in actual]
+    if not missing:
+        return []
+
+    new_topics = [
+        NewTopic(name,
+                 num_partitions=desired[name]['partitions'],
+                 replication_factor=desired[name]['replication_factor'],
+                 topic_configs=desired[name]['config'])
+        for name in missing
+    ]
+    try:
+        response = admin.create_topics(new_topics)
+    except TopicAlreadyExistsError:
+        # Newer clients raise; a concurrent creator got there first
+        return []
+
+    created = []
+    for error in response.topic_errors:
+        name, error_code = error[0], error[1]
+        if error_code == 0:
+            created.append(name)
+        elif error_code != TopicAlreadyExistsError.errno:
+            print(f"❌ Topic '{name}' not created (error code {error_code})")
+    return created
+
+
+def fix_drift(admin, desired: dict, actual: dict):
+    """Grow partition counts and rewrite configs where they differ
+
+    Partitions can only grow and replication cannot change through these
+    APIs; such drift is left for the report. AlterConfigs replaces the
+    topic's whole dynamic config, so the full desired config is sent.
+    """
+    from kafka.admin import ConfigResource, ConfigResourceType, NewPartitions
+
+    grow = {name: NewPartitions(desired[name]['partitions'])
+            for name, have in actual.items()
+            if name in desired and have['partitions'] < desired[name]['partitions']}
+    if grow:
+        admin.create_partitions(grow)
+        print(f"📈 Partitions increased: {', '.join(f'{n}→{p.total_count}' for n, p in grow.items())}")
+
+    reconfigure = [name for name, have in actual.items()
+                   if name in desired and any(have['config'].get(k) != v for k, v in desired[name]['config'].items())]
+    if reconfigure:
+        admin.alter_configs([ConfigResource(ConfigResourceType.TOPIC, name, configs=desired[name]['config'])
+                             for name in reconfigure])
+        print(f"⚙️ Configs updated: {', '.join(reconfigure)}")
+
+
+def provision(rate=DEFAULT_RATE, consumers=DEFAULT_CONSUMERS, apply=False, dry_run=False, admin=None):
+    """Create missing topics, report drift (and fix it with apply); returns the remaining drift"""
+    desired = desired_layout(rate, consumers)
+    own_admin = admin is None
+    admin = admin or kafka_admin()
+    try:
+        actual = actual_layout(admin, desired)
+        if not dry_run:
+            created = create_missing(admin, desired, actual)
+            if created:
+                print(f"✅ Created topics: {', '.join(created)}")
+            if apply:
+                fix_drift(admin, desired, actual)
+            actual = actual_layout(admin, desired)
+        return diff_layout(desired, actual)
+    finally:
+        if own_admin:
+            admin.close()
+
+
+def print_plan(rate, consumers):
+    print(f"📐 Plan for {rate:g} msg/s with {consumers} consumer(s) per group:")
+    for name, layout in desired_layout(rate, consumers).items():
+        policy = layout['config'].get('cleanup.policy', 'delete')
+        print(f"   {name:<22} {layout['partitions']:>3} partitions  rf={layout['replication_factor']}  {policy}")
+
+
+def print_drift(drift):
+    if not drift:
+        print("✅ Topic layout matches the plan")
+        return
+    print(f"⚠️ {len(drift)} difference(s) from the plan:")
+    for name, setting, want, have in drift:
+        print(f"   {name:<22} {setting:<20} desired={want}  actual={have}")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Create and check the pipeline Kafka topics")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="expected messages/s on the source topic")
+    parser.add_argument('--consumers', type=int, default=DEFAULT_CONSUMERS,
+                        help="consumer instances per group (processor, sinks)")
+    parser.add_argument('--dry-run', action='store_true', help="only report drift, change nothing")
+    parser.add_argument('--apply', action='store_true', help="also grow partitions and fix configs on existing topics")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("🧱 Kafka Topic Provisioning")
+    print("=" * 50)
+    print_plan(args.rate, args.consumers)
+    print()
+    drift = provision(args.rate, args.consumers, apply=args.apply, dry_run=args.dry_run)
+    print_drift(drift)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+🔗 OpenWeather API Endpoint
+Base URL of the OpenWeather API shared by every fetcher. It defaults to the
+real API; the OPENWEATHER_BASE_URL environment variable or --api-url point
+the fetchers at another server, such as openweather_stub_server.py for
+offline load tests and integration runs.
+"""
+
+import os
+
+DEFAULT_BASE_URL = 'http://api.openweathermap.org'
+API_BASE_URL = os.environ.get('OPENWEATHER_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+
+
+def use_base_url(base_url):
+    """Point every fetcher of the process at base_url"""
+    global API_BASE_URL
+    API_BASE_URL = base_url.rstrip('/')
+
+
+def current_weather_url(city_name: str, api_key: str) -> str:
+    """Current Weather API 2.5 request of one city, in metric units"""
+    return f'{API_BASE_URL}/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+
+
+def onecall_url(lat: float, lon: float, api_key: str) -> str:
+    """One Call API 3.0 request of one location, in metric units"""
+    return f'{API_BASE_URL}/data/3.0/onecall?lat={lat}&lon={lon}&appid={api_key}&units=metric'
+
+
+def add_api_arguments(parser):
+    """--api-url option shared by the fetchers"""
+    parser.add_argument('--api-url', default=API_BASE_URL,
+                        help="OpenWeather API base URL (default from OPENWEATHER_BASE_URL, else the real API)")
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+🔎 Weather Archive Query Engine
+Runs aggregations over the partitioned Parquet weather archive with
+DuckDB (or pyarrow datasets when DuckDB is not installed), using
+partition pruning and predicate pushdown, with a result cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+ARCHIVE_DIR = 'archive'
+
+CACHE_DIR_NAME = '_query_cache'
+
+# Named aggregations: SQL for DuckDB; the pyarrow fallback implements the same ones
+NAMED_QUERIES = {
+    'monthly-mean-temp': """
+        SELECT country,
+               strftime(to_timestamp(timestamp), '%Y-%m') AS month,
+               avg(temp) AS mean_temp,
+               count(*) AS observations
+        FROM weather
+        {where}
+        GROUP BY country, month
+        ORDER BY country, month
+    """,
+    'hours-above': """
+        SELECT city_name,
+               count(DISTINCT timestamp // 3600) AS hours
+        FROM weather
+        {where}
+        GROUP BY city_name
+        ORDER BY hours DESC, city_name
+    """,
+}
+
+
+def partition_fingerprint(archive_dir: str) -> str:
+    """Hash of every archived file's path, size and mtime
+
+    Any new, rewritten or deleted file changes the fingerprint, which
+    invalidates the cached results computed on the previous archive state.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(archive_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '_')))
+        for name in sorted(files):
+            if not name.endswith('.parquet') or name.startswith(('.', '_')):
+                continue
+            stat = os.stat(os.path.join(root, name))
+            relative = os.path.relpath(os.path.join(root, name), archive_dir)
+            digest.update(f"{relative}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_filters(country=None, city=None, date_from=None, date_to=None, min_temp=None):
+    """WHERE clause and parameters; partition columns come first so DuckDB can prune on them"""
+    clauses = []
+    params = []
+    if country:
+        clauses.append("country = ?")
+        params.append(country)
+    if city:
+        clauses.append("city = ?")
+        params.append(city)
+    if date_from:
+        clauses.append("date >= CAST(? AS DATE)")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date <= CAST(? AS DATE)")
+        params.append(date_to)
+    if min_temp is not None:
+        clauses.append("temp > ?")
+        params.append(min_temp)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+class WeatherArchiveQuery:
+    """Query the Parquet archive with caching keyed by query and partition fingerprint"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, use_cache=True, engine=None):
+        self.archive_dir = archive_dir
+        self.use_cache = use_cache
+        self.cache_dir = os.path.join(archive_dir, CACHE_DIR_NAME)
+        self.engine = engine or self._detect_engine()
+        if self.engine == 'duckdb' and self._detect_engine() != 'duckdb':
+            raise RuntimeError("The duckdb engine needs DuckDB: pip install duckdb")
+
+    @staticmethod
+    def _detect_engine():
+        try:
+            import duckdb  # noqa: F401
+            return 'duckdb'
+        except ImportError:
+            return 'pyarrow'
+
+    def _cache_path(self, key_material):
+        key = hashlib.sha256(json.dumps(key_material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _cached(self, key_material, compute):
+        if not self.use_cache:
+            return compute()
+
+        path = self._cache_path({**key_material, 'fingerprint': partition_fingerprint(self.archive_dir)})
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        rows = compute()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, default=str)
+        os.replace(tmp_path, path)
+        return rows
+
+    def _duckdb_rows(self, sql, params):
+        import duckdb
+
+        con = duckdb.connect()
+        try:
+            # DDL cannot take prepared parameters, so the path is quoted by hand
+            glob = os.path.join(self.archive_dir, '**', '*.parquet').replace("'", "''")
+            con.execute(
+                f"CREATE VIEW weather AS SELECT * FROM read_parquet('{glob}', hive_partitioning = true, "
+                "hive_types = {'country': VARCHAR, 'city': VARCHAR, 'date': DATE}, union_by_name = true)"
+            )
+            cursor = con.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            con.close()
+
+    def _dataset(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(
+            pa.schema([('country', pa.string()), ('city', pa.string()), ('date', pa.string())]),
+            flavor='hive'
+        )
+        return ds.dataset(self.archive_dir, format='parquet', partitioning=partitioning)
+
+    @staticmethod
+    def _arrow_filter(country=None, city=None, date_from=None, date_to=None, min_temp=None):
+        import pyarrow.dataset as ds
+
+        expression = None
+        conditions = []
+        if country:
+            conditions.append(ds.field('country') == country)
+        if city:
+            conditions.append(ds.field('city') == city)
+        if date_from:
+            conditions.append(ds.field('date') >= date_from)
+        if date_to:
+            conditions.append(ds.field('date') <= date_to)
+        if min_temp is not None:
+            conditions.append(ds.field('temp') > min_temp)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def _arrow_rows(self, name, filters):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if name == 'monthly-mean-temp':
+            table = self._dataset().to_table(columns=['country', 'timestamp', 'temp'],
+                                             filter=self._arrow_filter(**filters))
+            month = pc.strftime(pc.cast(table['timestamp'], pa.timestamp('s')), format='%Y-%m')
+            table = table.append_column('month', month)
+            result = table.group_by(['country', 'month']).aggregate([('temp', 'mean'), ('temp', 'count')])
+            result = result.rename_columns(['country', 'month', 'mean_temp', 'observations'])
+            result = result.sort_by([('country', 'ascending'), ('month', 'ascending')])
+        elif name == 'hours-above':
+            table = self._dataset().to_table(columns=['city_name', 'timestamp'],
+                                             filter=self._arrow_filter(**filters))
+            table = table.append_column('hour', pc.divide(table['timestamp'], 3600))
+            result = table.group_by(['city_name']).aggregate([('hour', 'count_distinct')])
+            result = result.rename_columns(['city_name', 'hours'])
+            result = result.sort_by([('hours', 'descending'), ('city_name', 'ascending')])
+        else:
+            raise ValueError(f"Unknown query: {name}")
+        return result.to_pylist()
+
+    def named(self, name, **filters):
+        """Run one of NAMED_QUERIES with optional country/city/date_from/date_to/min_temp filters"""
+        if name not in NAMED_QUERIES:
+            raise ValueError(f"Unknown query: {name} (available: {', '.join(NAMED_QUERIES)})")
+
+        def compute():
+            if self.engine == 'duckdb':
+                where, params = build_filters(**filters)
+                return self._duckdb_rows(NAMED_QUERIES[name].format(where=where), params)
+            return self._arrow_rows(name, filters)
+
+        return self._cached({'named': name, 'filters': filters, 'engine': self.engine}, compute)
+
+    def sql(self, sql, params=None):
+        """Run arbitrary SQL against the 'weather' view (DuckDB only)"""
+        if self.engine != 'duckdb':
+            raise RuntimeError("SQL queries need DuckDB: pip install duckdb")
+        params = list(params or [])
+        return self._cached({'sql': sql, 'params': params},
+                            lambda: self._duckdb_rows(sql, params))
+
+
+def print_rows(rows):
+    """Print query results as an aligned table"""
+    if not rows:
+        print("(no rows)")
+        return
+    columns = list(rows[0].keys())
+    formatted = [[f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+                 for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in formatted)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in formatted:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Query the Parquet weather archive")
+    parser.add_argument('query', nargs='?', choices=sorted(NAMED_QUERIES), help="named aggregation")
+    parser.add_argument('--sql', help="custom SQL over the 'weather' view (DuckDB)")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="archive root directory")
+    parser.add_argument('--country', help="country code partition, e.g. FR")
+    parser.add_argument('--city', help="city partition, e.g. Paris")
+    parser.add_argument('--from', dest='date_from', help="first date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="last date (YYYY-MM-DD)")
+    parser.add_argument('--threshold', type=float, default=30.0,
+                        help="temperature threshold for hours-above (°C)")
+    parser.add_argument('--engine', choices=['duckdb', 'pyarrow'], help="force a query engine")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the result cache")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    engine = WeatherArchiveQuery(args.archive, use_cache=not args.no_cache, engine=args.engine)
+
+    print("🔎 Weather Archive Query Engine")
+    print(f"Archive: {args.archive} (engine: {engine.engine})")
+    print("=" * 50)
+
+    if args.sql:
+        rows = engine.sql(args.sql)
+    elif args.query:
+        filters = {
+            'country': args.country,
+            'city': args.city,
+            'date_from': args.date_from,
+            'date_to': args.date_to,
+        }
+        if args.query == 'hours-above':
+            filters['min_temp'] = args.threshold
+        rows = engine.named(args.query, **filters)
+    else:
+        print("❌ Give a named query or --sql")
+        return
+
+    print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
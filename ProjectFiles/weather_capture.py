@@ -0,0 +1,129 @@
+"""
+📼 Raw OpenWeather Capture
+Optional append-only capture of the raw API responses seen by a fetcher, so
+a day of real data can be replayed later (replay_capture.py) to reproduce a
+bug or a performance regression.
+
+Each response is one JSON line: fetch time, city, status, latency, request
+path (without the API key) and the untouched response body. Lines are
+buffered and appended as one gzip member per flush, so the file stays a
+valid gzip stream that grows forever and is read back as a stream; a crash
+loses at most the buffered lines. The path may contain strftime fields
+(e.g. captures/openweather-%Y%m%d.jsonl.gz) to rotate files.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# Configuration
+FLUSH_RECORDS = 1000       # buffered responses before they are appended
+FLUSH_INTERVAL = 60        # seconds between appends on a slow fetcher
+GZIP_MAGIC = b'\x1f\x8b'
+
+logger = logging.getLogger(__name__)
+
+_API_KEY_PARAM = re.compile(r'([?&]appid=)[^&]*')
+
+
+class RawCapture:
+    """Thread-safe appender of raw responses to a gzip capture file"""
+
+    def __init__(self, path, flush_records=FLUSH_RECORDS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.lines = []
+        self.captured = 0
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def append(self, city, response, fetched_at=None):
+        """Capture one requests.Response of the OpenWeather API"""
+        url = response.request.url if response.request is not None else response.url
+        line = json.dumps({
+            'ts': round(fetched_at if fetched_at is not None else time.time(), 3),
+            'city': city,
+            'status': response.status_code,
+            'latency_ms': round(response.elapsed.total_seconds() * 1000, 1),
+            'path': _API_KEY_PARAM.sub(r'\1-', url.split('://', 1)[-1].partition('/')[2]),
+            'body': response.text,
+        }, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self.lines.append(line)
+            self.captured += 1
+            if len(self.lines) >= self.flush_records or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.lines:
+            return
+        path = time.strftime(self.path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        member = gzip.compress(('\n'.join(self.lines) + '\n').encode('utf-8'))
+        with open(path, 'ab') as f:
+            f.write(member)
+        self.lines = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        try:
+            self.flush()
+        except OSError as e:
+            logger.warning("⚠️ Capture %s not flushed: %s", self.path, e)
+
+
+_capture = None
+
+
+def start_capture(path, **options):
+    """Capture the responses of every fetcher of the process to path (no-op when path is empty)"""
+    global _capture
+    if path:
+        _capture = RawCapture(path, **options)
+    return _capture
+
+
+def capture_response(city, response, fetched_at=None):
+    """Append a response to the capture, if one was started"""
+    if _capture is not None and response is not None:
+        _capture.append(city, response, fetched_at)
+
+
+def add_capture_arguments(parser):
+    """--capture option of the fetchers"""
+    parser.add_argument('--capture', metavar='PATH',
+                        help="append raw API responses to this gzip file (strftime fields allowed, "
+                             "e.g. captures/openweather-%%Y%%m%%d.jsonl.gz)")
+
+
+def read_capture(paths):
+    """Captured responses of the files in order, streamed line by line with bounded memory
+
+    Captures are gzip streams whatever their name; plain JSON lines files
+    are read as well.
+    """
+    for path in paths:
+        with open(path, 'rb') as f:
+            compressed = f.read(2) == GZIP_MAGIC
+        opener = gzip.open if compressed else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile) as e:
+                # A fetcher killed in the middle of an append leaves a truncated last member
+                logger.warning("⚠️ %s: capture truncated, stopping at the last complete record (%s)", path, e)
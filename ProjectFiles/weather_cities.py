@@ -0,0 +1,11 @@
+"""
+🏙️ Weather City Lists
+City list files shared by the dashboard generator and the Kibana
+provisioning script
+"""
+
+
+def load_cities(path: str) -> list:
+    """Read a city list file, one city per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
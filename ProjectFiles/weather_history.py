@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+📈 Weather History Service
+Serves real per-city temperature series from Elasticsearch or the Parquet
+archive, downsampled with Largest-Triangle-Three-Buckets to the requested
+number of points, with a TTL cache per (city, range, resolution)
+"""
+
+import argparse
+import re
+import threading
+import time
+from collections import OrderedDict
+import requests
+
+from weather_routing import ELASTICSEARCH_URL, HISTORY_INDEX_PATTERN, all_indices_routed, routing_params
+
+# Configuration
+DEFAULT_RANGE = '24h'
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+MAX_RAW_POINTS = 200000  # safety cap on raw observations read per series
+PAGE_SIZE = 10000
+PIT_KEEP_ALIVE = '1m'
+CACHE_TTL = 60           # seconds
+CACHE_MAX_ENTRIES = 1000
+
+_RANGE_PATTERN = re.compile(r'^(\d+)([mhd])$')
+_RANGE_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_range(value: str) -> int:
+    """Convert '90m', '24h' or '7d' to seconds"""
+    match = _RANGE_PATTERN.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid range '{value}' (expected e.g. 90m, 24h, 7d)")
+    return int(match.group(1)) * _RANGE_UNITS[match.group(2)]
+
+
+def lttb(points: list, threshold: int) -> list:
+    """Largest-Triangle-Three-Buckets downsampling of [(x, y), ...] sorted by x
+
+    Keeps the first and last points and, from each of the threshold - 2
+    buckets in between, the point forming the largest triangle with the
+    previously selected point and the average of the next bucket. Peaks
+    and troughs survive, unlike with plain averaging or striding.
+    """
+    length = len(points)
+    if threshold >= length or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (length - 2) / (threshold - 2)
+    selected = 0
+
+    for bucket in range(threshold - 2):
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            next_start, next_end = length - 1, length
+        count = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / count
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / count
+
+        # Point of the current bucket with the largest triangle area
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        ax, ay = points[selected]
+        best_area = -1.0
+        best_index = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def open_history_pit(city_id=None) -> str:
+    """Open a point-in-time on the history indices, on the city's shard when routed"""
+    params = {'keep_alive': PIT_KEEP_ALIVE}
+    if city_id is not None and all_indices_routed(HISTORY_INDEX_PATTERN):
+        params.update(routing_params({'city_id': city_id}))
+    response = requests.post(f"{ELASTICSEARCH_URL}/{HISTORY_INDEX_PATTERN}/_pit",
+                             params=params, timeout=30)
+    response.raise_for_status()
+    return response.json()['id']
+
+
+def close_history_pit(pit_id):
+    """Release a point-in-time"""
+    requests.delete(f"{ELASTICSEARCH_URL}/_pit", json={'id': pit_id}, timeout=30)
+
+
+def fetch_series_elasticsearch(city: str, since: int, city_id=None) -> list:
+    """Raw (timestamp, temp) observations of a city since a unix time, oldest first
+
+    With a city_id the point-in-time uses the same routing as the sinks and
+    reads a single shard once every index is routed; otherwise it filters
+    by name across all shards. Pages break ties on _shard_doc, so
+    observations sharing a timestamp are neither skipped nor repeated.
+    """
+    city_filter = (
+        {"term": {"city_id": city_id}}
+        if city_id is not None
+        else {"match_phrase": {"city_name.keyword": city}}
+    )
+    series = []
+    search_after = None
+    pit_id = open_history_pit(city_id)
+
+    try:
+        while len(series) < MAX_RAW_POINTS:
+            query = {
+                "size": PAGE_SIZE,
+                "_source": ["timestamp", "temp"],
+                "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                "query": {"bool": {"filter": [city_filter, {"range": {"timestamp": {"gte": since}}}]}},
+                "sort": [{"timestamp": {"order": "asc"}}, {"_shard_doc": "asc"}],
+                "track_total_hits": False
+            }
+            if search_after is not None:
+                query["search_after"] = search_after
+
+            response = requests.post(f"{ELASTICSEARCH_URL}/_search", json=query, timeout=30)
+            response.raise_for_status()
+            result = response.json()
+            pit_id = result.get('pit_id', pit_id)
+
+            hits = result['hits']['hits']
+            for hit in hits:
+                source = hit['_source']
+                if source.get('temp') is not None and source.get('timestamp') is not None:
+                    series.append((int(source['timestamp']), float(source['temp'])))
+            if len(hits) < PAGE_SIZE:
+                break
+            search_after = hits[-1]['sort']
+    finally:
+        close_history_pit(pit_id)
+
+    return series
+
+
+def fetch_series_archive(city: str, since: int, archive_dir: str) -> list:
+    """Raw (timestamp, temp) observations of a city from the Parquet archive"""
+    from datetime import datetime, timezone
+    from weather_archive_query import WeatherArchiveQuery
+    from weather_schema import safe_path_component
+
+    engine = WeatherArchiveQuery(archive_dir, use_cache=False, engine='duckdb')
+    first_day = datetime.fromtimestamp(since, tz=timezone.utc).strftime('%Y-%m-%d')
+    rows = engine.sql(
+        "SELECT timestamp, temp FROM weather "
+        "WHERE city = ? AND date >= CAST(? AS DATE) AND timestamp >= ? AND temp IS NOT NULL "
+        f"ORDER BY timestamp LIMIT {MAX_RAW_POINTS}",
+        [safe_path_component(city), first_day, since]
+    )
+    return [(int(row['timestamp']), float(row['temp'])) for row in rows]
+
+
+class HistoryService:
+    """Downsampled series with a TTL + LRU cache keyed by (city, range, resolution)"""
+
+    def __init__(self, source='es', archive_dir='archive', ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.source = source
+        self.archive_dir = archive_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def series(self, city: str, range_value: str = DEFAULT_RANGE, points: int = DEFAULT_POINTS,
+               city_id=None) -> dict:
+        """Downsampled series of a city over a range, at most `points` points"""
+        points = max(3, min(int(points), MAX_POINTS))
+        range_seconds = parse_range(range_value)
+        key = (city if city_id is None else city_id, range_seconds, points)
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        since = int(time.time()) - range_seconds
+        if self.source == 'archive':
+            raw = fetch_series_archive(city, since, self.archive_dir)
+        else:
+            raw = fetch_series_elasticsearch(city, since, city_id)
+
+        result = {
+            'city': city,
+            'range': range_value,
+            'raw_points': len(raw),
+            'points': [list(point) for point in lttb(raw, points)]
+        }
+        self._cache_put(key, result)
+        return result
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Downsampled temperature history of a city")
+    parser.add_argument('city')
+    parser.add_argument('--range', default=DEFAULT_RANGE, help="e.g. 90m, 24h, 7d")
+    parser.add_argument('--points', type=int, default=DEFAULT_POINTS, help="target number of points")
+    parser.add_argument('--source', choices=['es', 'archive'], default='es')
+    parser.add_argument('--archive', default='archive', help="Parquet archive root (archive source)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    service = HistoryService(args.source, args.archive)
+
+    print("📈 Weather History Service")
+    print("=" * 50)
+    result = service.series(args.city, args.range, args.points)
+    print(f"🏙️ {result['city']}: {result['raw_points']} observations → {len(result['points'])} points")
+    for timestamp, temp in result['points']:
+        print(f"   {time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))}  {temp:.2f}°C")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+📌 Latest Weather Observation Index
+Maintains a 'weather-latest' index with exactly one document per city,
+so dashboards read O(cities) documents instead of sorting the full history
+"""
+
+import json
+import logging
+import requests
+
+from weather_metrics import INDEX_LATENCY, RECORDS_INDEXED
+
+# Configuration
+ELASTICSEARCH_URL = "http://localhost:9200"
+LATEST_INDEX = "weather-latest"
+HISTORY_INDEX_PATTERN = "openweather*"
+
+logger = logging.getLogger(__name__)
+
+LATEST_INDEX_BODY = {
+    "settings": {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "refresh_interval": "1s"
+    },
+    "mappings": {
+        "properties": {
+            "city_id": {"type": "long"},
+            "city_name": {
+                "type": "text",
+                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}
+            },
+            "country": {"type": "keyword"},
+            "timestamp": {"type": "long"},
+            "temp": {"type": "float"},
+            "feels_like": {"type": "float"},
+            "humidity": {"type": "float"},
+            "pressure": {"type": "float"},
+            "wind_speed": {"type": "float"},
+            "weather_main": {"type": "keyword"},
+            "weather_description": {"type": "text"}
+        }
+    }
+}
+
+# Only overwrite the stored document when the incoming observation is newer.
+# Older or duplicate observations become a no-op, so replays are harmless.
+UPSERT_SCRIPT = """
+if (ctx._source.timestamp == null || params.doc.timestamp > ctx._source.timestamp) {
+    ctx._source.putAll(params.doc);
+} else {
+    ctx.op = 'noop';
+}
+"""
+
+
+def latest_doc_id(data: dict) -> str:
+    """Document id of a city in the latest index (city_id, falling back to city_name)"""
+    city_id = data.get('city_id')
+    if city_id is not None:
+        return str(city_id)
+    return str(data.get('city_name', 'unknown')).lower()
+
+
+def build_upsert_body(data: dict) -> dict:
+    """Build the scripted upsert body for one observation"""
+    return {
+        "scripted_upsert": True,
+        "script": {
+            "source": UPSERT_SCRIPT,
+            "lang": "painless",
+            "params": {"doc": data}
+        },
+        "upsert": {}
+    }
+
+
+def create_latest_index():
+    """Create the latest-per-city index if it does not exist yet"""
+    try:
+        response = requests.head(f"{ELASTICSEARCH_URL}/{LATEST_INDEX}", timeout=10)
+        if response.status_code == 200:
+            return True
+
+        response = requests.put(
+            f"{ELASTICSEARCH_URL}/{LATEST_INDEX}",
+            headers={'Content-Type': 'application/json'},
+            json=LATEST_INDEX_BODY,
+            timeout=10
+        )
+        if response.status_code in [200, 201]:
+            logger.info("✅ Index '%s' created", LATEST_INDEX)
+            return True
+        logger.error("❌ Failed to create '%s': %s - %s", LATEST_INDEX, response.status_code, response.text)
+        return False
+    except Exception as e:
+        logger.error("❌ Elasticsearch exception: %s", e)
+        return False
+
+
+def upsert_latest(data: dict) -> bool:
+    """Upsert one observation into the latest index if it is newer than the stored one"""
+    url = f"{ELASTICSEARCH_URL}/{LATEST_INDEX}/_update/{latest_doc_id(data)}"
+
+    try:
+        with INDEX_LATENCY.labels(LATEST_INDEX, 'update').time():
+            response = requests.post(url, json=build_upsert_body(data), timeout=10)
+        if response.status_code in [200, 201]:
+            RECORDS_INDEXED.labels(LATEST_INDEX, 'ok').inc()
+            return True
+        RECORDS_INDEXED.labels(LATEST_INDEX, 'error').inc()
+        logger.warning("❌ Latest index error: %s - %s", response.status_code, response.text)
+        return False
+    except Exception as e:
+        RECORDS_INDEXED.labels(LATEST_INDEX, 'error').inc()
+        logger.warning("❌ Latest index exception: %s", e)
+        return False
+
+
+def build_bulk_body(records: list) -> str:
+    """NDJSON _bulk body upserting every record into the latest index"""
+    lines = []
+    for data in records:
+        lines.append(json.dumps({"update": {"_index": LATEST_INDEX, "_id": latest_doc_id(data)}}))
+        lines.append(json.dumps(build_upsert_body(data)))
+    return "\n".join(lines) + "\n"
+
+
+def upsert_latest_many(records: list) -> int:
+    """Upsert a batch of observations with a single _bulk request, returns the error count"""
+    if not records:
+        return 0
+
+    body = build_bulk_body(records)
+
+    try:
+        with INDEX_LATENCY.labels(LATEST_INDEX, 'bulk').time():
+            response = requests.post(
+                f"{ELASTICSEARCH_URL}/_bulk",
+                headers={'Content-Type': 'application/x-ndjson'},
+                data=body.encode('utf-8'),
+                timeout=30
+            )
+        if response.status_code != 200:
+            logger.warning("❌ Latest index bulk error: %s - %s", response.status_code, response.text)
+            errors = len(records)
+        else:
+            result = response.json()
+            errors = 0 if not result.get('errors') else \
+                sum(1 for item in result['items'] if item['update'].get('status', 500) >= 300)
+    except Exception as e:
+        logger.warning("❌ Latest index bulk exception: %s", e)
+        errors = len(records)
+
+    RECORDS_INDEXED.labels(LATEST_INDEX, 'ok').inc(len(records) - errors)
+    RECORDS_INDEXED.labels(LATEST_INDEX, 'error').inc(errors)
+    return errors
+
+
+def get_latest(size: int = 10000) -> list:
+    """Return the latest observation of every city"""
+    try:
+        response = requests.get(
+            f"{ELASTICSEARCH_URL}/{LATEST_INDEX}/_search",
+            json={"size": size, "query": {"match_all": {}}},
+            timeout=10
+        )
+        if response.status_code == 200:
+            return [hit['_source'] for hit in response.json()['hits']['hits']]
+        return []
+    except Exception as e:
+        logger.warning("❌ Latest index exception: %s", e)
+        return []
+
+
+def rebuild_latest_index(source: str = HISTORY_INDEX_PATTERN, page_size: int = 500) -> int:
+    """Materialize the latest index from existing history (one-off backfill)
+
+    Pages through a composite aggregation on city_name.keyword and keeps
+    the newest document of each city with a top_hits of size 1.
+    """
+    if not create_latest_index():
+        return 0
+
+    after_key = None
+    total = 0
+    while True:
+        composite = {
+            "size": page_size,
+            "sources": [{"city": {"terms": {"field": "city_name.keyword"}}}]
+        }
+        if after_key:
+            composite["after"] = after_key
+
+        query = {
+            "size": 0,
+            "aggs": {
+                "cities": {
+                    "composite": composite,
+                    "aggs": {
+                        "latest": {
+                            "top_hits": {"size": 1, "sort": [{"timestamp": {"order": "desc"}}]}
+                        }
+                    }
+                }
+            }
+        }
+
+        response = requests.post(f"{ELASTICSEARCH_URL}/{source}/_search", json=query, timeout=60)
+        if response.status_code != 200:
+            logger.error("❌ Cannot read history: %s - %s", response.status_code, response.text)
+            break
+
+        aggregation = response.json()['aggregations']['cities']
+        buckets = aggregation.get('buckets', [])
+        records = [bucket['latest']['hits']['hits'][0]['_source'] for bucket in buckets]
+        errors = upsert_latest_many(records)
+        total += len(records) - errors
+
+        after_key = aggregation.get('after_key')
+        if not buckets or not after_key:
+            break
+
+    return total
+
+
+def main():
+    print("📌 Latest Weather Observation Index")
+    print("=" * 50)
+
+    print(f"🔄 Rebuilding '{LATEST_INDEX}' from '{HISTORY_INDEX_PATTERN}'...")
+    count = rebuild_latest_index()
+    print(f"✅ {count} cities materialized")
+
+    for doc in get_latest():
+        print(f"   🏙️ {doc.get('city_name')}: {doc.get('temp')}°C ({doc.get('timestamp')})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+📌 Latest Weather Topic
+'weather-latest' is a log-compacted Kafka topic keyed by city, so it holds
+about one record per city however long openweather's history is. Stateful
+consumers read it to the end at startup (a bounded read) and then follow it.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from weather_latest_index import latest_doc_id
+from weather_transport import TopicPartition, create_consumer
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+LATEST_TOPIC = 'weather-latest'
+PARTITION_REFRESH = 60     # seconds between checks for partitions added to the topic
+MISSING_TOPIC_RETRY = 5    # seconds between checks while the topic does not exist yet
+
+logger = logging.getLogger(__name__)
+
+
+def latest_key(record: dict) -> bytes:
+    """Compaction key of a record: city_id, falling back to the city name (same id as the ES latest index)"""
+    return latest_doc_id(record).encode('utf-8')
+
+
+class LatestWeatherTable:
+    """In-memory map of the latest record per city, built from the compacted topic"""
+
+    def __init__(self, topic=LATEST_TOPIC, bootstrap_servers=KAFKA_BOOTSTRAP_SERVER, transport='kafka-python'):
+        self.topic = topic
+        self.records = {}
+        self.partitions = []
+        self.last_refresh = 0
+        self._lock = threading.Lock()
+        # No group: every instance reads the whole topic and commits nothing.
+        # Partitions assigned later (topic created or grown) are read from the start.
+        self.consumer = create_consumer(
+            transport,
+            bootstrap_servers=bootstrap_servers,
+            enable_auto_commit=False,
+            auto_offset_reset='earliest',
+            key_deserializer=lambda k: k.decode('utf-8') if k is not None else None,
+            value_deserializer=lambda v: json.loads(v.decode('utf-8')) if v is not None else None
+        )
+        self.refresh_partitions()
+
+    def refresh_partitions(self) -> bool:
+        """Assign the partitions the topic has now; returns True when they changed
+
+        The topic may not exist yet when a consumer starts (the processor
+        creates it on its first send), and partitions can be added later.
+        """
+        self.last_refresh = time.monotonic()
+        partitions = [TopicPartition(self.topic, p)
+                      for p in sorted(self.consumer.partitions_for_topic(self.topic) or ())]
+        if partitions == self.partitions:
+            return False
+        if partitions:
+            logger.info("📌 %s: %d partitions assigned (was %d)", self.topic, len(partitions), len(self.partitions))
+        self.partitions = partitions
+        self.consumer.assign(partitions)
+        return True
+
+    def _apply(self, message):
+        key = message.key
+        if key is None:
+            return None
+        with self._lock:
+            if message.value is None:
+                # Tombstone: the city was removed
+                self.records.pop(key, None)
+                return None
+            current = self.records.get(key)
+            if current is not None and (message.value.get('timestamp') or 0) < (current.get('timestamp') or 0):
+                return None
+            self.records[key] = message.value
+            return message.value
+
+    def bootstrap(self, timeout=60):
+        """Read from the beginning up to the end offsets seen now; returns the seconds it took"""
+        start = time.time()
+        if not self.partitions:
+            logger.warning("⚠️ %s: topic not found, waiting for it to be created", self.topic)
+            return time.time() - start
+        self.consumer.seek_to_beginning(*self.partitions)
+        end_offsets = self.consumer.end_offsets(self.partitions)
+        pending = {tp for tp, offset in end_offsets.items() if offset > 0}
+
+        while pending and time.time() - start < timeout:
+            for messages in self.consumer.poll(timeout_ms=500, max_records=10000).values():
+                for message in messages:
+                    self._apply(message)
+            pending = {tp for tp in pending if self.consumer.position(tp) < end_offsets[tp]}
+
+        if pending:
+            logger.warning("⚠️ %s: bootstrap stopped after %ss with %d partitions unread",
+                           self.topic, timeout, len(pending))
+        return time.time() - start
+
+    def follow(self):
+        """Yield every newer record after the bootstrap, keeping the map current"""
+        while True:
+            interval = PARTITION_REFRESH if self.partitions else MISSING_TOPIC_RETRY
+            if time.monotonic() - self.last_refresh >= interval:
+                self.refresh_partitions()
+            if not self.partitions:
+                time.sleep(MISSING_TOPIC_RETRY)
+                continue
+            for messages in self.consumer.poll(timeout_ms=1000).values():
+                for message in messages:
+                    record = self._apply(message)
+                    if record is not None:
+                        yield record
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.records)
+
+    def close(self):
+        self.consumer.close()
+
+
+def main():
+    print("📌 Latest Weather Topic")
+    print("=" * 50)
+
+    table = LatestWeatherTable()
+    elapsed = table.bootstrap()
+    records = table.snapshot()
+    print(f"✅ {len(records)} cities loaded from '{LATEST_TOPIC}' in {elapsed:.2f}s")
+    for record in sorted(records.values(), key=lambda r: str(r.get('city_name'))):
+        print(f"   🏙️ {record.get('city_name')}: {record.get('temp')}°C at "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(record.get('timestamp') or 0))}")
+    table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+🪵 Weather Pipeline Logging
+Structured JSON log lines written by a background thread. Callers only put
+the record on a bounded queue (dropping it if the writer falls behind), so a
+slow or piped stdout never blocks a processing loop. RecordLog replaces
+per-record lines with a few sampled ones and a periodic throughput summary.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+# Configuration
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'json'
+QUEUE_SIZE = 10000         # records waiting for the writer thread before new ones are dropped
+SUMMARY_INTERVAL = 10      # seconds between throughput summaries
+RECORD_LINES_PER_SECOND = 1.0  # per-record lines let through by RecordLog
+
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, component, logger, message and the record's fields"""
+
+    def __init__(self, component):
+        super().__init__()
+        self.component = component
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'component': self.component,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for interactive runs"""
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.getMessage()}"
+        if fields:
+            line += "  " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: records are dropped (and counted) when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only resolve the message here; JSON formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop() waits for room for its sentinel instead of failing on a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(component, level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Route every logger of the process through the queue to stdout; returns the listener"""
+    global _queue_handler
+    log_queue = queue.Queue(QUEUE_SIZE)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter(component) if fmt == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    # Client libraries are chatty at INFO
+    logging.getLogger('kafka').setLevel(logging.WARNING)
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+    listener = DrainingQueueListener(log_queue, output)
+    listener.start()
+    atexit.register(_shutdown, listener, output, _queue_handler)
+    return listener
+
+
+def _shutdown(listener, output, handler):
+    """Drain the queue, then report the lines it dropped straight to the output"""
+    listener.stop()
+    if handler.dropped:
+        record = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                   f"⚠️ {handler.dropped} log lines dropped: the log queue was full", None, None)
+        record.fields = {'log_lines_dropped': handler.dropped}
+        output.handle(record)
+
+
+def dropped_log_lines() -> int:
+    """Log lines dropped since setup_logging because the writer fell behind"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def add_logging_arguments(parser):
+    """--log-level and --log-format options shared by the entry points"""
+    parser.add_argument('--log-level', default=LOG_LEVEL, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        type=str.upper, help=f"minimum level logged (default {LOG_LEVEL})")
+    parser.add_argument('--log-format', default=LOG_FORMAT, choices=['json', 'text'],
+                        help=f"json lines or readable text (default {LOG_FORMAT})")
+
+
+def log(logger, level, msg, **fields):
+    """Log msg with structured fields"""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={'fields': fields})
+
+
+class RecordLog:
+    """Per-record events of one processing loop, rate limited, with periodic summaries
+
+    record() only counts unless a line is allowed by the per-second budget
+    (errors have their own budget so they are never starved by successes).
+    Every interval a summary line reports records/s, errors, how many
+    per-record lines were suppressed and, once the log queue has overflowed,
+    how many log lines were dropped in total. Thread-safe, so delivery
+    callbacks on a client's I/O thread can share one with the loop.
+    """
+
+    def __init__(self, logger, unit='records', interval=SUMMARY_INTERVAL, lines_per_second=RECORD_LINES_PER_SECOND):
+        self.logger = logger
+        self.unit = unit
+        self.interval = interval
+        self.lines_per_second = lines_per_second
+        self.started = time.monotonic()
+        self.records = 0
+        self.errors = 0
+        self.suppressed = 0
+        self._burst = max(1.0, lines_per_second)
+        self._budget = [self._burst, self._burst]   # successes, errors
+        self._refilled = [self.started, self.started]
+        self._lock = threading.Lock()
+
+    def _allow(self, error, now):
+        slot = 1 if error else 0
+        budget = min(self._burst, self._budget[slot] + (now - self._refilled[slot]) * self.lines_per_second)
+        self._refilled[slot] = now
+        if budget >= 1:
+            self._budget[slot] = budget - 1
+            return True
+        self._budget[slot] = budget
+        self.suppressed += 1
+        return False
+
+    def record(self, msg=None, error=False, count=1, **fields):
+        """Count count records; msg is logged only when the line budget allows"""
+        with self._lock:
+            now = time.monotonic()
+            self.records += count
+            if error:
+                self.errors += count
+            allowed = msg is not None and self._allow(error, now)
+            due = now - self.started >= self.interval
+        if allowed:
+            log(self.logger, logging.WARNING if error else logging.INFO, msg, **fields)
+        if due:
+            self._summary(force=False)
+
+    def tick(self):
+        """Emit the summary when due; call from idle loops"""
+        self._summary(force=False)
+
+    def summary(self, now=None):
+        self._summary(force=True, now=now)
+
+    def _summary(self, force, now=None):
+        # Taken under the lock, so threads racing past the interval emit one summary
+        with self._lock:
+            now = now or time.monotonic()
+            if not force and now - self.started < self.interval:
+                return
+            elapsed = max(now - self.started, 1e-9)
+            records, errors, suppressed = self.records, self.errors, self.suppressed
+            self.started = now
+            self.records = self.errors = self.suppressed = 0
+        if records or errors:
+            fields = {}
+            dropped = dropped_log_lines()
+            if dropped:
+                fields['log_lines_dropped'] = dropped
+            log(self.logger, logging.INFO,
+                f"{records / elapsed:.1f} {self.unit}/s, {errors} errors",
+                records=records, errors=errors, rate=round(records / elapsed, 2),
+                interval=round(elapsed, 1), suppressed=suppressed, **fields)
@@ -0,0 +1,279 @@
+"""
+🔬 Weather Pipeline Profiling
+Time-boxed profiling of a processing loop split into named stages (fetch,
+enrich, send...). Outside a profiling window a stage is a shared no-op
+context manager, so the instrumentation can stay in production code.
+
+During a window:
+- 'sampling' mode (default) snapshots the loop thread's stack every few
+  milliseconds from a background thread and writes collapsed stacks rooted
+  at the stage name, ready for flamegraph.pl or speedscope;
+- 'deterministic' mode runs one cProfile per stage and writes a .pstats
+  file per stage;
+- both modes record calls, wall and CPU time, net allocated blocks and
+  traced bytes per stage, and diff tracemalloc snapshots taken at the start
+  and end of the window to list the top allocation sites.
+"""
+
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+from weather_logging import log
+
+# Configuration
+PROFILE_DIR = 'profiles'
+DEFAULT_WINDOW = 30          # seconds profiled by --profile without a value
+SAMPLE_INTERVAL = 0.005      # seconds between stack samples
+TOP_ALLOCATION_SITES = 25
+MAX_STACK_DEPTH = 64
+
+logger = logging.getLogger(__name__)
+
+
+class _NullStage:
+    """Stage used outside profiling windows"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class StageStats:
+    __slots__ = ('calls', 'wall', 'cpu', 'blocks', 'traced_bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.blocks = 0
+        self.traced_bytes = 0
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'previous', 'start_wall', 'start_cpu', 'start_blocks', 'start_traced',
+                 'cprofile')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.previous = profiler.current_stage
+        profiler.current_stage = self.name
+        self.start_blocks = sys.getallocatedblocks()
+        self.start_traced = tracemalloc.get_traced_memory()[0]
+        self.cprofile = None
+        if profiler.mode == 'deterministic' and self.previous is None:
+            self.cprofile = profiler.stage_profile(self.name)
+            self.cprofile.enable()
+        self.start_cpu = time.thread_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+        profiler = self.profiler
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        stats = profiler.stats.get(self.name)
+        if stats is None:
+            stats = profiler.stats[self.name] = StageStats()
+        stats.calls += 1
+        stats.wall += wall
+        stats.cpu += cpu
+        stats.blocks += sys.getallocatedblocks() - self.start_blocks
+        stats.traced_bytes += tracemalloc.get_traced_memory()[0] - self.start_traced
+        profiler.current_stage = self.previous
+        if self.previous is None and time.monotonic() >= profiler.deadline:
+            profiler.finish()
+        return False
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class PipelineProfiler:
+    """Stage profiler of one processing loop; stage() must be called from that loop's thread"""
+
+    def __init__(self, component, mode='sampling', window=DEFAULT_WINDOW, directory=PROFILE_DIR,
+                 interval=SAMPLE_INTERVAL, track_allocations=True):
+        if mode not in ('sampling', 'deterministic'):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.component = component
+        self.mode = mode
+        self.window = window
+        self.directory = directory
+        self.interval = interval
+        self.track_allocations = track_allocations
+        self.active = False
+        self.deadline = 0.0
+        self.current_stage = None
+        self.stats = {}
+        self.samples = {}
+        self.profiles = {}
+        self._thread_id = None
+        self._sampler = None
+        self._started_tracemalloc = False
+        self._snapshot = None
+        self._started = 0.0
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op outside a window"""
+        if not self.active:
+            return NULL_STAGE
+        return _Stage(self, name)
+
+    def stage_profile(self, name):
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+        return profile
+
+    def start(self):
+        """Open a profiling window on the calling thread (the processing loop)"""
+        if self.active:
+            return
+        self.stats, self.samples, self.profiles = {}, {}, {}
+        self.current_stage = None
+        self._thread_id = threading.get_ident()
+        # tracemalloc slows allocation-heavy code down: stage CPU times are inflated while it runs
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        self._started = time.monotonic()
+        self.deadline = self._started + self.window
+        self.active = True
+        if self.mode == 'sampling':
+            self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        log(logger, logging.INFO, "🔬 Profiling started", component=self.component, mode=self.mode,
+            window=self.window)
+
+    def start_on_signal(self, signum=getattr(signal, 'SIGUSR1', None)):
+        """Open a new window whenever the process receives signum (kill -USR1 <pid>)"""
+        if signum is None:
+            return
+        # Handlers run on the main thread, which is the loop thread of the producer and the processor
+        signal.signal(signum, lambda *_: self.start() if not self.active else None)
+
+    def check_window(self):
+        """Close the window once its time is up; call from idle points of the loop"""
+        if self.active and self.current_stage is None and time.monotonic() >= self.deadline:
+            self.finish()
+
+    def _sample(self):
+        """Background thread: count the loop thread's stack, rooted at its current stage"""
+        while self.active:
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(self.current_stage or 'other')
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            time.sleep(self.interval)
+
+    def finish(self):
+        """Close the window and write the profile files"""
+        if not self.active:
+            return
+        self.active = False
+        elapsed = time.monotonic() - self._started
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+        allocation_sites = []
+        if self._snapshot is not None and tracemalloc.is_tracing():
+            # Leave out the profiler's own bookkeeping
+            ignored = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+            allocation_sites = tracemalloc.take_snapshot().filter_traces(ignored).compare_to(
+                self._snapshot.filter_traces(ignored), 'lineno')
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._snapshot = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"{self.component}-{time.strftime('%Y%m%dT%H%M%S')}")
+        files = []
+        if self.mode == 'sampling':
+            with open(f"{prefix}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.samples.items()):
+                    f.write(f"{stack} {count}\n")
+            files.append(f"{prefix}.collapsed")
+        else:
+            for name, profile in self.profiles.items():
+                profile.dump_stats(f"{prefix}-{name}.pstats")
+                files.append(f"{prefix}-{name}.pstats")
+
+        with open(f"{prefix}-stages.txt", 'w', encoding='utf-8') as f:
+            f.write(self.report(elapsed, allocation_sites))
+        files.append(f"{prefix}-stages.txt")
+
+        for name, stats in sorted(self.stats.items(), key=lambda item: -item[1].cpu):
+            log(logger, logging.INFO, f"🔬 Stage {name}", component=self.component, calls=stats.calls,
+                wall_s=round(stats.wall, 4), cpu_s=round(stats.cpu, 4),
+                cpu_share=round(stats.cpu / elapsed, 4) if elapsed else 0,
+                net_blocks=stats.blocks, net_traced_kib=round(stats.traced_bytes / 1024, 1))
+        log(logger, logging.INFO, "🔬 Profiling finished", component=self.component,
+            seconds=round(elapsed, 1), files=files)
+
+    def report(self, elapsed, allocation_sites) -> str:
+        lines = [f"{self.component}: {self.mode} profile over {elapsed:.1f}s", "",
+                 f"{'stage':<14} {'calls':>8} {'wall s':>10} {'cpu s':>10} {'cpu %':>7} "
+                 f"{'net blocks':>11} {'net KiB':>10}"]
+        for name, stats in sorted(self.stats.items(), key=lambda item: -item[1].cpu):
+            lines.append(f"{name:<14} {stats.calls:>8} {stats.wall:>10.4f} {stats.cpu:>10.4f} "
+                         f"{100 * stats.cpu / elapsed if elapsed else 0:>6.1f}% "
+                         f"{stats.blocks:>11} {stats.traced_bytes / 1024:>10.1f}")
+
+        if not allocation_sites:
+            return '\n'.join(lines) + '\n'
+        lines += ["", f"Top {TOP_ALLOCATION_SITES} allocation sites by blocks still held at the end of the window",
+                  f"{'new blocks':>10} {'new KiB':>10}  site"]
+        top = sorted(allocation_sites, key=lambda s: -s.count_diff)[:TOP_ALLOCATION_SITES]
+        for stat in top:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.count_diff:>10} {stat.size_diff / 1024:>10.1f}  {frame.filename}:{frame.lineno}")
+        return '\n'.join(lines) + '\n'
+
+
+def add_profiling_arguments(parser):
+    """--profile [SECONDS] and the --profile-* options"""
+    parser.add_argument('--profile', nargs='?', type=float, const=DEFAULT_WINDOW, metavar='SECONDS',
+                        help=f"profile the loop for SECONDS (default {DEFAULT_WINDOW}); "
+                             "kill -USR1 opens another window")
+    parser.add_argument('--profile-mode', choices=['sampling', 'deterministic'], default='sampling',
+                        help="stack sampling (collapsed stacks) or cProfile per stage (pstats)")
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help=f"output directory (default {PROFILE_DIR})")
+    parser.add_argument('--profile-no-alloc', action='store_true',
+                        help="skip tracemalloc (exact CPU times, no allocation sites)")
+
+
+def profiler_from_args(component, args) -> PipelineProfiler:
+    """Profiler configured from the command line; inactive unless --profile was given"""
+    profiler = PipelineProfiler(component, args.profile_mode, args.profile or DEFAULT_WINDOW, args.profile_dir,
+                                track_allocations=not args.profile_no_alloc)
+    if args.profile:
+        profiler.start_on_signal()
+        profiler.start()
+    return profiler
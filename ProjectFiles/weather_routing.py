@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+🧭 Weather Shard Routing
+Routes every document of a city to a single shard, so that per-city
+queries hit one shard instead of fanning out to all of them
+"""
+
+import time
+
+import requests
+
+# Configuration
+ELASTICSEARCH_URL = "http://localhost:9200"
+HISTORY_INDEX_PATTERN = "openweather*"
+ROUTED_TEMPLATE_NAME = "openweather-routed"
+ROUTED_SHARDS = 3
+ROUTED_META = {"routed": True}    # mapping _meta marking the indices created by the routed template
+ROUTED_CACHE_SECONDS = 300        # how long the list of routed indices is reused
+
+# 'city' keeps each city on its own routing value,
+# 'region' groups cities of the same country on one shard
+ROUTING_MODE = "city"
+
+
+def routing_key(data: dict, mode: str = ROUTING_MODE) -> str:
+    """Routing value of an observation (or of a {'city_id': ..} / {'country': ..} lookup)"""
+    if mode == "region":
+        country = data.get('country')
+        if country:
+            return str(country).upper()
+
+    city_id = data.get('city_id')
+    if city_id is not None:
+        return str(city_id)
+    return str(data.get('city_name', 'unknown')).lower()
+
+
+def routing_params(data: dict, mode: str = ROUTING_MODE) -> dict:
+    """Query string parameters to pass to requests for a routed call"""
+    return {'routing': routing_key(data, mode)}
+
+
+def create_routed_template(shards: int = ROUTED_SHARDS):
+    """Install an index template so new openweather-* indices have several shards"""
+    template = {
+        "index_patterns": [HISTORY_INDEX_PATTERN],
+        "priority": 10,
+        "template": {
+            "settings": {
+                "number_of_shards": shards,
+                "number_of_replicas": 0
+            },
+            "mappings": {
+                "_meta": ROUTED_META
+            }
+        }
+    }
+
+    try:
+        response = requests.put(
+            f"{ELASTICSEARCH_URL}/_index_template/{ROUTED_TEMPLATE_NAME}",
+            json=template,
+            timeout=10
+        )
+        if response.status_code in [200, 201]:
+            print(f"✅ Index template '{ROUTED_TEMPLATE_NAME}' installed ({shards} shards)")
+            return True
+        print(f"❌ Failed to install template: {response.status_code} - {response.text}")
+        return False
+    except Exception as e:
+        print(f"❌ Elasticsearch exception: {e}")
+        return False
+
+
+_routed_cache = {}
+
+
+def all_indices_routed(index: str = HISTORY_INDEX_PATTERN) -> bool:
+    """True when every index matching the pattern was created by the routed template
+
+    Documents of older indices were routed by the hash of their _id, so a
+    routed search would miss them on any index with more than one shard.
+    """
+    cached = _routed_cache.get(index)
+    if cached and time.monotonic() - cached[1] < ROUTED_CACHE_SECONDS:
+        return cached[0]
+
+    try:
+        response = requests.get(f"{ELASTICSEARCH_URL}/{index}/_mapping", timeout=10)
+        response.raise_for_status()
+        mappings = response.json()
+        routed = bool(mappings) and all(
+            (mapping.get('mappings') or {}).get('_meta', {}).get('routed') is True
+            for mapping in mappings.values()
+        )
+    except (requests.RequestException, ValueError):
+        routed = False
+    _routed_cache[index] = (routed, time.monotonic())
+    return routed
+
+
+def search_city(city: dict, query: dict, index: str = HISTORY_INDEX_PATTERN,
+                mode: str = ROUTING_MODE, timeout: int = 10) -> dict:
+    """Run a single-city search with the same routing the sinks used when indexing
+
+    city is a dict carrying city_id (and country in region mode). The
+    query is wrapped so only documents of that city match, because a
+    routing value can be shared by several cities. Routing is only passed
+    when every matching index was created by the routed template; until
+    the older indices age out the search goes to all shards.
+    """
+    city_filter = (
+        {"term": {"city_id": city['city_id']}}
+        if city.get('city_id') is not None
+        else {"match_phrase": {"city_name.keyword": city.get('city_name')}}
+    )
+    body = dict(query)
+    body["query"] = {
+        "bool": {
+            "must": [query.get("query", {"match_all": {}})],
+            "filter": [city_filter]
+        }
+    }
+
+    response = requests.post(
+        f"{ELASTICSEARCH_URL}/{index}/_search",
+        params=routing_params(city, mode) if all_indices_routed(index) else None,
+        json=body,
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    print("🧭 Weather Shard Routing")
+    print("=" * 50)
+    print(f"Routing mode: {ROUTING_MODE}")
+    create_routed_template()
+
+
+if __name__ == "__main__":
+    main()
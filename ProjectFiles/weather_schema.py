@@ -0,0 +1,154 @@
+"""
+📐 Weather Record Schema
+Field layout of a weather record (as built by get_weather_infos and
+enriched by the streams processor) and its columnar representation
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+
+# Field layout of get_weather_infos, followed by the fields added by enrich_data
+RECORD_FIELDS = [
+    ('created_at', 'string'),
+    ('timestamp', 'int64'),
+    ('city_id', 'int64'),
+    ('city_name', 'string'),
+    ('country', 'string'),
+    ('lat', 'float64'),
+    ('lon', 'float64'),
+    ('timezone', 'int64'),
+    ('temp', 'float64'),
+    ('feels_like', 'float64'),
+    ('temp_min', 'float64'),
+    ('temp_max', 'float64'),
+    ('pressure', 'float64'),
+    ('humidity', 'float64'),
+    ('sea_level', 'float64'),
+    ('grnd_level', 'float64'),
+    ('visibility', 'float64'),
+    ('clouds', 'float64'),
+    ('wind_speed', 'float64'),
+    ('wind_deg', 'float64'),
+    ('wind_gust', 'float64'),
+    ('weather_main', 'string'),
+    ('weather_description', 'string'),
+    ('weather_icon', 'string'),
+    ('sunrise', 'int64'),
+    ('sunset', 'int64'),
+    ('rain_1h', 'float64'),
+    ('rain_3h', 'float64'),
+    ('snow_1h', 'float64'),
+    ('snow_3h', 'float64'),
+    ('processed_at', 'string'),
+    ('heat_index', 'float64'),
+    ('temp_category', 'string'),
+]
+
+FIELD_NAMES = [name for name, _ in RECORD_FIELDS]
+
+# Low-cardinality string columns worth dictionary encoding in Parquet
+DICTIONARY_FIELDS = ['country', 'city_name', 'weather_main', 'weather_description',
+                     'weather_icon', 'temp_category']
+
+# Hive-style partition columns, in directory order
+PARTITION_FIELDS = ['country', 'city', 'date']
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^\w.\-]+', re.UNICODE)
+
+
+def arrow_schema():
+    """pyarrow schema of a weather record (pyarrow is imported lazily)"""
+    import pyarrow as pa
+
+    types = {'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in RECORD_FIELDS])
+
+
+def coerce_record(record: dict) -> dict:
+    """Project a record onto RECORD_FIELDS with column types applied"""
+    row = {}
+    for name, kind in RECORD_FIELDS:
+        value = record.get(name)
+        if value is not None:
+            try:
+                if kind == 'int64':
+                    value = int(value)
+                elif kind == 'float64':
+                    value = float(value)
+                else:
+                    value = str(value)
+            except (TypeError, ValueError):
+                value = None
+        row[name] = value
+    return row
+
+
+def weather_record(json_data: dict) -> dict:
+    """Weather record of an OpenWeather 2.5 /weather response (the layout get_weather_infos produces)"""
+    record = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'timestamp': json_data['dt'],
+        'city_id': json_data['id'],
+        'city_name': json_data['name'],
+        'country': json_data['sys']['country'],
+        'lat': json_data['coord']['lat'],
+        'lon': json_data['coord']['lon'],
+        'temp': json_data['main']['temp'],
+        'feels_like': json_data['main']['feels_like'],
+        'temp_min': json_data['main']['temp_min'],
+        'temp_max': json_data['main']['temp_max'],
+        'pressure': json_data['main']['pressure'],
+        'humidity': json_data['main']['humidity'],
+        'visibility': json_data.get('visibility', 0),
+        'clouds': json_data['clouds']['all'],
+        'wind_speed': json_data.get('wind', {}).get('speed', 0),
+        'wind_deg': json_data.get('wind', {}).get('deg', 0),
+        'weather_main': json_data['weather'][0]['main'],
+        'weather_description': json_data['weather'][0]['description'],
+        'weather_icon': json_data['weather'][0]['icon'],
+        'sunrise': json_data['sys']['sunrise'],
+        'sunset': json_data['sys']['sunset']
+    }
+
+    # Add rain/snow data if available
+    if 'rain' in json_data:
+        record['rain_1h'] = json_data['rain'].get('1h', 0)
+        record['rain_3h'] = json_data['rain'].get('3h', 0)
+    else:
+        record['rain_1h'] = 0
+        record['rain_3h'] = 0
+
+    if 'snow' in json_data:
+        record['snow_1h'] = json_data['snow'].get('1h', 0)
+        record['snow_3h'] = json_data['snow'].get('3h', 0)
+    else:
+        record['snow_1h'] = 0
+        record['snow_3h'] = 0
+
+    return record
+
+
+def safe_path_component(value) -> str:
+    """Make a partition value safe to use as a directory name"""
+    text = _UNSAFE_PATH_CHARS.sub('_', str(value if value not in (None, '') else 'unknown'))
+    return text.strip('_') or 'unknown'
+
+
+def partition_values(record: dict) -> tuple:
+    """(country, city, date) partition of a record, date taken from its UTC observation time"""
+    timestamp = record.get('timestamp')
+    if timestamp is not None:
+        date = datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%Y-%m-%d')
+    else:
+        date = 'unknown'
+    return (
+        safe_path_component(record.get('country')),
+        safe_path_component(record.get('city_name')),
+        date
+    )
+
+
+def partition_dir(values: tuple) -> str:
+    """Relative Hive-style directory of a partition, e.g. country=FR/city=Paris/date=2024-01-31"""
+    return '/'.join(f"{key}={value}" for key, value in zip(PARTITION_FIELDS, values))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+⏱️ Weather Pipeline Tracing
+Follows a sample of observations from the OpenWeather request to the
+Elasticsearch acknowledgement. Each traced record carries epoch-millisecond
+stamps in a compact 'trace' Kafka header (payloads and index mappings stay
+unchanged). Every component appends the stamps it knows to a JSON lines file
+when its part is done; the reporter merges them by trace id into per-hop and
+end-to-end latency histograms.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from weather_metrics import DEFAULT_BUCKETS, TRACE_HOP_SECONDS
+
+# Configuration
+TRACE_DIR = 'traces'
+TRACE_HEADER = 'trace'
+DEFAULT_SAMPLE_RATE = 0.01   # fraction of fetched observations traced
+
+# Hops in pipeline order: (code used in headers and files, display name)
+HOPS = (
+    ('fs', 'fetch start'),
+    ('fe', 'fetch end'),
+    ('pa', 'produce ack'),
+    ('cr', 'consumer receive'),
+    ('ed', 'enrichment done'),
+    ('ia', 'index ack'),
+)
+HOP_ORDER = [code for code, _name in HOPS]
+HOP_NAMES = dict(HOPS)
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1000000
+
+
+class Trace:
+    """Stamps of one traced record; 'local' lists the hops stamped in this process"""
+
+    __slots__ = ('id', 'stamps', 'local')
+
+    def __init__(self, trace_id=None, stamps=None):
+        self.id = trace_id or uuid.uuid4().hex[:16]
+        self.stamps = dict(stamps or {})
+        self.local = []
+
+    def stamp(self, hop, at_ms=None):
+        self.stamps[hop] = now_ms() if at_ms is None else at_ms
+        self.local.append(hop)
+        return self
+
+    def header(self) -> tuple:
+        """Kafka header (name, value) carrying the id and every stamp so far"""
+        return TRACE_HEADER, json.dumps({'id': self.id, **self.stamps}, separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def from_headers(cls, headers):
+        """Trace carried by a consumed message, or None when the record was not sampled"""
+        for key, value in headers or ():
+            if key == TRACE_HEADER and value:
+                stamps = json.loads(value)
+                return cls(stamps.pop('id'), stamps)
+        return None
+
+
+class Tracer:
+    """Samples new traces and writes finished ones for the reporter"""
+
+    def __init__(self, component, sample_rate=DEFAULT_SAMPLE_RATE, directory=TRACE_DIR):
+        self.component = component
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._file = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """New trace with its fetch start stamped, for a sampled fraction of calls"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return Trace().stamp('fs')
+
+    def finish(self, trace):
+        """Record the trace's stamps and observe the hops this process added"""
+        if trace is None:
+            return
+        ordered = ordered_stamps(trace.stamps)
+        for (previous, start), (hop, end) in zip(ordered, ordered[1:]):
+            if hop in trace.local and end >= start:
+                TRACE_HOP_SECONDS.labels(f"{previous}-{hop}").observe((end - start) / 1000)
+
+        line = json.dumps({'id': trace.id, 'component': self.component, **trace.stamps}, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{self.component}-{os.getpid()}.jsonl")
+                self._file = open(path, 'a', buffering=1, encoding='utf-8')
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_traces(directory=TRACE_DIR, since_ms=0) -> dict:
+    """Stamps per trace id, merged across every component's file"""
+    traces = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partially written last line
+                entry.pop('component', None)
+                trace_id = entry.pop('id')
+                if entry.get('fs', 0) >= since_ms:
+                    traces.setdefault(trace_id, {}).update(entry)
+    return traces
+
+
+def ordered_stamps(stamps: dict) -> list:
+    """(hop, stamp) pairs in pipeline order"""
+    return [(hop, stamps[hop]) for hop in HOP_ORDER if hop in stamps]
+
+
+def in_order(stamps: dict) -> bool:
+    """False when a later hop is stamped before an earlier one (clock skew, misplaced stamp)"""
+    times = [stamp for _hop, stamp in ordered_stamps(stamps)]
+    return all(start <= end for start, end in zip(times, times[1:]))
+
+
+def hop_latencies(traces: dict) -> dict:
+    """Milliseconds per consecutive stamped hop pair, plus 'end-to-end' from fetch start to the last stamp
+
+    Traces whose stamps are out of order are left out (see in_order).
+    """
+    latencies = {}
+    for stamps in traces.values():
+        if not in_order(stamps):
+            continue
+        ordered = ordered_stamps(stamps)
+        for (previous, start), (hop, end) in zip(ordered, ordered[1:]):
+            latencies.setdefault(f"{previous}-{hop}", []).append(end - start)
+        if len(ordered) > 1 and ordered[0][0] == 'fs':
+            latencies.setdefault('end-to-end', []).append(ordered[-1][1] - ordered[0][1])
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def hop_label(pair: str) -> str:
+    if '-' not in pair or pair == 'end-to-end':
+        return pair
+    start, end = pair.split('-')
+    return f"{HOP_NAMES[start]} → {HOP_NAMES[end]}"
+
+
+def print_report(latencies: dict, trace_count: int, show_buckets=True, out_of_order=0):
+    print(f"📊 {trace_count} traces")
+    if out_of_order:
+        print(f"⚠️ {out_of_order} traces left out: stamps out of pipeline order (clock skew between hosts?)")
+    if not latencies:
+        print("⚠️ No complete hop found yet")
+        return
+
+    pairs = sorted((p for p in latencies if p != 'end-to-end'),
+                   key=lambda p: [HOP_ORDER.index(h) for h in p.split('-')])
+    print(f"\n   {'hop':<36} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for pair in pairs + (['end-to-end'] if 'end-to-end' in latencies else []):
+        values = sorted(latencies[pair])
+        print(f"   {hop_label(pair):<36} {len(values):>6} "
+              + " ".join(f"{v:>7.0f}ms" for v in (percentile(values, 0.5), percentile(values, 0.95),
+                                                   percentile(values, 0.99), values[-1])))
+
+    if not show_buckets:
+        return
+    for pair in pairs + (['end-to-end'] if 'end-to-end' in latencies else []):
+        values = latencies[pair]
+        print(f"\n   {hop_label(pair)}")
+        bounds = [b * 1000 for b in DEFAULT_BUCKETS]
+        counts = [0] * (len(bounds) + 1)
+        for value in values:
+            counts[next((i for i, b in enumerate(bounds) if value <= b), len(bounds))] += 1
+        widest = max(counts)
+        for bound, count in zip(bounds + [float('inf')], counts):
+            if count:
+                label = f"≤{bound:g}ms" if bound != float('inf') else f">{bounds[-1]:g}ms"
+                print(f"      {label:>10} {count:>6} {'█' * max(1, round(40 * count / widest))}")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Report per-hop and end-to-end latency of traced weather records")
+    parser.add_argument('--dir', default=TRACE_DIR, help=f"trace directory (default {TRACE_DIR})")
+    parser.add_argument('--since', type=float, metavar='MINUTES', help="only traces started in the last MINUTES")
+    parser.add_argument('--no-buckets', action='store_true', help="print percentiles only")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("⏱️ Weather Pipeline Trace Report")
+    print("=" * 50)
+    since_ms = now_ms() - int(args.since * 60000) if args.since else 0
+    traces = load_traces(args.dir, since_ms)
+    out_of_order = sum(1 for stamps in traces.values() if not in_order(stamps))
+    print_report(hop_latencies(traces), len(traces), show_buckets=not args.no_buckets, out_of_order=out_of_order)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""
+🚚 Weather Pipeline Transport
+One consumer/producer interface over three backends, so the producer, the
+streams processor and the sinks run unchanged on any of them:
+- 'kafka-python': KafkaConsumer / KafkaProducer (the consumer is returned as is);
+- 'confluent': confluent-kafka (librdkafka) behind the same interface;
+- 'memory': an in-process broker with partitioned topics, consumer groups
+  and committed offsets, to measure processing throughput without a broker,
+  Docker or the network (benchmarks and CI).
+
+The interface is kafka-python's: poll() returns {TopicPartition: [Message]}
+and messages have topic, partition, offset, timestamp, key, value and
+headers. Producers take send(topic, value, key, headers, on_delivery) where
+on_delivery(error, delivery) receives a Delivery(topic, partition, offset,
+latency), latency being the seconds from send() to the broker's ack.
+Serializers run on every backend, so the memory broker keeps the JSON cost.
+"""
+
+import collections
+import itertools
+import logging
+import threading
+import time
+import uuid
+import zlib
+
+try:
+    from kafka import TopicPartition
+except ImportError:
+    TopicPartition = collections.namedtuple('TopicPartition', ['topic', 'partition'])
+
+# Configuration
+KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
+TRANSPORTS = ['kafka-python', 'confluent', 'memory']
+CLI_TRANSPORTS = ['kafka-python', 'confluent']  # 'memory' only connects components of one process
+MEMORY_PARTITIONS = 3           # partitions of a topic auto-created by the memory broker
+MEMORY_RETENTION = None         # messages kept per memory partition (None: all of them)
+BOUNDED_MEMORY_RETENTION = 10000  # for long in-process runs whose output topics nobody reads
+
+logger = logging.getLogger(__name__)
+
+Message = collections.namedtuple('Message', ['topic', 'partition', 'offset', 'timestamp', 'key', 'value', 'headers'])
+Delivery = collections.namedtuple('Delivery', ['topic', 'partition', 'offset', 'latency'], defaults=[None])
+
+
+def _to_bytes(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+# Producer options shared by the backends, with each backend's name for them
+PRODUCER_OPTIONS = {
+    'acks': ('acks', 'acks'),
+    'retries': ('retries', 'retries'),
+    'retry_backoff_ms': ('retry_backoff_ms', 'retry.backoff.ms'),
+    'compression': ('compression_type', 'compression.type'),
+    'batch_size': ('batch_size', 'batch.size'),
+    'linger_ms': ('linger_ms', 'linger.ms'),
+}
+
+
+def create_consumer(transport, topics=(), bootstrap_servers=KAFKA_BOOTSTRAP_SERVER, group_id=None,
+                    value_deserializer=None, key_deserializer=None, auto_offset_reset='latest',
+                    enable_auto_commit=True):
+    """Consumer subscribed to topics (or none, for assign()) on the given transport"""
+    if transport == 'kafka-python':
+        from kafka import KafkaConsumer
+
+        return KafkaConsumer(*topics, bootstrap_servers=[bootstrap_servers], group_id=group_id,
+                             value_deserializer=value_deserializer, key_deserializer=key_deserializer,
+                             auto_offset_reset=auto_offset_reset, enable_auto_commit=enable_auto_commit)
+    if transport == 'confluent':
+        return ConfluentConsumer(topics, bootstrap_servers, group_id, value_deserializer, key_deserializer,
+                                 auto_offset_reset, enable_auto_commit)
+    if transport == 'memory':
+        return MemoryConsumer(memory_broker(), topics, group_id, value_deserializer, key_deserializer,
+                              auto_offset_reset, enable_auto_commit)
+    raise ValueError(f"Unknown transport: {transport}")
+
+
+def create_producer(transport, bootstrap_servers=KAFKA_BOOTSTRAP_SERVER, client_id=None, value_serializer=None,
+                    **options):
+    """Producer on the given transport; options are PRODUCER_OPTIONS keys"""
+    unknown = set(options) - set(PRODUCER_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown producer option(s): {', '.join(sorted(unknown))}")
+    if transport == 'kafka-python':
+        return KafkaPythonProducer(bootstrap_servers, client_id, value_serializer, options)
+    if transport == 'confluent':
+        return ConfluentProducer(bootstrap_servers, client_id, value_serializer, options)
+    if transport == 'memory':
+        return MemoryProducer(memory_broker(), value_serializer)
+    raise ValueError(f"Unknown transport: {transport}")
+
+
+def add_transport_arguments(parser, default='kafka-python'):
+    """--transport option of the Kafka clients"""
+    parser.add_argument('--transport', choices=CLI_TRANSPORTS, default=default,
+                        help=f"Kafka client library (default {default})")
+
+
+# kafka-python
+
+class KafkaPythonProducer:
+    def __init__(self, bootstrap_servers, client_id, value_serializer, options):
+        from kafka import KafkaProducer
+
+        config = {PRODUCER_OPTIONS[name][0]: value for name, value in options.items()}
+        if client_id:
+            config['client_id'] = client_id
+        self.producer = KafkaProducer(bootstrap_servers=[bootstrap_servers], **config)
+        self.value_serializer = value_serializer
+
+    def send(self, topic, value, key=None, headers=None, on_delivery=None):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        sent = time.monotonic()
+        future = self.producer.send(topic, _to_bytes(value), key=_to_bytes(key), headers=headers)
+        if on_delivery is not None:
+            # Callbacks run on the I/O thread as soon as the ack arrives
+            future.add_callback(lambda meta: on_delivery(None, Delivery(meta.topic, meta.partition, meta.offset,
+                                                                        time.monotonic() - sent)))
+            future.add_errback(lambda error: on_delivery(error, Delivery(topic, None, None)))
+        return future
+
+    def flush(self, timeout=None):
+        self.producer.flush(timeout)
+
+    def close(self):
+        self.producer.close()
+
+
+# confluent-kafka
+
+class ConfluentProducer:
+    def __init__(self, bootstrap_servers, client_id, value_serializer, options):
+        from confluent_kafka import Producer
+
+        config = {'bootstrap.servers': bootstrap_servers}
+        config.update({PRODUCER_OPTIONS[name][1]: value for name, value in options.items()})
+        if client_id:
+            config['client.id'] = client_id
+        self.producer = Producer(config)
+        self.value_serializer = value_serializer
+
+    def send(self, topic, value, key=None, headers=None, on_delivery=None):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+
+        def _delivered(error, message):
+            # Callbacks only run in poll()/flush(), possibly long after the ack:
+            # the latency is librdkafka's own send-to-ack measure
+            on_delivery(error, Delivery(message.topic(), message.partition(), message.offset(),
+                                        message.latency()))
+        callback = _delivered if on_delivery is not None else None
+        while True:
+            try:
+                self.producer.produce(topic, value=_to_bytes(value), key=_to_bytes(key), headers=headers,
+                                      on_delivery=callback)
+                break
+            except BufferError:
+                # Local queue full: wait for deliveries to make room
+                self.producer.poll(0.1)
+        # Serve delivery callbacks of earlier sends without blocking
+        self.producer.poll(0)
+
+    def flush(self, timeout=None):
+        self.producer.flush(-1 if timeout is None else timeout)
+
+    def close(self):
+        self.producer.flush()
+
+
+class ConfluentConsumer:
+    """confluent_kafka.Consumer with the kafka-python consumer interface"""
+
+    def __init__(self, topics, bootstrap_servers, group_id, value_deserializer, key_deserializer,
+                 auto_offset_reset, enable_auto_commit):
+        import confluent_kafka
+
+        self.kafka = confluent_kafka
+        # librdkafka needs a group even for assign(); a private one commits nothing others read
+        self.consumer = confluent_kafka.Consumer({
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': group_id or f"weather-{uuid.uuid4().hex[:12]}",
+            'auto.offset.reset': auto_offset_reset,
+            'enable.auto.commit': enable_auto_commit,
+        })
+        self.value_deserializer = value_deserializer
+        self.key_deserializer = key_deserializer
+        if topics:
+            self.consumer.subscribe(list(topics))
+
+    def _native(self, partition, offset=None):
+        if offset is None:
+            return self.kafka.TopicPartition(partition.topic, partition.partition)
+        return self.kafka.TopicPartition(partition.topic, partition.partition, offset)
+
+    def poll(self, timeout_ms=0, max_records=500):
+        batches = {}
+        for message in self.consumer.consume(num_messages=max_records, timeout=timeout_ms / 1000):
+            if message.error():
+                if message.error().code() != self.kafka.KafkaError._PARTITION_EOF:
+                    logger.warning("⚠️ Consumer error: %s", message.error())
+                continue
+            key, value = message.key(), message.value()
+            if self.key_deserializer is not None:
+                key = self.key_deserializer(key)
+            if self.value_deserializer is not None:
+                value = self.value_deserializer(value)
+            partition = TopicPartition(message.topic(), message.partition())
+            batches.setdefault(partition, []).append(Message(
+                message.topic(), message.partition(), message.offset(), message.timestamp()[1],
+                key, value, message.headers() or []))
+        return batches
+
+    def highwater(self, partition):
+        """Last known end offset, from the cached fetch response (no request)"""
+        _low, high = self.consumer.get_watermark_offsets(self._native(partition), cached=True)
+        return high if high >= 0 else None
+
+    def position(self, partition):
+        return self.consumer.position([self._native(partition)])[0].offset
+
+    def partitions_for_topic(self, topic):
+        metadata = self.consumer.list_topics(topic, timeout=10).topics.get(topic)
+        if metadata is None or metadata.error is not None:
+            return set()
+        return set(metadata.partitions)
+
+    def _positions(self):
+        """Assigned partitions with their position (None before the first fetch)"""
+        assigned = self.consumer.assignment()
+        if not assigned:
+            return {}
+        return {TopicPartition(tp.topic, tp.partition): (tp.offset if tp.offset >= 0 else None)
+                for tp in self.consumer.position(assigned)}
+
+    def _assign(self, offsets):
+        self.consumer.assign([self._native(partition, offset) for partition, offset in offsets.items()])
+
+    def assign(self, partitions):
+        # Like kafka-python, partitions already assigned keep their position
+        positions = self._positions()
+        self._assign({partition: positions.get(partition) for partition in partitions})
+
+    def seek_to_beginning(self, *partitions):
+        positions = self._positions()
+        for partition in partitions or list(positions):
+            positions[partition] = self.kafka.OFFSET_BEGINNING
+        self._assign(positions)
+
+    def end_offsets(self, partitions):
+        return {partition: self.consumer.get_watermark_offsets(self._native(partition), timeout=10)[1]
+                for partition in partitions}
+
+    def commit(self):
+        try:
+            self.consumer.commit(asynchronous=False)
+        except self.kafka.KafkaException as e:
+            # Nothing consumed since the last commit
+            if e.args[0].code() != self.kafka.KafkaError._NO_OFFSET:
+                raise
+
+    def close(self):
+        self.consumer.close()
+
+
+# In-process broker
+
+class _PartitionLog:
+    __slots__ = ('messages', 'base')
+
+    def __init__(self):
+        self.messages = []
+        self.base = 0
+
+    @property
+    def end(self):
+        return self.base + len(self.messages)
+
+
+class MemoryBroker:
+    """Partitioned append-only topics with consumer groups, shared by the clients of one process
+
+    Topics keep every message unless a retention is set; then a partition
+    drops its oldest half when it reaches the retention. The dropped
+    messages are counted per topic, and a consumer whose position was
+    dropped is moved to the oldest kept message with a warning, counted in
+    'lost'.
+    """
+
+    def __init__(self, partitions=MEMORY_PARTITIONS, retention=MEMORY_RETENTION):
+        self.default_partitions = partitions
+        self.retention = retention
+        self.dropped = collections.Counter()   # topic -> messages removed by retention
+        self.lost = collections.Counter()      # topic -> messages consumers skipped because of retention
+        self.topics = {}
+        self.groups = collections.defaultdict(list)  # group -> members in join order
+        self.committed = {}                          # (group, TopicPartition) -> offset
+        self.changed = threading.Condition()
+        self._round_robin = itertools.count()
+
+    def create_topic(self, topic, partitions=None):
+        with self.changed:
+            if topic not in self.topics:
+                self.topics[topic] = [_PartitionLog() for _ in range(partitions or self.default_partitions)]
+                for group in self.groups:
+                    self._rebalance(group)
+            return len(self.topics[topic])
+
+    def append(self, topic, key, value, headers):
+        if topic not in self.topics:
+            self.create_topic(topic)
+        with self.changed:
+            logs = self.topics[topic]
+            # Same key, same partition; keyless messages are spread round-robin
+            partition = (zlib.crc32(key) if key is not None else next(self._round_robin)) % len(logs)
+            log_ = logs[partition]
+            if self.retention and len(log_.messages) >= self.retention:
+                dropped = len(log_.messages) // 2
+                del log_.messages[:dropped]
+                log_.base += dropped
+                self.dropped[topic] += dropped
+            offset = log_.end
+            log_.messages.append((int(time.time() * 1000), key, value, headers))
+            self.changed.notify_all()
+        return partition, offset
+
+    def fetch(self, partition, offset, max_records):
+        """Raw messages of a partition from offset (moved up to the oldest kept one)"""
+        log_ = self.topics[partition.topic][partition.partition]
+        if offset < log_.base:
+            self.lost[partition.topic] += log_.base - offset
+            logger.warning("⚠️ Memory broker: %s-%d position %d was dropped by retention (%d), "
+                           "%d messages skipped", partition.topic, partition.partition, offset,
+                           self.retention, log_.base - offset)
+            offset = log_.base
+        start = offset - log_.base
+        return offset, log_.messages[start:start + max_records]
+
+    def bounds(self, partition):
+        log_ = self.topics[partition.topic][partition.partition]
+        return log_.base, log_.end
+
+    def join(self, group, member):
+        with self.changed:
+            self.groups[group].append(member)
+            self._rebalance(group)
+
+    def leave(self, group, member):
+        with self.changed:
+            if member in self.groups.get(group, ()):
+                self.groups[group].remove(member)
+                self._rebalance(group)
+
+    def _rebalance(self, group):
+        """Spread the partitions of the group's topics round-robin over its members"""
+        members = self.groups[group]
+        topics = sorted({topic for member in members for topic in member.topics if topic in self.topics})
+        partitions = [TopicPartition(topic, p) for topic in topics for p in range(len(self.topics[topic]))]
+        for index, member in enumerate(members):
+            member.reassign(partitions[index::len(members)])
+
+
+_memory_broker = None
+_memory_broker_lock = threading.Lock()
+
+
+def memory_broker() -> MemoryBroker:
+    """The process-wide in-memory broker"""
+    global _memory_broker
+    with _memory_broker_lock:
+        if _memory_broker is None:
+            _memory_broker = MemoryBroker()
+        return _memory_broker
+
+
+def set_memory_retention(messages):
+    """Bound every partition of the process-wide memory broker (None keeps everything)"""
+    broker = memory_broker()
+    with broker.changed:
+        broker.retention = messages
+
+
+class MemoryProducer:
+    def __init__(self, broker, value_serializer=None):
+        self.broker = broker
+        self.value_serializer = value_serializer
+
+    def send(self, topic, value, key=None, headers=None, on_delivery=None):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        partition, offset = self.broker.append(topic, _to_bytes(key), _to_bytes(value), headers or [])
+        if on_delivery is not None:
+            on_delivery(None, Delivery(topic, partition, offset, 0.0))
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryConsumer:
+    """Consumer of the in-process broker, a group member when group_id is given"""
+
+    def __init__(self, broker, topics=(), group_id=None, value_deserializer=None, key_deserializer=None,
+                 auto_offset_reset='latest', enable_auto_commit=True):
+        self.broker = broker
+        self.topics = list(topics)
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.key_deserializer = key_deserializer
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+        self.assignment = []
+        self.positions = {}
+        # Without a group the consumer is alone in a private one and commits nothing
+        self.member_of = group_id or f"memory-{uuid.uuid4().hex[:12]}"
+        for topic in self.topics:
+            broker.create_topic(topic)
+        if self.topics:
+            broker.join(self.member_of, self)
+
+    def reassign(self, partitions):
+        """Called by the broker on rebalance (under its lock)"""
+        self.assignment = list(partitions)
+        self.positions = {partition: offset for partition, offset in self.positions.items()
+                          if partition in self.assignment}
+
+    def assign(self, partitions):
+        for partition in partitions:
+            self.broker.create_topic(partition.topic)
+        with self.broker.changed:
+            self.reassign(partitions)
+
+    def partitions_for_topic(self, topic):
+        return set(range(len(self.broker.topics[topic]))) if topic in self.broker.topics else set()
+
+    def _initial_position(self, partition):
+        committed = self.broker.committed.get((self.group_id, partition))
+        if committed is not None:
+            return committed
+        base, end = self.broker.bounds(partition)
+        return base if self.auto_offset_reset == 'earliest' else end
+
+    def poll(self, timeout_ms=0, max_records=500):
+        deadline = time.monotonic() + timeout_ms / 1000
+        raw = {}
+        with self.broker.changed:
+            while True:
+                remaining = max_records
+                for partition in self.assignment:
+                    if remaining <= 0:
+                        break
+                    position = self.positions.get(partition)
+                    if position is None:
+                        position = self._initial_position(partition)
+                    position, messages = self.broker.fetch(partition, position, remaining)
+                    if messages:
+                        raw[partition] = (position, messages)
+                        remaining -= len(messages)
+                    self.positions[partition] = position + len(messages)
+                wait = deadline - time.monotonic()
+                if raw or wait <= 0:
+                    break
+                self.broker.changed.wait(wait)
+            if self.enable_auto_commit and raw and self.group_id:
+                self._commit()
+
+        # Deserialize outside the broker lock
+        batches = {}
+        for partition, (first, messages) in raw.items():
+            batch = []
+            for offset, (timestamp, key, value, headers) in enumerate(messages, first):
+                if self.key_deserializer is not None:
+                    key = self.key_deserializer(key)
+                if self.value_deserializer is not None:
+                    value = self.value_deserializer(value)
+                batch.append(Message(partition.topic, partition.partition, offset, timestamp, key, value, headers))
+            batches[partition] = batch
+        return batches
+
+    def highwater(self, partition):
+        return self.broker.bounds(partition)[1]
+
+    def position(self, partition):
+        position = self.positions.get(partition)
+        return self._initial_position(partition) if position is None else position
+
+    def seek_to_beginning(self, *partitions):
+        for partition in partitions or self.assignment:
+            self.positions[partition] = self.broker.bounds(partition)[0]
+
+    def end_offsets(self, partitions):
+        return {partition: self.broker.bounds(partition)[1] for partition in partitions}
+
+    def _commit(self):
+        for partition, offset in self.positions.items():
+            self.broker.committed[(self.group_id, partition)] = offset
+
+    def commit(self):
+        if self.group_id:
+            with self.broker.changed:
+                self._commit()
+
+    def close(self):
+        if self.enable_auto_commit:
+            self.commit()
+        if self.topics:
+            self.broker.leave(self.member_of, self)
@@ -2,18 +2,34 @@
 """
 Working Kafka Weather Producer using confluent-kafka
 Streams weather data from OpenWeather API to Kafka
+(or through kafka-python with --transport kafka-python)
 """
 
+import argparse
+import logging
 import time
 import json
 import requests
 import configparser
 import os
-from confluent_kafka import Producer
+
+from weather_metrics import FETCH_LATENCY, PRODUCE_ERRORS, RECORDS_FETCHED, RECORDS_PRODUCED, start_metrics_server
+from weather_trace import DEFAULT_SAMPLE_RATE, Tracer, now_ms
+from weather_logging import RecordLog, add_logging_arguments, log, setup_logging
+from weather_profiling import add_profiling_arguments, profiler_from_args
+from weather_schema import weather_record
+from weather_api import add_api_arguments, current_weather_url, use_base_url
+from weather_capture import add_capture_arguments, capture_response, start_capture
+from weather_transport import add_transport_arguments, create_producer
 
 # Kafka configuration
 KAFKA_BOOTSTRAP_SERVER = 'localhost:9092'
 KAFKA_TOPIC = 'openweather'
+METRICS_PORT = 9101
+
+logger = logging.getLogger('producer')
+# Shared with the delivery callbacks, which kafka-python runs on its I/O thread
+deliveries = RecordLog(logger, 'deliveries')
 
 def config():
     """Read API key from config file"""
@@ -22,136 +38,153 @@ def config():
     config_parser.read(config_file)
     return config_parser['openweather']['key']
 
-def kafka_producer():
+def kafka_producer(transport='confluent'):
     """Create Kafka producer with enhanced configuration"""
-    conf = {
-        'bootstrap.servers': KAFKA_BOOTSTRAP_SERVER,
-        'client.id': 'weather-producer',
-        'acks': 'all',  # Wait for all replicas to acknowledge
-        'retries': 3,   # Retry failed sends
-        'retry.backoff.ms': 1000,  # Wait between retries
-        'compression.type': 'snappy',  # Compress messages
-        'batch.size': 16384,  # Batch size for efficiency
-        'linger.ms': 10  # Wait time to batch messages
-    }
-    return Producer(conf)
+    return create_producer(
+        transport,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVER,
+        client_id='weather-producer',
+        acks='all',  # Wait for all replicas to acknowledge
+        retries=3,   # Retry failed sends
+        retry_backoff_ms=1000,  # Wait between retries
+        compression='snappy',  # Compress messages
+        batch_size=16384,  # Batch size for efficiency
+        linger_ms=10  # Wait time to batch messages
+    )
 
-def delivery_report(err, msg):
+def delivery_report(err, delivery):
     """Called once for each message produced to indicate delivery result."""
     if err is not None:
-        print(f'Message delivery failed: {err}')
+        PRODUCE_ERRORS.labels(delivery.topic).inc()
+        deliveries.record("Message delivery failed", error=True, topic=delivery.topic, error_detail=str(err))
     else:
-        print(f'Message delivered to {msg.topic()} [{msg.partition()}]')
+        RECORDS_PRODUCED.labels(delivery.topic).inc()
+        deliveries.record("Message delivered", topic=delivery.topic, partition=delivery.partition)
+
+def traced_delivery(tracer, trace):
+    """Delivery callback that also stamps the produce ack of a traced record
+
+    Create it right before send(): the ack is stamped at the send time plus
+    the delivery latency, not when the callback happens to run (confluent
+    serves callbacks on the next send or flush).
+    """
+    sent_ms = now_ms()
+
+    def report(err, delivery):
+        delivery_report(err, delivery)
+        if err is None:
+            acked_ms = sent_ms + round(delivery.latency * 1000) if delivery.latency is not None else None
+            tracer.finish(trace.stamp('pa', acked_ms))
+    return report
 
 def get_weather_infos(city_name: str, api_key: str) -> dict:
-    """Request weather data from OpenWeather API 2.5"""
+    """Request weather data from OpenWeather API 2.5 (raises on failure)"""
     
-    openweather_endpoint = f'http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric'
+    openweather_endpoint = current_weather_url(city_name, api_key)
     
     try:
-        api_response = requests.get(openweather_endpoint, timeout=10)
+        with FETCH_LATENCY.labels(city_name).time():
+            api_response = requests.get(openweather_endpoint, timeout=10)
+        capture_response(city_name, api_response)
         api_response.raise_for_status()
         json_data = api_response.json()
         
-        json_msg = {
-            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'timestamp': json_data['dt'],
-            'city_id': json_data['id'],
-            'city_name': json_data['name'],
-            'country': json_data['sys']['country'],
-            'lat': json_data['coord']['lat'],
-            'lon': json_data['coord']['lon'],
-            'temp': json_data['main']['temp'],
-            'feels_like': json_data['main']['feels_like'],
-            'temp_min': json_data['main']['temp_min'],
-            'temp_max': json_data['main']['temp_max'],
-            'pressure': json_data['main']['pressure'],
-            'humidity': json_data['main']['humidity'],
-            'visibility': json_data.get('visibility', 0),
-            'clouds': json_data['clouds']['all'],
-            'wind_speed': json_data.get('wind', {}).get('speed', 0),
-            'wind_deg': json_data.get('wind', {}).get('deg', 0),
-            'weather_main': json_data['weather'][0]['main'],
-            'weather_description': json_data['weather'][0]['description'],
-            'weather_icon': json_data['weather'][0]['icon'],
-            'sunrise': json_data['sys']['sunrise'],
-            'sunset': json_data['sys']['sunset']
-        }
+        json_msg = weather_record(json_data)
         
-        # Add rain/snow data if available
-        if 'rain' in json_data:
-            json_msg['rain_1h'] = json_data['rain'].get('1h', 0)
-            json_msg['rain_3h'] = json_data['rain'].get('3h', 0)
-        else:
-            json_msg['rain_1h'] = 0
-            json_msg['rain_3h'] = 0
-            
-        if 'snow' in json_data:
-            json_msg['snow_1h'] = json_data['snow'].get('1h', 0)
-            json_msg['snow_3h'] = json_data['snow'].get('3h', 0)
-        else:
-            json_msg['snow_1h'] = 0
-            json_msg['snow_3h'] = 0
-            
+        RECORDS_FETCHED.labels('ok').inc()
         return json_msg
         
-    except Exception as e:
-        print(f"Error fetching weather data for {city_name}: {e}")
-        return None
+    except Exception:
+        RECORDS_FETCHED.labels('error').inc()
+        raise
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Stream OpenWeather observations to Kafka")
+    parser.add_argument('--trace-sample', type=float, default=DEFAULT_SAMPLE_RATE, metavar='RATE',
+                        help=f"fraction of records traced end to end (default {DEFAULT_SAMPLE_RATE}, 0 disables)")
+    add_api_arguments(parser)
+    add_capture_arguments(parser)
+    add_transport_arguments(parser, default='confluent')
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    setup_logging('producer', args.log_level, args.log_format)
+    use_base_url(args.api_url)
+    start_capture(args.capture)
     api_key = config()
     cities = ['London', 'Berlin', 'Paris', 'Barcelona', 'Amsterdam', 'Krakow', 'Vienna']
     
-    print("🌤️  Starting Weather Data Kafka Producer")
-    print(f"API Key: {api_key[:8]}...")
-    print(f"Cities: {cities}")
-    print(f"Kafka Topic: {KAFKA_TOPIC}")
-    print(f"Kafka Server: {KAFKA_BOOTSTRAP_SERVER}")
-    print("=" * 60)
+    log(logger, logging.INFO, "🌤️ Starting Weather Data Kafka Producer", api_key=f"{api_key[:8]}...",
+        cities=cities, api_url=args.api_url, topic=KAFKA_TOPIC, bootstrap_server=KAFKA_BOOTSTRAP_SERVER)
+    
+    start_metrics_server(METRICS_PORT)
     
     # Create Kafka producer
-    producer = kafka_producer()
+    producer = kafka_producer(args.transport)
+    tracer = Tracer('producer', args.trace_sample)
+    fetches = RecordLog(logger, 'fetches')
+    profiler = profiler_from_args('producer', args)
     
     try:
         cycle = 1
         while True:
-            print(f"\n🔄 Cycle {cycle} - {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            print("-" * 40)
+            log(logger, logging.DEBUG, "🔄 Cycle started", cycle=cycle)
             
             for city_name in cities:
                 try:
-                    print(f"📡 Fetching {city_name}...", end=" ")
-                    json_msg = get_weather_infos(city_name, api_key)
+                    trace = tracer.start()
+                    try:
+                        with profiler.stage('fetch'):
+                            json_msg = get_weather_infos(city_name, api_key)
+                    except Exception as e:
+                        fetches.record("❌ Fetch failed", error=True, city=city_name,
+                                       error_detail=f"{type(e).__name__}: {e}")
+                        continue
                     
-                    if json_msg:
-                        # Send to Kafka
-                        producer.produce(
+                    # Send to Kafka (traced records carry their stamps in a header)
+                    if trace:
+                        trace.stamp('fe')
+                    with profiler.stage('serialize'):
+                        value = json.dumps(json_msg)
+                    with profiler.stage('produce'):
+                        producer.send(
                             KAFKA_TOPIC,
                             key=city_name,
-                            value=json.dumps(json_msg),
-                            callback=delivery_report
+                            value=value,
+                            headers=[trace.header()] if trace else None,
+                            on_delivery=traced_delivery(tracer, trace) if trace else delivery_report
                         )
-                        
-                        print(f"✅ {json_msg['temp']}°C, {json_msg['weather_description']}")
-                    else:
-                        print("❌ Failed")
+                    
+                    fetches.record("✅ Fetched", city=city_name, temp=json_msg['temp'],
+                                   description=json_msg['weather_description'])
                         
                 except Exception as e:
-                    print(f"❌ Error: {e}")
+                    fetches.record("❌ Produce failed", error=True, city=city_name, error_detail=str(e))
             
             # Wait for any outstanding messages to be delivered
-            producer.flush()
+            with profiler.stage('flush'):
+                producer.flush()
             
-            print(f"\n⏰ Waiting 60 seconds before next cycle...")
+            profiler.check_window()
+            log(logger, logging.DEBUG, "⏰ Waiting before next cycle", cycle=cycle, seconds=60)
             time.sleep(60)
+            fetches.tick()
+            deliveries.tick()
             cycle += 1
             
     except KeyboardInterrupt:
-        print("\n🛑 Stopping producer...")
+        log(logger, logging.INFO, "🛑 Stopping producer")
     finally:
         producer.flush()
-        print("👋 Producer stopped.")
+        profiler.finish()
+        tracer.close()
+        fetches.summary()
+        deliveries.summary()
+        log(logger, logging.INFO, "👋 Producer stopped")
 
 if __name__ == "__main__":
     main()